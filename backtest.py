@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Historical backtest for the RSI Follow Trend 4-step setup
+Series and crossover masks are computed once with NumPy, then the step
+state machine runs in a single pass (Numba-jitted when available)
+"""
+
+import argparse
+import time
+import numpy as np
+from typing import Dict
+from candles import KLINE_FIELDS, KLINE_DTYPE
+from rsi_indicator import Klines, RSI_MODE_WILDER, kline_columns, rsi_series, ema_series, wma_series
+
+try:
+    # Optional JIT for the state machine loop
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Per-bar condition flags (crossovers compare the previous and current bar)
+OVERBOUGHT = 1 << 0          # RSI >= overbought
+OVERSOLD = 1 << 1            # RSI <= oversold
+RSI_UNDER_EMA = 1 << 2       # BUY step 2: RSI crossunder EMA9
+RSI_UNDER_WMA = 1 << 3       # BUY step 3: RSI crossunder WMA45
+EMA_UNDER_WMA = 1 << 4       # BUY step 4: EMA9 crossunder WMA45
+RSI_OVER_EMA = 1 << 5        # SELL step 2: RSI crossover EMA9
+RSI_OVER_WMA = 1 << 6        # SELL step 3: RSI crossover WMA45
+EMA_OVER_WMA = 1 << 7        # SELL step 4: EMA9 crossover WMA45
+RSI_REGAIN_EMA = 1 << 8      # BUY count / BUY #1: prev RSI < EMA9, now >=
+RSI_REGAIN_WMA = 1 << 9      # BUY #2: prev RSI < WMA45, now >=
+RSI_LOSE_EMA = 1 << 10       # SELL count / SELL #1: prev RSI > EMA9, now <=
+RSI_LOSE_WMA = 1 << 11       # SELL #2: prev RSI > WMA45, now <=
+
+# Emitted event bits
+EVENT_BUY_1 = 1
+EVENT_BUY_2 = 2
+EVENT_SELL_1 = 4
+EVENT_SELL_2 = 8
+
+SIGNAL_NAMES = {
+    EVENT_BUY_1: 'buy_1',
+    EVENT_BUY_2: 'buy_2',
+    EVENT_SELL_1: 'sell_1',
+    EVENT_SELL_2: 'sell_2',
+}
+
+
+def indicator_series(closes: np.ndarray, rsi_length: int = 14, ema_length: int = 9,
+                     wma_length: int = 45, rsi_mode: str = RSI_MODE_WILDER):
+    """
+    RSI, EMA9 and WMA45 over the full history
+    
+    Returns:
+        (rsi, ema9, wma45) for bars rsi_length..n-1, the same values
+        streaming mode produces candle by candle
+    """
+    rsi = rsi_series(closes, rsi_length, rsi_mode)[rsi_length:]
+    return rsi, ema_series(rsi, ema_length), wma_series(rsi, wma_length)
+
+
+def condition_flags(rsi: np.ndarray, ema9: np.ndarray, wma45: np.ndarray,
+                    overbought: float = 80, oversold: float = 20) -> np.ndarray:
+    """
+    Bitmask of the conditions the step logic checks, for bars 1..n-1
+    
+    Mirrors the comparisons in _process_buy_logic/_process_sell_logic and
+    get_signals, with `prev` = bar i-1 and `current` = bar i.
+    """
+    prev_rsi, rsi = rsi[:-1], rsi[1:]
+    prev_ema, ema = ema9[:-1], ema9[1:]
+    prev_wma, wma = wma45[:-1], wma45[1:]
+    
+    masks = (
+        (OVERBOUGHT, rsi >= overbought),
+        (OVERSOLD, rsi <= oversold),
+        (RSI_UNDER_EMA, (prev_rsi >= prev_ema) & (rsi < ema)),
+        (RSI_UNDER_WMA, (prev_rsi >= prev_wma) & (rsi < wma)),
+        (EMA_UNDER_WMA, (prev_ema >= prev_wma) & (ema < wma)),
+        (RSI_OVER_EMA, (prev_rsi <= prev_ema) & (rsi > ema)),
+        (RSI_OVER_WMA, (prev_rsi <= prev_wma) & (rsi > wma)),
+        (EMA_OVER_WMA, (prev_ema <= prev_wma) & (ema > wma)),
+        (RSI_REGAIN_EMA, (prev_rsi < prev_ema) & (rsi >= ema)),
+        (RSI_REGAIN_WMA, (prev_rsi < prev_wma) & (rsi >= wma)),
+        (RSI_LOSE_EMA, (prev_rsi > prev_ema) & (rsi <= ema)),
+        (RSI_LOSE_WMA, (prev_rsi > prev_wma) & (rsi <= wma)),
+    )
+    
+    flags = np.zeros(len(rsi), dtype=np.int32)
+    for bit, mask in masks:
+        flags[mask] |= bit
+    return flags
+
+
+@njit(cache=True)
+def _run_steps(flags, events):
+    """
+    Step state machine: events[i] gets the signals fired on flags[i]
+    
+    Each setup is tracked as a level 0-4 (steps completed in order), plus
+    the post-setup cross count and BUY/SELL #1 entries, exactly as
+    RSIFollowTrend does per update.
+    """
+    buy_level = 0
+    buy_count = 0
+    buy_entries = 0
+    sell_level = 0
+    sell_count = 0
+    sell_entries = 0
+    
+    for i in range(len(flags)):
+        f = flags[i]
+        event = 0
+        
+        # BUY logic (_process_buy_logic)
+        if f & OVERBOUGHT and buy_level < 1:
+            buy_level = 1
+        if buy_level == 1 and f & RSI_UNDER_EMA:
+            buy_level = 2
+        if buy_level == 2 and f & RSI_UNDER_WMA:
+            buy_level = 3
+        if buy_level == 3 and f & EMA_UNDER_WMA:
+            buy_level = 4
+        if buy_level == 4 and f & RSI_REGAIN_EMA:
+            buy_count += 1
+        if buy_level == 4 and f & RSI_REGAIN_WMA:
+            event |= EVENT_BUY_2
+            buy_level = 0
+            buy_count = 0
+            buy_entries = 0
+        if f & OVERSOLD:
+            buy_level = 0
+            buy_count = 0
+            buy_entries = 0
+        
+        # SELL logic (_process_sell_logic)
+        if f & OVERSOLD and sell_level < 1:
+            sell_level = 1
+        if sell_level == 1 and f & RSI_OVER_EMA:
+            sell_level = 2
+        if sell_level == 2 and f & RSI_OVER_WMA:
+            sell_level = 3
+        if sell_level == 3 and f & EMA_OVER_WMA:
+            sell_level = 4
+        if sell_level == 4 and f & RSI_LOSE_EMA:
+            sell_count += 1
+        if sell_level == 4 and f & RSI_LOSE_WMA:
+            event |= EVENT_SELL_2
+            sell_level = 0
+            sell_count = 0
+            sell_entries = 0
+        if f & OVERBOUGHT:
+            sell_level = 0
+            sell_count = 0
+            sell_entries = 0
+        
+        # BUY #1 / SELL #1 (get_signals)
+        if buy_level == 4 and buy_count >= 2 and buy_entries < 2 and f & RSI_REGAIN_EMA:
+            event |= EVENT_BUY_1
+            buy_entries += 1
+        if sell_level == 4 and sell_count >= 2 and sell_entries < 2 and f & RSI_LOSE_EMA:
+            event |= EVENT_SELL_1
+            sell_entries += 1
+        
+        events[i] = event
+
+
+def signal_events(rsi: np.ndarray, ema9: np.ndarray, wma45: np.ndarray,
+                  overbought: float = 80, oversold: float = 20) -> np.ndarray:
+    """
+    Run the step state machine over precomputed series
+    
+    Returns:
+        EVENT_* bitmask per bar 1..n-1 of the series (0 = no signal)
+    """
+    events = np.zeros(max(len(rsi) - 1, 0), dtype=np.int32)
+    if not len(events):
+        return events
+    
+    flags = condition_flags(rsi, ema9, wma45, overbought, oversold)
+    if NUMBA_AVAILABLE:
+        _run_steps(flags, events)
+    else:
+        # Bars without any flag can't change state: only visit flagged
+        # bars, as plain Python ints
+        bars = np.flatnonzero(flags)
+        fired = [0] * len(bars)
+        _run_steps(flags[bars].tolist(), fired)
+        events[bars] = fired
+    return events
+
+
+def run_backtest(klines: Klines, rsi_length: int = 14, ema_length: int = 9,
+                 wma_length: int = 45, rsi_mode: str = RSI_MODE_WILDER,
+                 overbought: float = 80, oversold: float = 20) -> Dict:
+    """
+    Replay the 4-step setup over closed klines
+    
+    BUY/SELL #1 events are what get_signals reports when every candle is
+    fed to RSIFollowTrend in streaming mode. #2 events are the entries the
+    step logic counts in total_buy_2/total_sell_2; get_signals never
+    reports them, since the step logic resets the setup on the same update.
+    
+    Args:
+        klines: Closed candles in chronological order (CandleSeries,
+            structured kline array or list of kline dictionaries)
+    
+    Returns:
+        Dict with 'events' (timestamp, signal, close, rsi, ema9, wma45 per
+        signal, in order), 'statistics' (totals like get_statistics) and
+        'bars' (number of candles)
+    """
+    timestamps, closes = kline_columns(klines)
+    rsi, ema9, wma45 = indicator_series(closes, rsi_length, ema_length, wma_length, rsi_mode)
+    
+    events = signal_events(rsi, ema9, wma45, overbought, oversold)
+    
+    # Event i belongs to indicator bar i + 1, i.e. candle i + 1 + rsi_length
+    offset = rsi_length + 1
+    result = []
+    for i in np.flatnonzero(events).tolist():
+        for bit, name in SIGNAL_NAMES.items():
+            if events[i] & bit:
+                result.append({
+                    'timestamp': int(timestamps[i + offset]),
+                    'signal': name,
+                    'close': float(closes[i + offset]),
+                    'rsi': float(rsi[i + 1]),
+                    'ema9': float(ema9[i + 1]),
+                    'wma45': float(wma45[i + 1]),
+                })
+    
+    return {
+        'events': result,
+        'statistics': {
+            'total_buy_1': int(np.count_nonzero(events & EVENT_BUY_1)),
+            'total_buy_2': int(np.count_nonzero(events & EVENT_BUY_2)),
+            'total_sell_1': int(np.count_nonzero(events & EVENT_SELL_1)),
+            'total_sell_2': int(np.count_nonzero(events & EVENT_SELL_2)),
+        },
+        'bars': len(closes),
+    }
+
+
+def add_source_arguments(parser: argparse.ArgumentParser):
+    """Command line options for where klines are read from"""
+    parser.add_argument('csv', nargs='?', help='Klines CSV (timestamp,open,high,low,close,volume)')
+    parser.add_argument('--symbol', help='Read from the candle store instead (e.g. BTCUSD)')
+    parser.add_argument('--interval', default='1m', help='Candle store interval')
+    parser.add_argument('--data-dir', help='Candle store directory (default: DATA_DIR)')
+    parser.add_argument('--start', help='First candle (YYYY-MM-DD, UTC)')
+    parser.add_argument('--end', help='Stop before this date (YYYY-MM-DD, UTC)')
+
+
+def load_source(args: argparse.Namespace) -> np.ndarray:
+    """
+    Klines selected by add_source_arguments options
+    
+    Candle store reads are memory-mapped, so only the columns a run touches
+    are paged in.
+    """
+    def to_ms(date):
+        return None if date is None else int(np.datetime64(date, 'ms').astype(np.int64))
+    
+    if args.symbol:
+        from candle_store import CandleStore
+        from config import DATA_DIR
+        store = CandleStore(args.data_dir or DATA_DIR)
+        return store.read(args.symbol, args.interval, to_ms(args.start), to_ms(args.end))
+    
+    if not args.csv:
+        raise SystemExit("Give a CSV file or --symbol to read from the candle store")
+    klines = load_csv(args.csv)
+    start, end = to_ms(args.start), to_ms(args.end)
+    if start is not None:
+        klines = klines[klines['timestamp'] >= start]
+    if end is not None:
+        klines = klines[klines['timestamp'] < end]
+    return klines
+
+
+def load_csv(path: str) -> np.ndarray:
+    """
+    Load klines from a CSV file with a header row containing
+    timestamp (ms), open, high, low, close and volume columns
+    """
+    data = np.genfromtxt(path, delimiter=',', names=True, dtype=None, encoding='utf-8')
+    klines = np.empty(data.size, dtype=KLINE_DTYPE)
+    for field in KLINE_FIELDS:
+        klines[field] = data[field]
+    return klines
+
+
+if __name__ == '__main__':
+    from datetime import datetime, timezone
+    from config import OVERBOUGHT_LEVEL, OVERSOLD_LEVEL
+    
+    parser = argparse.ArgumentParser(description='Backtest the RSI Follow Trend setup')
+    add_source_arguments(parser)
+    parser.add_argument('--rsi-mode', default=RSI_MODE_WILDER)
+    parser.add_argument('--overbought', type=float, default=OVERBOUGHT_LEVEL)
+    parser.add_argument('--oversold', type=float, default=OVERSOLD_LEVEL)
+    parser.add_argument('--last', type=int, default=20, help='Number of events to print')
+    args = parser.parse_args()
+    
+    klines = load_source(args)
+    started = time.perf_counter()
+    report = run_backtest(klines, rsi_mode=args.rsi_mode,
+                          overbought=args.overbought, oversold=args.oversold)
+    elapsed = time.perf_counter() - started
+    
+    print(f"{report['bars']} bars in {elapsed:.2f}s (numba: {NUMBA_AVAILABLE})")
+    print(report['statistics'])
+    for event in report['events'][-args.last:]:
+        when = datetime.fromtimestamp(event['timestamp'] / 1000, tz=timezone.utc)
+        print(f"{when:%Y-%m-%d %H:%M}  {event['signal']:<6}  close={event['close']:.2f}  rsi={event['rsi']:.2f}")
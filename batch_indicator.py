@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batched RSI Follow Trend evaluation
+Indicators and step transitions for many pairs in one NumPy pass over a
+(pairs x bars) close matrix
+"""
+
+import numpy as np
+from typing import List, Dict, Optional, Sequence, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+from rsi_indicator import RSIFollowTrend, RSI_MODE_WILDER, RSI_MODE_SMA
+
+# Per-pair state gathered from / written back to RSIFollowTrend
+BUY_STEPS = (
+    'buy_step1_touched_overbought',
+    'buy_step2_crossed_ema9_down',
+    'buy_step3_crossed_wma45_down',
+    'buy_step4_ema9_crossed_wma45_down',
+)
+SELL_STEPS = (
+    'sell_step1_touched_oversold',
+    'sell_step2_crossed_ema9_up',
+    'sell_step3_crossed_wma45_up',
+    'sell_step4_ema9_crossed_wma45_up',
+)
+COUNTERS = (
+    'buy_rsi_ema9_cross_count', 'buy_entry1_count',
+    'sell_rsi_ema9_cross_count', 'sell_entry1_count',
+    'total_buy_1', 'total_buy_2', 'total_sell_1', 'total_sell_2',
+)
+
+
+def _expanding_mean(values: np.ndarray) -> np.ndarray:
+    """Row-wise mean of values[:, :j+1] for every j"""
+    return np.cumsum(values, axis=1) / np.arange(1, values.shape[1] + 1)
+
+
+def rsi_matrix(prices: np.ndarray, period: int, mode: str = RSI_MODE_WILDER) -> np.ndarray:
+    """
+    rsi_series for every row of a (pairs x bars) price matrix
+    
+    The Wilder recursion steps over bars once, each step vectorized over
+    all pairs.
+    """
+    prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+    pairs, n = prices.shape
+    rsi = np.full((pairs, n), 50.0)
+    if n < period + 1:
+        return rsi
+    
+    deltas = np.diff(prices, axis=1)
+    gains = np.maximum(deltas, 0.0)
+    losses = np.maximum(-deltas, 0.0)
+    
+    if mode == RSI_MODE_WILDER:
+        avg_gain = np.empty((pairs, n - period))
+        avg_loss = np.empty((pairs, n - period))
+        g = gains[:, :period].mean(axis=1)
+        l = losses[:, :period].mean(axis=1)
+        avg_gain[:, 0] = g
+        avg_loss[:, 0] = l
+        alpha = 1.0 / period
+        for j in range(period, n - 1):
+            g = g + alpha * (gains[:, j] - g)
+            l = l + alpha * (losses[:, j] - l)
+            avg_gain[:, j - period + 1] = g
+            avg_loss[:, j - period + 1] = l
+    elif mode == RSI_MODE_SMA:
+        zeros = np.zeros((pairs, 1))
+        gain_sum = np.cumsum(np.hstack((zeros, gains)), axis=1)
+        loss_sum = np.cumsum(np.hstack((zeros, losses)), axis=1)
+        avg_gain = (gain_sum[:, period:] - gain_sum[:, :-period]) / period
+        avg_loss = (loss_sum[:, period:] - loss_sum[:, :-period]) / period
+    else:
+        raise ValueError(f"Unknown RSI mode: {mode}")
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi[:, period:] = np.where(avg_loss == 0, 100.0, values)
+    return rsi
+
+
+def ema_matrix(values: np.ndarray, period: int) -> np.ndarray:
+    """ema_series for every row of a (pairs x bars) matrix"""
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    n = values.shape[1]
+    if n == 0:
+        return values.copy()
+    
+    result = _expanding_mean(values)
+    if n < period:
+        return result
+    
+    multiplier = 2 / (period + 1)
+    acc = values[:, 0]
+    for j in range(1, n):
+        acc = (values[:, j] * multiplier) + (acc * (1 - multiplier))
+        if j >= period - 1:
+            result[:, j] = acc
+    return result
+
+
+def wma_matrix(values: np.ndarray, period: int) -> np.ndarray:
+    """wma_series for every row of a (pairs x bars) matrix"""
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    n = values.shape[1]
+    if n == 0:
+        return values.copy()
+    
+    result = _expanding_mean(values)
+    if n < period:
+        return result
+    
+    weights = np.arange(1, period + 1, dtype=np.float64)
+    result[:, period - 1:] = sliding_window_view(values, period, axis=1) @ weights / weights.sum()
+    return result
+
+
+class BatchIndicatorEngine:
+    """
+    Evaluate many windowed (non-streaming) RSIFollowTrend instances at once
+    
+    All indicators must share the engine's lengths and RSI mode; the
+    overbought/oversold levels may differ per pair. update() is equivalent
+    to calling indicator.update() and then indicator.get_signals() on every
+    pair, but computes the indicators with matrix ops and runs the step
+    transitions as boolean array ops before writing the state back.
+    """
+    
+    def __init__(self, rsi_length: int = 14, ema_length: int = 9, wma_length: int = 45,
+                 rsi_mode: str = RSI_MODE_WILDER):
+        self.rsi_length = rsi_length
+        self.ema_length = ema_length
+        self.wma_length = wma_length
+        self.rsi_mode = rsi_mode
+    
+    @property
+    def min_bars(self) -> int:
+        """Bars needed before update() computes anything"""
+        return max(self.rsi_length, self.ema_length, self.wma_length) + 10
+    
+    @staticmethod
+    def group_rows(closes: Sequence[np.ndarray]) -> List[Tuple[List[int], np.ndarray]]:
+        """Close arrays of equal length stacked into one matrix, with their row indices"""
+        groups: Dict[int, List[int]] = {}
+        for i, row in enumerate(closes):
+            groups.setdefault(len(row), []).append(i)
+        return [(rows, np.vstack([closes[i] for i in rows])) for rows in groups.values()]
+    
+    @staticmethod
+    def row_signals(signals: Dict[str, np.ndarray], k: int) -> Optional[Dict[str, bool]]:
+        """get_signals-style dict for row k of update()'s result, or None if not updated"""
+        if not signals['updated'][k]:
+            return None
+        return {name: bool(signals[name][k]) for name in ('buy_1', 'buy_2', 'sell_1', 'sell_2')}
+    
+    def compute(self, closes: np.ndarray):
+        """
+        Current RSI, EMA9 and WMA45 for every row of a (pairs x bars) close
+        matrix, the same values RSIFollowTrend.update() computes per pair
+        
+        Returns:
+            (rsi, ema9, wma45) arrays of shape (pairs,)
+        """
+        rsi = rsi_matrix(closes, self.rsi_length, self.rsi_mode)[:, self.rsi_length:]
+        ema9 = ema_matrix(rsi, self.ema_length)[:, -1]
+        window = rsi[:, -self.wma_length:]
+        if window.shape[1] < self.wma_length:
+            wma45 = window.mean(axis=1)
+        else:
+            weights = np.arange(1, self.wma_length + 1, dtype=np.float64)
+            wma45 = window @ weights / weights.sum()
+        return rsi[:, -1], ema9, wma45
+    
+    def update(self, indicators: Sequence[RSIFollowTrend], closes: np.ndarray,
+               values: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+        """
+        Update every indicator from its row of a (pairs x bars) close matrix
+        
+        Args:
+            values: compute(closes), if it was already run (e.g. in an executor)
+        
+        Returns:
+            Boolean arrays 'buy_1', 'buy_2', 'sell_1', 'sell_2' (like
+            get_signals) plus 'updated' (False if there were too few bars)
+        """
+        closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+        count = len(indicators)
+        if closes.shape[0] != count:
+            raise ValueError("closes must have one row per indicator")
+        for indicator in indicators:
+            if indicator.streaming:
+                raise ValueError("streaming indicators advance per candle, not in batches")
+            if (indicator.rsi_length, indicator.ema_length, indicator.wma_length,
+                    indicator.rsi_mode) != (self.rsi_length, self.ema_length,
+                                            self.wma_length, self.rsi_mode):
+                raise ValueError("indicator settings differ from the engine's")
+        
+        signals = {name: np.zeros(count, dtype=bool) for name in ('buy_1', 'buy_2', 'sell_1', 'sell_2')}
+        if closes.shape[1] < self.min_bars:
+            signals['updated'] = np.zeros(count, dtype=bool)
+            return signals
+        signals['updated'] = np.ones(count, dtype=bool)
+        
+        rsi, ema, wma = values if values is not None else self.compute(closes)
+        
+        # Gather per-pair state
+        def gather(name, dtype, default=None):
+            return np.array([
+                default if getattr(ind, name) is None else getattr(ind, name) for ind in indicators
+            ], dtype=dtype)
+        
+        prev_rsi = gather('current_rsi', np.float64, np.nan)
+        prev_ema = gather('current_ema9', np.float64, np.nan)
+        prev_wma = gather('current_wma45', np.float64, np.nan)
+        overbought = gather('overbought', np.float64)
+        oversold = gather('oversold', np.float64)
+        buy = [gather(name, bool) for name in BUY_STEPS]
+        sell = [gather(name, bool) for name in SELL_STEPS]
+        counters = {name: gather(name, np.int64) for name in COUNTERS}
+        
+        # Step logic only runs once a previous value exists
+        active = ~np.isnan(prev_rsi)
+        with np.errstate(invalid='ignore'):
+            rsi_down_ema = (prev_rsi >= prev_ema) & (rsi < ema)
+            rsi_down_wma = (prev_rsi >= prev_wma) & (rsi < wma)
+            ema_down_wma = (prev_ema >= prev_wma) & (ema < wma)
+            rsi_up_ema = (prev_rsi <= prev_ema) & (rsi > ema)
+            rsi_up_wma = (prev_rsi <= prev_wma) & (rsi > wma)
+            ema_up_wma = (prev_ema <= prev_wma) & (ema > wma)
+            rsi_regain_ema = (prev_rsi < prev_ema) & (rsi >= ema)
+            rsi_regain_wma = (prev_rsi < prev_wma) & (rsi >= wma)
+            rsi_lose_ema = (prev_rsi > prev_ema) & (rsi <= ema)
+            rsi_lose_wma = (prev_rsi > prev_wma) & (rsi <= wma)
+        at_overbought = active & (rsi >= overbought)
+        at_oversold = active & (rsi <= oversold)
+        
+        # BUY logic (_process_buy_logic)
+        buy[0] |= at_overbought
+        buy[1] |= active & buy[0] & rsi_down_ema
+        buy[2] |= active & buy[1] & rsi_down_wma
+        buy[3] |= active & buy[2] & ema_down_wma
+        counters['buy_rsi_ema9_cross_count'] += active & buy[3] & rsi_regain_ema
+        buy_2 = active & buy[3] & rsi_regain_wma
+        counters['total_buy_2'] += buy_2
+        reset = buy_2 | at_oversold
+        for step in buy:
+            step &= ~reset
+        counters['buy_rsi_ema9_cross_count'][reset] = 0
+        counters['buy_entry1_count'][reset] = 0
+        
+        # SELL logic (_process_sell_logic)
+        sell[0] |= at_oversold
+        sell[1] |= active & sell[0] & rsi_up_ema
+        sell[2] |= active & sell[1] & rsi_up_wma
+        sell[3] |= active & sell[2] & ema_up_wma
+        counters['sell_rsi_ema9_cross_count'] += active & sell[3] & rsi_lose_ema
+        sell_2 = active & sell[3] & rsi_lose_wma
+        counters['total_sell_2'] += sell_2
+        reset = sell_2 | at_overbought
+        for step in sell:
+            step &= ~reset
+        counters['sell_rsi_ema9_cross_count'][reset] = 0
+        counters['sell_entry1_count'][reset] = 0
+        
+        # Signals (get_signals)
+        signals['buy_1'] = (active & buy[3] & (counters['buy_rsi_ema9_cross_count'] >= 2)
+                            & (counters['buy_entry1_count'] < 2) & rsi_regain_ema)
+        signals['buy_2'] = active & buy[3] & rsi_regain_wma
+        signals['sell_1'] = (active & sell[3] & (counters['sell_rsi_ema9_cross_count'] >= 2)
+                             & (counters['sell_entry1_count'] < 2) & rsi_lose_ema)
+        signals['sell_2'] = active & sell[3] & rsi_lose_wma
+        counters['buy_entry1_count'] += signals['buy_1']
+        counters['total_buy_1'] += signals['buy_1']
+        counters['sell_entry1_count'] += signals['sell_1']
+        counters['total_sell_1'] += signals['sell_1']
+        
+        # Write state back
+        columns = {
+            'current_rsi': rsi.tolist(),
+            'current_ema9': ema.tolist(),
+            'current_wma45': wma.tolist(),
+        }
+        columns.update({name: values.tolist() for name, values in zip(BUY_STEPS + SELL_STEPS, buy + sell)})
+        columns.update({name: values.tolist() for name, values in counters.items()})
+        for i, indicator in enumerate(indicators):
+            indicator.prev_rsi = indicator.current_rsi
+            indicator.prev_ema9 = indicator.current_ema9
+            indicator.prev_wma45 = indicator.current_wma45
+            for name, values in columns.items():
+                setattr(indicator, name, values[i])
+        
+        return signals
+    
+    def update_many(self, indicators: Sequence[RSIFollowTrend],
+                    closes: Sequence[np.ndarray]) -> List[Optional[Dict[str, bool]]]:
+        """
+        Update indicators from close arrays of possibly different lengths
+        
+        Pairs with the same number of bars share one matrix pass.
+        
+        Returns:
+            get_signals-style dict per indicator, or None if it wasn't updated
+        """
+        results: List[Optional[Dict[str, bool]]] = [None] * len(indicators)
+        for rows, matrix in self.group_rows(closes):
+            signals = self.update([indicators[i] for i in rows], matrix)
+            for k, i in enumerate(rows):
+                results[i] = self.row_signals(signals, k)
+        return results
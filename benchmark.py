@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the indicator, parsing and scan hot paths
+Reports ops/s, p50/p99 latency and peak memory per case, saves JSON
+baselines and flags regressions against a saved baseline
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+import zlib
+import numpy as np
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from candles import KLINE_DTYPE, CandleSeries
+from rsi_indicator import RSIFollowTrend
+from batch_indicator import BatchIndicatorEngine
+from backtest import add_source_arguments, load_source
+from exchange_client import INTERVAL_MS, parse_binance_klines, parse_twelve_data_values, json_loads
+from config import RSI_LENGTH, EMA_LENGTH, WMA_LENGTH, RSI_MODE, TIMEFRAMES
+
+BAR_SIZES = (100, 1_000, 100_000)
+PAIR_COUNTS = (4, 100, 1_000)
+
+
+def synthetic_klines(n: int, seed: int = 0, interval_ms: int = 60_000,
+                     end: Optional[int] = None) -> np.ndarray:
+    """Random-walk klines (structured KLINE_DTYPE array) ending at `end` (ms)"""
+    rng = np.random.default_rng(seed)
+    closes = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    end = end if end is not None else int(time.time() * 1000) // interval_ms * interval_ms
+    
+    klines = np.empty(n, dtype=KLINE_DTYPE)
+    klines['timestamp'] = end - interval_ms * np.arange(n - 1, -1, -1, dtype=np.int64)
+    klines['open'] = np.concatenate(([closes[0]], closes[:-1]))
+    klines['high'] = np.maximum(klines['open'], closes) * (1 + rng.uniform(0, 0.001, n))
+    klines['low'] = np.minimum(klines['open'], closes) * (1 - rng.uniform(0, 0.001, n))
+    klines['close'] = closes
+    klines['volume'] = rng.uniform(1, 100, n)
+    return klines
+
+
+def binance_rows(klines: np.ndarray) -> list:
+    """Klines as Binance /klines JSON rows"""
+    return [
+        [int(t), f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v:.8f}", int(t) + 59_999, "0", 1, "0", "0", "0"]
+        for t, o, h, l, c, v in klines.tolist()
+    ]
+
+
+def twelve_data_values(klines: np.ndarray) -> List[Dict]:
+    """Klines as Twelve Data time_series values (newest first)"""
+    return [
+        {
+            'datetime': datetime.fromtimestamp(t / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            'open': f"{o:.5f}", 'high': f"{h:.5f}", 'low': f"{l:.5f}", 'close': f"{c:.5f}", 'volume': f"{v:.0f}",
+        }
+        for t, o, h, l, c, v in reversed(klines.tolist())
+    ]
+
+
+def measure(fn: Callable[[], object], min_time: float = 1.0, min_runs: int = 5,
+            max_runs: int = 10_000) -> Dict:
+    """
+    Time repeated calls of fn
+    
+    Runs at least `min_runs` times and until `min_time` seconds have passed
+    (at most `max_runs`). Peak memory is traced on one extra call, since
+    tracemalloc slows everything else down.
+    """
+    fn()  # warm-up
+    
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - t0)
+    
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    
+    samples = np.array(samples, dtype=np.float64) / 1e6
+    return {
+        'runs': len(samples),
+        'ops_per_sec': float(1000.0 / samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'peak_kb': peak / 1024,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Fake exchanges for the scan cycle
+# ---------------------------------------------------------------------------
+
+class FakeExchange:
+    """
+    Local stand-in for the Binance and Twelve Data REST endpoints
+    
+    Serves deterministic random-walk candles for any symbol, honours
+    startTime/limit and outputsize so delta fetches behave as in production,
+    and keeps the last candle moving like a forming one.
+    """
+    
+    HISTORY = 500
+    
+    def __init__(self):
+        self._klines = {}
+        self.requests = 0
+        self.runner = None
+        self.base_url = None
+    
+    def klines(self, symbol: str, interval: str) -> np.ndarray:
+        key = (symbol, interval)
+        if key not in self._klines:
+            self._klines[key] = synthetic_klines(self.HISTORY, seed=zlib.crc32(f'{symbol}_{interval}'.encode()),
+                                                 interval_ms=INTERVAL_MS[interval])
+        klines = self._klines[key]
+        # Forming candle ticks on every request
+        klines['close'][-1] *= 1 + np.random.normal(0, 0.0005)
+        return klines
+    
+    async def _binance_klines(self, request):
+        from aiohttp import web
+        self.requests += 1
+        query = request.query
+        klines = self.klines(query['symbol'], query['interval'])
+        limit = int(query.get('limit', 500))
+        if 'startTime' in query:
+            klines = klines[klines['timestamp'] >= int(query['startTime'])][:limit]
+        else:
+            klines = klines[-limit:]
+        return web.json_response(binance_rows(klines))
+    
+    async def _twelve_data_series(self, request):
+        from aiohttp import web
+        self.requests += 1
+        query = request.query
+        symbols = query['symbol'].split(',')
+        size = int(query.get('outputsize', 30))
+        # '15min' / '1day' -> '15m' / '1d'
+        interval = query['interval'].replace('min', 'm').replace('day', 'd')
+        data = {
+            symbol: {'values': twelve_data_values(self.klines(symbol, interval)[-size:]), 'status': 'ok'}
+            for symbol in symbols
+        }
+        return web.json_response(data[symbols[0]] if len(symbols) == 1 else data)
+    
+    async def _price(self, request):
+        from aiohttp import web
+        self.requests += 1
+        return web.json_response({'price': '100.0'})
+    
+    async def start(self):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get('/klines', self._binance_klines)
+        app.router.add_get('/time_series', self._twelve_data_series)
+        app.router.add_get('/ticker/price', self._price)
+        app.router.add_get('/price', self._price)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+    
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def scan_bot(pairs: int, exchange: FakeExchange):
+    """TradingBot watching `pairs` pairs (half Binance, half Twelve Data) on the fake exchange"""
+    from bot import TradingBot
+    from rate_limiter import RequestScheduler
+    from registry import PROVIDER_BINANCE, PROVIDER_TWELVE_DATA
+    
+    bot = TradingBot()
+    bot.candle_store = None
+    for client in (bot.binance_client, bot.twelve_data_client):
+        client.BASE_URL = exchange.base_url
+        # Measure the pipeline, not the production rate limits
+        client.scheduler = RequestScheduler('benchmark', 10**9)
+    bot.twelve_data_client.api_key = 'benchmark'
+    
+    async def no_alert(*args, **kwargs):
+        pass
+    bot.send_signal_alert = no_alert
+    
+    symbols = max(1, pairs // len(TIMEFRAMES))
+    for symbol in bot.registry.symbols():
+        bot.registry.remove(symbol)
+    for i in range(symbols):
+        provider = PROVIDER_BINANCE if i % 2 == 0 else PROVIDER_TWELVE_DATA
+        bot.registry.add(f"S{i:04d}USD", provider)
+    return bot
+
+
+# ---------------------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------------------
+
+def indicator_cases(klines: np.ndarray, label: str, sizes=BAR_SIZES) -> Dict[str, Callable]:
+    """RSIFollowTrend.update and the calculate_* helpers on the last n bars"""
+    cases = {}
+    for n in sizes:
+        if n > len(klines):
+            continue
+        window = np.ascontiguousarray(klines[-n:])
+        closes = window['close'].copy()
+        indicator = RSIFollowTrend(RSI_LENGTH, EMA_LENGTH, WMA_LENGTH, rsi_mode=RSI_MODE)
+        series = CandleSeries.from_array(window)
+        
+        cases[f"indicator.update[{label},{n}]"] = lambda i=indicator, s=series: i.update(s)
+        cases[f"calculate_rsi[{label},{n}]"] = lambda i=indicator, c=closes: i.calculate_rsi(c, RSI_LENGTH)
+        cases[f"calculate_ema[{label},{n}]"] = lambda i=indicator, c=closes: i.calculate_ema(c, EMA_LENGTH)
+        cases[f"calculate_wma[{label},{n}]"] = lambda i=indicator, c=closes: i.calculate_wma(c, WMA_LENGTH)
+    return cases
+
+
+def parsing_cases(klines: np.ndarray, label: str, sizes=BAR_SIZES) -> Dict[str, Callable]:
+    """Decoding + parsing of Binance and Twelve Data responses"""
+    cases = {}
+    for n in sizes:
+        if n > len(klines):
+            continue
+        window = klines[-n:]
+        binance = json.dumps(binance_rows(window)).encode()
+        twelve = json.dumps({'values': twelve_data_values(window)}).encode()
+        
+        cases[f"parse_binance[{label},{n}]"] = lambda b=binance: parse_binance_klines(json_loads(b))
+        cases[f"parse_twelve_data[{label},{n}]"] = lambda b=twelve: parse_twelve_data_values(json_loads(b)['values'])
+    return cases
+
+
+def batch_cases(pair_counts=PAIR_COUNTS, bars: int = 100) -> Dict[str, Callable]:
+    """BatchIndicatorEngine.update_many over many pairs"""
+    cases = {}
+    for pairs in pair_counts:
+        engine = BatchIndicatorEngine(RSI_LENGTH, EMA_LENGTH, WMA_LENGTH, RSI_MODE)
+        indicators = [RSIFollowTrend(RSI_LENGTH, EMA_LENGTH, WMA_LENGTH, rsi_mode=RSI_MODE) for _ in range(pairs)]
+        closes = [synthetic_klines(bars, seed=i)['close'] for i in range(pairs)]
+        cases[f"batch_update[{pairs} pairs]"] = lambda e=engine, i=indicators, c=closes: e.update_many(i, c)
+    return cases
+
+
+def run_scan_cases(pair_counts=PAIR_COUNTS, min_time: float = 1.0, selected=None) -> Dict[str, Dict]:
+    """Full check_signals cycles against the fake exchange"""
+    results = {}
+    loop = asyncio.new_event_loop()
+    exchange = FakeExchange()
+    loop.run_until_complete(exchange.start())
+    try:
+        for pairs in pair_counts:
+            name = f"check_signals[{pairs} pairs]"
+            if selected is not None and not selected(name):
+                continue
+            bot = scan_bot(pairs, exchange)
+            loop.run_until_complete(bot.check_signals(None))  # initial full fetch
+            exchange.requests = 0
+            result = measure(lambda: loop.run_until_complete(bot.check_signals(None)), min_time=min_time)
+            result['requests_per_op'] = exchange.requests / (result['runs'] + 2)
+            results[name] = result
+            loop.run_until_complete(bot.stop_streams(None))
+    finally:
+        loop.run_until_complete(exchange.stop())
+        loop.close()
+    return results
+
+
+def run_benchmarks(recorded: Optional[np.ndarray] = None, min_time: float = 1.0,
+                   pattern: Optional[str] = None, scan: bool = True) -> Dict[str, Dict]:
+    """Run every case (optionally only names containing `pattern`)"""
+    def selected(name):
+        return pattern is None or pattern in name
+    
+    synthetic = synthetic_klines(max(BAR_SIZES))
+    cases = {}
+    cases.update(indicator_cases(synthetic, 'synthetic'))
+    cases.update(parsing_cases(synthetic, 'synthetic'))
+    if recorded is not None and len(recorded):
+        cases.update(indicator_cases(recorded, 'recorded'))
+        cases.update(parsing_cases(recorded, 'recorded'))
+    cases.update(batch_cases())
+    
+    results = {}
+    for name, fn in cases.items():
+        if selected(name):
+            results[name] = measure(fn, min_time=min_time)
+            print_result(name, results[name])
+    
+    if scan:
+        for name, result in run_scan_cases(min_time=min_time, selected=selected).items():
+            results[name] = result
+            print_result(name, result)
+    return results
+
+
+def print_result(name: str, result: Dict):
+    print(f"{name:<42} {result['ops_per_sec']:>12,.1f} ops/s  p50 {result['p50_ms']:>9.3f} ms  "
+          f"p99 {result['p99_ms']:>9.3f} ms  peak {result['peak_kb']:>9,.0f} KiB", flush=True)
+
+
+def save_baseline(results: Dict[str, Dict], path: str):
+    data = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """
+    Cases that got slower than the baseline by more than `threshold`
+    (throughput down or median latency up; p99 of short runs is too noisy
+    to gate on)
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        throughput = result['ops_per_sec'] / base['ops_per_sec'] - 1
+        latency = result['p50_ms'] / base['p50_ms'] - 1 if base['p50_ms'] else 0.0
+        if throughput < -threshold or latency > threshold:
+            regressions.append(f"{name}: ops/s {throughput:+.0%}, p50 {latency:+.0%}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark indicator, parsing and scan hot paths')
+    add_source_arguments(parser)
+    parser.add_argument('--filter', help='Only run cases whose name contains this text')
+    parser.add_argument('--min-time', type=float, default=1.0, help='Seconds to spend per case')
+    parser.add_argument('--no-scan', action='store_true', help='Skip the check_signals cycles')
+    parser.add_argument('--save', help='Write results as a JSON baseline')
+    parser.add_argument('--compare', help='Baseline JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown (0.2 = 20%%)')
+    args = parser.parse_args()
+    
+    # Keep per-scan log lines out of the report
+    logging.basicConfig(level=logging.WARNING)
+    
+    recorded = load_source(args) if (args.csv or args.symbol) else None
+    results = run_benchmarks(recorded, min_time=args.min_time, pattern=args.filter, scan=not args.no_scan)
+    
+    if args.save:
+        save_baseline(results, args.save)
+        print(f"Saved baseline to {args.save}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
@@ -2,20 +2,45 @@
 # -*- coding: utf-8 -*-
 """
 Telegram Trading Bot - RSI Follow Trend
-Monitors BTC/USD and XAU/USD on 15m and 1h timeframes
+Monitors the configured symbols (BTC/USD and XAU/USD by default) on 15m and
+1h timeframes
 """
 
 import os
+import time
 import asyncio
 import logging
-from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
-from rsi_indicator import RSIFollowTrend
-from exchange_client import BinanceClient, TwelveDataClient
+from rsi_indicator import RSIFollowTrend, window_values
+from batch_indicator import BatchIndicatorEngine
+from candles import CandleSeries
+from candle_store import CandleStore
+from snapshot import save_snapshot, load_snapshot
+from broadcast import BroadcastDispatcher
+from scheduler import CandleCloseScheduler, next_boundary
+from profiler import ScanProfiler
+from compute import ComputeStage
+from shard import ShardSupervisor, IndicatorView, shard_of
+from messages import (
+    RenderCache, render_indicators, render_setup, render_stats,
+    setup_fields, alert_message, status_message
+)
+from registry import SymbolRegistry, Instrument, PROVIDER_BINANCE, PROVIDER_TWELVE_DATA, display_name
+from exchange_client import BinanceClient, TwelveDataClient, HTTPSessionFactory, INTERVAL_MS, dicts_to_klines
+from metrics import (
+    MetricsServer, INDICATOR_SECONDS, SCAN_SECONDS, SCAN_OVERRUNS, WATCHED_PAIRS, SIGNALS,
+    BROADCAST_QUEUE_DEPTH, SUBSCRIBERS, RATE_LIMIT_TOKENS, RATE_LIMIT_WAITING, EVENT_LOOP_LAG
+)
 from config import (
     TELEGRAM_TOKEN, SYMBOLS, TIMEFRAMES, 
-    CHECK_INTERVAL, ADMIN_CHAT_IDS
+    CHECK_INTERVAL, ADMIN_CHAT_IDS, KLINE_LIMIT, STATUS_PAGE_SIZE,
+    RSI_LENGTH, EMA_LENGTH, WMA_LENGTH, RSI_MODE, INDICATOR_STREAMING,
+    BINANCE_INGESTION, OVERBOUGHT_LEVEL, OVERSOLD_LEVEL, DATA_DIR, KLINE_CACHE_SIZE,
+    SNAPSHOT_PATH, SNAPSHOT_INTERVAL, SCAN_SCHEDULE,
+    METRICS_ENABLED, PORT, HEALTH_MAX_SCAN_AGE, HEALTH_MAX_LOOP_LAG, PROFILE_SCANS, SHARD_WORKERS,
+    COMPUTE_EXECUTOR
 )
 
 # Setup logging
@@ -26,37 +51,121 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class TradingBot:
-    def __init__(self):
-        self.binance_client = BinanceClient()
-        self.twelve_data_client = TwelveDataClient()
-        self.indicators = {}
+    def __init__(self, shard: Optional[Tuple[int, int]] = None,
+                 emit: Optional[Callable[[tuple], None]] = None):
+        """
+        Args:
+            shard: (index, count) when running as a scan worker: only pairs
+                with shard_of() == index are scanned
+            emit: Scan worker's event sink; replaces Telegram alerts
+        """
+        self.shard = shard
+        self.emit = emit
+        # With SHARD_WORKERS this (Telegram) process scans nothing itself
+        self.frontend = shard is None and SHARD_WORKERS > 0
+        # Every process of a sharded bot gets an equal part of the API limits
+        # (at least one request's worth; Twelve Data batches shrink to fit)
+        processes = shard[1] + 1 if shard else SHARD_WORKERS + 1
+        
+        # One connection pool shared by both exchange clients
+        self.http = HTTPSessionFactory()
+        self.binance_client = BinanceClient(session_factory=self.http, rate_share=1 / processes)
+        self.twelve_data_client = TwelveDataClient(session_factory=self.http, rate_share=1 / processes)
+        # Closed candles persisted across restarts
+        self.candle_store = CandleStore(DATA_DIR) if DATA_DIR else None
+        # Watched symbols, their data source and (lazily created) indicators
+        self.registry = SymbolRegistry(
+            {PROVIDER_BINANCE: self.binance_client, PROVIDER_TWELVE_DATA: self.twelve_data_client},
+            TIMEFRAMES, self.create_indicator
+        )
+        # Windowed (non-streaming) indicators are evaluated together per scan
+        self.batch_engine = BatchIndicatorEngine(RSI_LENGTH, EMA_LENGTH, WMA_LENGTH, RSI_MODE)
         self.subscribers = set()
         self.last_signals = {}
+        # Indicator parts of messages, re-rendered only after an update
+        self.render_cache = RenderCache()
+        # Alerts are queued and delivered in the background; chats that
+        # blocked the bot are unsubscribed
+        self.broadcaster = BroadcastDispatcher(on_blocked=self.subscribers.discard,
+                                               on_migrated=self.migrate_subscriber)
+        
+        # Scan cycle bookkeeping
+        self.scan_in_progress = False
+        self.scan_idle = asyncio.Event()
+        self.scan_idle.set()
+        self.last_scan_duration = 0.0
+        self.scan_overruns = 0
+        self.started_at = time.monotonic()
+        self.last_scan_finished = None
+        
+        # /metrics and /healthz (METRICS_ENABLED), started in post_init
+        self.metrics_server = None
+        
+        # Opt-in cProfile sessions over scan cycles (PROFILE_SCANS or /profile)
+        self.profiler = ScanProfiler()
+        # Indicator math runs off the event loop, in order per pair (scan
+        # workers are processes already and daemonic ones can't have a pool)
+        self.compute = ComputeStage('thread' if shard and COMPUTE_EXECUTOR == 'process' else COMPUTE_EXECUTOR,
+                                    profiler=self.profiler)
+        
+        # Scan worker processes (SHARD_WORKERS), started in post_init
+        self.shards = None
+        self.shard_overruns = {}
+        # Each scan worker keeps its own snapshot
+        self.snapshot_path = f"{SNAPSHOT_PATH}.shard{shard[0]}" if shard and SNAPSHOT_PATH else SNAPSHOT_PATH
+        
+        # Background WebSocket ingestion task (BINANCE_INGESTION=websocket)
+        self.stream_task = None
+        
+        # Candle-close scans (SCAN_SCHEDULE=candle_close), started in post_init
+        self.scheduler = None
+        
+        # Indicators restored from a snapshot (no warm-up needed)
+        self.restored = set()
         
-        # Initialize indicators for each symbol and timeframe
         for symbol in SYMBOLS:
-            self.indicators[symbol] = {}
-            for timeframe in TIMEFRAMES:
-                key = f"{symbol}_{timeframe}"
-                self.indicators[symbol][timeframe] = RSIFollowTrend()
-                self.last_signals[key] = {
-                    'buy_1': False,
-                    'buy_2': False,
-                    'sell_1': False,
-                    'sell_2': False
-                }
+            try:
+                self.registry.add(symbol)
+            except ValueError as e:
+                logger.error(f"Not watching {symbol}: {e}")
+    
+    def create_indicator(self, instrument: Instrument) -> RSIFollowTrend:
+        """Indicator factory for the registry"""
+        indicator = RSIFollowTrend(
+            RSI_LENGTH, EMA_LENGTH, WMA_LENGTH,
+            rsi_mode=RSI_MODE,
+            # Streamed candles are pushed one at a time
+            streaming=INDICATOR_STREAMING or self.is_streamed(instrument),
+            overbought=OVERBOUGHT_LEVEL,
+            oversold=OVERSOLD_LEVEL
+        )
+        # Scan workers own the real indicators
+        return IndicatorView(indicator) if self.frontend else indicator
+    
+    def owns(self, symbol: str, timeframe: str) -> bool:
+        """True if this process scans the pair"""
+        if self.shard is None:
+            return not self.frontend
+        return shard_of(symbol, timeframe, self.shard[1]) == self.shard[0]
+    
+    def is_admin(self, update: Update) -> bool:
+        return update.effective_user is not None and update.effective_user.id in ADMIN_CHAT_IDS
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /start command"""
         chat_id = update.effective_chat.id
         self.subscribers.add(chat_id)
+        self.save_snapshot()
+        
+        symbols = self.registry.symbols()
+        symbol_list = ', '.join(map(display_name, symbols)) if len(symbols) <= 10 else f"{len(symbols)} cặp"
         
-        welcome_message = """
+        welcome_message = f"""
 🤖 **RSI Follow Trend Bot**
 
 Chào mừng! Bot sẽ theo dõi tín hiệu trading cho:
-📊 **Symbols**: BTC/USD, XAU/USD
-⏰ **Timeframes**: 15m, 1h
+📊 **Symbols**: {symbol_list}
+⏰ **Timeframes**: {', '.join(TIMEFRAMES)}
 
 **Các lệnh:**
 /start - Bắt đầu nhận tín hiệu
@@ -74,80 +183,189 @@ Bot đang chạy và sẽ gửi thông báo khi có tín hiệu mới! 🚀
         chat_id = update.effective_chat.id
         if chat_id in self.subscribers:
             self.subscribers.remove(chat_id)
+            self.save_snapshot()
         await update.message.reply_text("✅ Đã dừng nhận tín hiệu. Dùng /start để bật lại.")
     
     async def status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /status command"""
-        keyboard = [
-            [InlineKeyboardButton("BTC/USD 15m", callback_data='status_BTCUSD_15m')],
-            [InlineKeyboardButton("BTC/USD 1h", callback_data='status_BTCUSD_1h')],
-            [InlineKeyboardButton("XAU/USD 15m", callback_data='status_XAUUSD_15m')],
-            [InlineKeyboardButton("XAU/USD 1h", callback_data='status_XAUUSD_1h')],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(
             '📊 Chọn cặp và timeframe để xem trạng thái:',
-            reply_markup=reply_markup
+            reply_markup=self.status_keyboard(0)
         )
     
+    def status_keyboard(self, page: int) -> InlineKeyboardMarkup:
+        """One button per watched pair, STATUS_PAGE_SIZE per page"""
+        pairs = self.registry.pairs()
+        pages = max(1, -(-len(pairs) // STATUS_PAGE_SIZE))
+        page = min(max(page, 0), pages - 1)
+        
+        start = page * STATUS_PAGE_SIZE
+        keyboard = [
+            [InlineKeyboardButton(f"{display_name(symbol)} {timeframe}",
+                                  callback_data=f'status_{symbol}_{timeframe}')]
+            for symbol, timeframe in pairs[start:start + STATUS_PAGE_SIZE]
+        ]
+        if pages > 1:
+            keyboard.append([
+                InlineKeyboardButton('◀️', callback_data=f'page_{(page - 1) % pages}'),
+                InlineKeyboardButton(f'{page + 1}/{pages}', callback_data=f'page_{page}'),
+                InlineKeyboardButton('▶️', callback_data=f'page_{(page + 1) % pages}'),
+            ])
+        return InlineKeyboardMarkup(keyboard)
+    
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle button callbacks"""
         query = update.callback_query
         await query.answer()
         
         if query.data.startswith('status_'):
-            parts = query.data.split('_')
-            symbol = parts[1]
-            timeframe = parts[2]
+            symbol, _, timeframe = query.data[len('status_'):].rpartition('_')
             
             status_msg = await self.get_status_message(symbol, timeframe)
             await query.edit_message_text(text=status_msg, parse_mode='Markdown')
+        elif query.data.startswith('page_'):
+            markup = self.status_keyboard(int(query.data[len('page_'):]))
+            # Editing to an identical keyboard is an error (page counter button)
+            if query.message is None or query.message.reply_markup != markup:
+                await query.edit_message_reply_markup(reply_markup=markup)
+    
+    async def watch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handler for /watch SYMBOL [provider[:ticker]] (admins only)"""
+        if not self.is_admin(update):
+            return
+        if not context.args:
+            await update.message.reply_text("Dùng: /watch SYMBOL [binance|twelvedata[:TICKER]]")
+            return
+        
+        provider, ticker = None, None
+        if len(context.args) > 1:
+            provider, _, ticker = context.args[1].partition(':')
+        try:
+            instrument = await self.watch_symbol(context.args[0], provider, ticker or None, context.application,
+                                                 verify=True)
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}")
+            return
+        
+        await update.message.reply_text(
+            f"✅ Đang theo dõi {display_name(instrument.symbol)} "
+            f"({instrument.provider}: {instrument.ticker})"
+        )
+    
+    async def unwatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handler for /unwatch SYMBOL (admins only)"""
+        if not self.is_admin(update):
+            return
+        if not context.args:
+            await update.message.reply_text("Dùng: /unwatch SYMBOL")
+            return
+        
+        instrument = await self.unwatch_symbol(context.args[0], context.application)
+        if instrument is None:
+            await update.message.reply_text(f"❌ Không theo dõi {context.args[0]}")
+            return
+        
+        await update.message.reply_text(f"✅ Đã bỏ theo dõi {display_name(instrument.symbol)}")
+    
+    async def watch_symbol(self, symbol: str, provider: Optional[str], ticker: Optional[str],
+                           application: Optional[Application], verify: bool = False) -> Instrument:
+        """
+        Start watching a symbol (forwarded to the scan workers when sharded)
+        
+        Args:
+            verify: Check that the provider lists the ticker first, so a typo
+                doesn't spend API budget on every scan
+        
+        Raises:
+            ValueError: Unknown provider, or (verify) unknown or unverifiable ticker
+        """
+        symbol, provider, ticker = self.registry.resolve(symbol, provider, ticker)
+        if verify:
+            found = await self.registry.clients[provider].has_symbol(ticker)
+            if found is None:
+                raise ValueError(f"Không kiểm tra được {ticker} trên {provider}, thử lại sau")
+            if not found:
+                raise ValueError(f"Không tìm thấy {ticker} trên {provider}")
+        
+        instrument = self.registry.add(symbol, provider, ticker)
+        self.render_cache.invalidate_symbol(instrument.symbol)
+        if self.shards is not None:
+            self.shards.send(('watch', instrument.symbol, instrument.provider, instrument.ticker))
+        elif self.is_streamed(instrument):
+            await self.restart_streams(application)
+        return instrument
+    
+    async def unwatch_symbol(self, symbol: str, application: Optional[Application]) -> Optional[Instrument]:
+        """Stop watching a symbol; None if it wasn't watched"""
+        instrument = self.registry.get(symbol.upper())
+        if instrument is None or not self.registry.remove(instrument.symbol):
+            return None
+        
+        self.render_cache.invalidate_symbol(instrument.symbol)
+        for timeframe in TIMEFRAMES:
+            self.last_signals.pop(f"{instrument.symbol}_{timeframe}", None)
+        if self.shards is not None:
+            self.shards.send(('unwatch', instrument.symbol))
+        elif self.is_streamed(instrument):
+            await self.restart_streams(application)
+        return instrument
+    
+    async def profile(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handler for /profile [N|stop] (admins only): profile the next N scans"""
+        if not self.is_admin(update):
+            return
+        if self.frontend:
+            await update.message.reply_text("❌ Scan chạy trong worker (SHARD_WORKERS), dùng PROFILE_SCANS")
+            return
+        chat_id = update.effective_chat.id
+        
+        if context.args and context.args[0].lower() == 'stop':
+            if not self.profiler.active:
+                await update.message.reply_text("❌ Không có phiên profile nào đang chạy")
+                return
+            report, path = self.profiler.finish()
+            await self.send_profile_report(context.bot, chat_id, report, path)
+            return
+        
+        try:
+            cycles = int(context.args[0]) if context.args else 3
+        except ValueError:
+            await update.message.reply_text("Dùng: /profile [N|stop]")
+            return
+        
+        async def on_done(report: str, path: Optional[str]):
+            await self.send_profile_report(context.bot, chat_id, report, path)
+        
+        if not self.profiler.arm(min(max(cycles, 1), 100), on_done):
+            await update.message.reply_text("❌ Đang có phiên profile khác, dùng /profile stop để dừng")
+            return
+        await update.message.reply_text(f"⏱ Đang profile {self.profiler.cycles} lần quét tiếp theo...")
+    
+    async def send_profile_report(self, bot, chat_id: int, report: str, path: Optional[str]):
+        """Send a profiler summary as monospace blocks"""
+        header = f"⏱ Profile: `{path}`\n" if path else "⏱ Profile (không ghi được file)\n"
+        chunk = ""
+        for line in report.splitlines():
+            # Stay under Telegram's 4096-character message limit
+            if len(chunk) + len(line) > 3800:
+                await bot.send_message(chat_id=chat_id, text=f"{header}```\n{chunk}```", parse_mode='Markdown')
+                header, chunk = "", ""
+            chunk += line.replace('`', "'") + "\n"
+        await bot.send_message(chat_id=chat_id, text=f"{header}```\n{chunk}```", parse_mode='Markdown')
     
     async def get_status_message(self, symbol: str, timeframe: str) -> str:
         """Generate status message for a symbol/timeframe"""
         try:
-            indicator = self.indicators[symbol][timeframe]
+            instrument = self.registry.get(symbol)
+            indicator = self.registry.indicator(symbol, timeframe)
             
             # Get current price
-            if symbol == 'BTCUSD':
-                price_data = await self.binance_client.get_price('BTCUSDT')
-                price = price_data['price']
-            else:  # XAUUSD
-                price_data = await self.twelve_data_client.get_price('XAU/USD')
-                price = price_data['price']
-            
-            status = indicator.get_status()
+            price_data = await instrument.client.get_price(instrument.ticker)
+            price = price_data['price']
             
-            msg = f"""
-📊 **{symbol} - {timeframe}**
-💰 Giá: ${price:,.2f}
-
-**Chỉ báo:**
-RSI: {status['rsi']:.2f}
-EMA9: {status['ema9']:.2f}
-WMA45: {status['wma45']:.2f}
-
-**🟢 BUY SETUP:**
-{'✓' if status['buy_step1'] else '○'} Bước 1: RSI≥80
-{'✓' if status['buy_step2'] else '○'} Bước 2: RSI↓EMA9
-{'✓' if status['buy_step3'] else '○'} Bước 3: RSI↓WMA45
-{'✓' if status['buy_step4'] else '○'} Bước 4: EMA9↓WMA45
-Status: {'🟢 READY!' if status['buy_setup_ready'] else '⏳ Chờ...'}
-Crosses: {status['buy_cross_count']}
-Entry #1: {status['buy_entry1_count']}/2
-
-**🔴 SELL SETUP:**
-{'✓' if status['sell_step1'] else '○'} Bước 1: RSI≤20
-{'✓' if status['sell_step2'] else '○'} Bước 2: RSI↑EMA9
-{'✓' if status['sell_step3'] else '○'} Bước 3: RSI↑WMA45
-{'✓' if status['sell_step4'] else '○'} Bước 4: EMA9↑WMA45
-Status: {'🔴 READY!' if status['sell_setup_ready'] else '⏳ Chờ...'}
-Crosses: {status['sell_cross_count']}
-Entry #1: {status['sell_entry1_count']}/2
-
-⏰ Cập nhật: {datetime.now().strftime('%H:%M:%S')}
-            """
-            return msg
+            setup = self.render_cache.render((symbol, timeframe), render_setup,
+                                             lambda: setup_fields(indicator))
+            return status_message(symbol, timeframe, price, setup)
         except Exception as e:
             logger.error(f"Error getting status: {e}")
             return f"❌ Lỗi khi lấy dữ liệu cho {symbol} {timeframe}"
@@ -156,20 +374,27 @@ Entry #1: {status['sell_entry1_count']}/2
         """Handler for /stats command"""
         msg = "📈 **Thống Kê Tín Hiệu**\n\n"
         
-        for symbol in SYMBOLS:
-            msg += f"**{symbol}:**\n"
+        for symbol in self.registry.symbols():
+            section = f"**{symbol}:**\n"
             for timeframe in TIMEFRAMES:
-                indicator = self.indicators[symbol][timeframe]
-                stats = indicator.get_statistics()
-                msg += f"  {timeframe}: BUY#1={stats['total_buy_1']}, BUY#2={stats['total_buy_2']}, "
-                msg += f"SELL#1={stats['total_sell_1']}, SELL#2={stats['total_sell_2']}\n"
-            msg += "\n"
+                indicator = self.registry.indicator(symbol, timeframe)
+                section += self.render_cache.render(
+                    (symbol, timeframe), render_stats,
+                    lambda: dict(indicator.get_statistics(), timeframe=timeframe)
+                )
+            section += "\n"
+            
+            # Stay under Telegram's 4096-character message limit
+            if len(msg) + len(section) > 4000:
+                await update.message.reply_text(msg, parse_mode='Markdown')
+                msg = ""
+            msg += section
         
         await update.message.reply_text(msg, parse_mode='Markdown')
     
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /help command"""
-        help_text = """
+        help_text = f"""
 📚 **Hướng Dẫn Sử Dụng Bot**
 
 **Tín hiệu giao dịch:**
@@ -179,8 +404,8 @@ Entry #1: {status['sell_entry1_count']}/2
 🔴 **SELL #2**: Tín hiệu bán mạnh (cắt WMA45)
 
 **Logic 4 bước:**
-Setup BUY: RSI≥80 → RSI↓EMA9 → RSI↓WMA45 → EMA9↓WMA45
-Setup SELL: RSI≤20 → RSI↑EMA9 → RSI↑WMA45 → EMA9↑WMA45
+Setup BUY: RSI≥{OVERBOUGHT_LEVEL:g} → RSI↓EMA9 → RSI↓WMA45 → EMA9↓WMA45
+Setup SELL: RSI≤{OVERSOLD_LEVEL:g} → RSI↑EMA9 → RSI↑WMA45 → EMA9↑WMA45
 
 **Lưu ý:**
 - Setup phải hoàn thành đủ 4 bước theo thứ tự
@@ -197,101 +422,618 @@ Setup SELL: RSI≤20 → RSI↑EMA9 → RSI↑WMA45 → EMA9↑WMA45
         """
         await update.message.reply_text(help_text, parse_mode='Markdown')
     
-    async def check_signals(self, context: ContextTypes.DEFAULT_TYPE):
-        """Periodic task to check for new signals"""
+    def is_streamed(self, instrument: Instrument) -> bool:
+        """True if the instrument is fed by a WebSocket stream instead of polling"""
+        return instrument.provider == PROVIDER_BINANCE and BINANCE_INGESTION == 'websocket'
+    
+    async def check_signals(self, context: ContextTypes.DEFAULT_TYPE, timeframes: Optional[List[str]] = None,
+                            closed_at: Optional[int] = None,
+                            only: Optional[List[Tuple[str, str]]] = None) -> List[Tuple[str, str]]:
+        """
+        Scan watched pairs for new signals
+        
+        Args:
+            timeframes: Timeframes to scan (all by default)
+            closed_at: Boundary (ms) the scan is for; pairs whose data has no
+                candle opened at or after it are skipped and returned
+            only: Restrict the scan to these (symbol, timeframe) pairs
+        
+        Returns:
+            Pairs whose just-closed candle was not published yet
+        """
+        if self.scan_in_progress and closed_at is None and timeframes is None:
+            # Never let interval cycles pile up behind a slow one
+            self.scan_overruns += 1
+            SCAN_OVERRUNS.inc()
+            logger.warning(f"Previous scan still running, skipping cycle (overruns: {self.scan_overruns})")
+            return []
+        
+        while self.scan_in_progress:
+            # A candle close can't be skipped: scan it once the running scan ends
+            await self.scan_idle.wait()
+        
+        timeframes = timeframes or TIMEFRAMES
+        wanted = set(only) if only is not None else None
+        pending = []
+        
+        self.scan_in_progress = True
+        self.scan_idle.clear()
+        started = time.monotonic()
+        budget = self.scan_budget()
+        self.profiler.begin()
         try:
-            for symbol in SYMBOLS:
-                for timeframe in TIMEFRAMES:
-                    await self.process_symbol(symbol, timeframe, context)
+            providers = self.registry.by_provider()
+            
+            # Twelve Data symbols are fetched in one batched request per timeframe
+            twelve_data_instruments = providers.get(PROVIDER_TWELVE_DATA, [])
+            batches = {}
+            for timeframe in timeframes:
+                instruments = [
+                    instrument for instrument in twelve_data_instruments
+                    if self.owns(instrument.symbol, timeframe)
+                    and (wanted is None or (instrument.symbol, timeframe) in wanted)
+                ]
+                if instruments:
+                    batches[timeframe] = instruments
+            
+            # Binance symbols are fetched per pair (unless streamed)
+            pairs = [
+                (instrument.symbol, timeframe)
+                for instrument in providers.get(PROVIDER_BINANCE, []) for timeframe in timeframes
+                if not self.is_streamed(instrument) and self.owns(instrument.symbol, timeframe)
+                and (wanted is None or (instrument.symbol, timeframe) in wanted)
+            ]
+            
+            # Fan out all fetches of both providers at once, so a Twelve Data
+            # wait (credits, daily planner) never holds up Binance pairs; each
+            # exchange client bounds its own concurrency
+            results = await asyncio.gather(
+                *(self.fetch_twelve_data_batch(instruments, timeframe) for timeframe, instruments in batches.items()),
+                *(self.fetch_klines(symbol, timeframe) for symbol, timeframe in pairs),
+                return_exceptions=True
+            )
+            fetched = dict(zip(pairs, results[len(batches):]))
+            for (timeframe, instruments), klines_by_symbol in zip(batches.items(), results[:len(batches)]):
+                if isinstance(klines_by_symbol, Exception):
+                    logger.error(f"Error fetching Twelve Data {timeframe} batch: {klines_by_symbol}")
+                    continue
+                for symbol, klines in klines_by_symbol.items():
+                    fetched[(symbol, timeframe)] = klines
+            
+            batch = []
+            for (symbol, timeframe), klines in fetched.items():
+                if isinstance(klines, Exception):
+                    logger.error(f"Error processing {symbol} {timeframe}: {klines}")
+                    continue
+                if len(klines) == 0:
+                    continue
+                
+                if symbol not in self.registry:
+                    # Unwatched while the fetch was in flight
+                    continue
+                
+                if closed_at is not None and klines.timestamp[-1] < closed_at:
+                    # The exchange hasn't rolled over to the new candle yet
+                    pending.append((symbol, timeframe))
+                    continue
+                
+                self.store_klines(symbol, timeframe, klines)
+                if self.registry.indicator(symbol, timeframe).streaming:
+                    await self.process_symbol(symbol, timeframe, context, klines=klines)
+                else:
+                    batch.append((symbol, timeframe, klines))
+            
+            # All windowed indicators in one matrix pass
+            if batch:
+                with INDICATOR_SECONDS.time(operation='update_many'):
+                    signals = await self.update_windowed(batch)
+                for (symbol, timeframe, klines), pair_signals in zip(batch, signals):
+                    if pair_signals is not None:
+                        await self.check_new_signals(symbol, timeframe, klines.close[-1], context,
+                                                     signals=pair_signals,
+                                                     timestamp=int(klines.timestamp[-1]))
         except Exception as e:
             logger.error(f"Error in check_signals: {e}")
+        finally:
+            await self.profiler.end()
+            self.scan_in_progress = False
+            self.scan_idle.set()
+            self.last_scan_finished = time.monotonic()
+            self.last_scan_duration = self.last_scan_finished - started
+            SCAN_SECONDS.observe(self.last_scan_duration)
+            
+            if self.last_scan_duration > budget:
+                self.scan_overruns += 1
+                SCAN_OVERRUNS.inc()
+                logger.warning(
+                    f"Scan took {self.last_scan_duration:.2f}s, longer than the {budget:.1f}s until the "
+                    f"next {'candle close' if SCAN_SCHEDULE == 'candle_close' else 'cycle'} "
+                    f"(overruns: {self.scan_overruns})"
+                )
+            else:
+                logger.info(f"Scan finished in {self.last_scan_duration:.2f}s")
+            
+            if self.emit is not None:
+                self.emit(('scan', self.shard[0], self.last_scan_duration, self.scan_overruns))
+        
+        return pending
+    
+    def scan_budget(self) -> float:
+        """Seconds a scan starting now may take before the next one is due"""
+        if SCAN_SCHEDULE != 'candle_close':
+            return CHECK_INTERVAL
+        now_ms = time.time() * 1000
+        return (min(next_boundary(now_ms, INTERVAL_MS[timeframe]) for timeframe in TIMEFRAMES) - now_ms) / 1000
+    
+    async def update_windowed(self, batch: List[Tuple[str, str, CandleSeries]]) -> List[Optional[Dict]]:
+        """
+        BatchIndicatorEngine.update_many with the matrix math in the compute stage
+        
+        Returns:
+            Signals per batch entry, or None if its indicator wasn't updated
+        """
+        results: List[Optional[Dict]] = [None] * len(batch)
+        for rows, closes in BatchIndicatorEngine.group_rows([klines.close for _, _, klines in batch]):
+            pairs = [batch[i][:2] for i in rows]
+            indicators = [self.registry.indicator(symbol, timeframe) for symbol, timeframe in pairs]
+            async with self.compute.ordered(pairs):
+                values = None
+                if closes.shape[1] >= self.batch_engine.min_bars:
+                    with INDICATOR_SECONDS.time(operation='compute'):
+                        values = await self.compute.run(self.batch_engine.compute, closes)
+                # Step transitions are cheap array ops on this process's indicators
+                signals = self.batch_engine.update(indicators, closes, values)
+            for k, i in enumerate(rows):
+                results[i] = BatchIndicatorEngine.row_signals(signals, k)
+        return results
     
-    async def process_symbol(self, symbol: str, timeframe: str, context: ContextTypes.DEFAULT_TYPE):
+    async def scheduled_scan(self, application: Application, timeframes: List[str],
+                             closed_at: Optional[int], only: Optional[List[Tuple[str, str]]]) -> List[Tuple[str, str]]:
+        """CandleCloseScheduler callback"""
+        # Application exposes .bot like a callback context does
+        return await self.check_signals(application, timeframes, closed_at, only)
+    
+    async def process_symbol(self, symbol: str, timeframe: str, context: ContextTypes.DEFAULT_TYPE,
+                             klines: Optional[CandleSeries] = None):
         """Process a single symbol/timeframe combination"""
         try:
-            # Get price data
-            if symbol == 'BTCUSD':
-                klines = await self.binance_client.get_klines('BTCUSDT', timeframe, limit=100)
-            else:  # XAUUSD
-                klines = await self.twelve_data_client.get_klines('XAU/USD', timeframe, limit=100)
+            # Get price data (unless it was fetched in a batch already)
+            if klines is None:
+                klines = await self.fetch_klines(symbol, timeframe)
+                self.store_klines(symbol, timeframe, klines)
             
-            if not klines:
+            if len(klines) == 0:
                 return
             
             # Update indicator
-            indicator = self.indicators[symbol][timeframe]
-            indicator.update(klines)
-            
-            # Check for new signals
-            signals = indicator.get_signals()
-            key = f"{symbol}_{timeframe}"
+            indicator = self.registry.indicator(symbol, timeframe)
+            async with self.compute.ordered([(symbol, timeframe)]):
+                with INDICATOR_SECONDS.time(operation='update'):
+                    if indicator.streaming:
+                        # Only the candles since the last update: stays on the loop
+                        updated = indicator.update(klines)
+                    else:
+                        # Series math in the compute stage; state changes on the
+                        # loop, so snapshots and /status never see half an update
+                        values = await self.compute.run(
+                            window_values, klines.close, indicator.rsi_length, indicator.ema_length,
+                            indicator.wma_length, indicator.rsi_mode
+                        )
+                        updated = indicator.apply_values(values)
+                if not updated:
+                    return
+                
+                await self.check_new_signals(symbol, timeframe, klines.close[-1], context,
+                                             timestamp=int(klines.timestamp[-1]))
             
-            # Check BUY #1
-            if signals['buy_1'] and not self.last_signals[key]['buy_1']:
-                await self.send_signal_alert(context, symbol, timeframe, 'BUY #1', klines[-1]['close'])
-                self.last_signals[key]['buy_1'] = True
-            elif not signals['buy_1']:
-                self.last_signals[key]['buy_1'] = False
+        except Exception as e:
+            logger.error(f"Error processing {symbol} {timeframe}: {e}")
+    
+    def store_klines(self, symbol: str, timeframe: str, klines: CandleSeries):
+        """Persist the closed candles of a fetch (all but the forming one)"""
+        if self.candle_store is None or len(klines) < 2:
+            return
+        try:
+            self.candle_store.append(symbol, timeframe, klines.to_array()[:-1])
+        except Exception as e:
+            logger.error(f"Error storing {symbol} {timeframe} klines: {e}")
+    
+    def warm_up(self):
+        """
+        Load stored candle history on startup
+        
+        Seeds the exchange clients' kline caches, so the first scan only
+        backfills candles missed while the bot was down, and gives recent
+        indicators their previous values, so the first scan can signal.
+        """
+        if self.candle_store is None or self.frontend:
+            return
+        
+        now_ms = time.time() * 1000
+        for instrument in self.registry.instruments():
+            symbol, client, ticker = instrument.symbol, instrument.client, instrument.ticker
             
-            # Check BUY #2
-            if signals['buy_2'] and not self.last_signals[key]['buy_2']:
-                await self.send_signal_alert(context, symbol, timeframe, 'BUY #2', klines[-1]['close'])
-                self.last_signals[key]['buy_2'] = True
-            elif not signals['buy_2']:
-                self.last_signals[key]['buy_2'] = False
+            for timeframe in TIMEFRAMES:
+                try:
+                    history = self.candle_store.tail(symbol, timeframe, max(KLINE_CACHE_SIZE, KLINE_LIMIT))
+                    if len(history) == 0:
+                        continue
+                    
+                    if client.kline_cache is not None:
+                        client.kline_cache.reset(ticker, timeframe, history)
+                    
+                    # Values from stale history would be compared with fresh
+                    # ones on the first scan; only use candles that just closed
+                    age = now_ms - history['timestamp'][-1]
+                    if age > 2 * INTERVAL_MS.get(timeframe, 0):
+                        logger.info(f"Stored {symbol} {timeframe} history is stale, backfilling")
+                        continue
+                    
+                    if f"{symbol}_{timeframe}" in self.restored:
+                        continue
+                    
+                    indicator = self.registry.indicator(symbol, timeframe)
+                    if indicator.streaming:
+                        indicator.seed(history)
+                    else:
+                        indicator.update(history[-KLINE_LIMIT:])
+                    logger.info(f"Warmed up {symbol} {timeframe} from {len(history)} stored candles")
+                except Exception as e:
+                    logger.error(f"Error warming up {symbol} {timeframe}: {e}")
+    
+    def get_state(self) -> Dict:
+        """Everything a restart would otherwise lose"""
+        return {
+            'saved_at': time.time(),
+            'subscribers': sorted(self.subscribers),
+            'last_signals': self.last_signals,
+            # Scan workers snapshot their own indicators
+            'indicators': {} if self.frontend else {
+                f"{symbol}_{timeframe}": indicator.get_state()
+                for symbol, timeframe, indicator in self.registry.indicators()
+            },
+            # Daily quotas are billed per UTC day, across restarts
+            'rate_limits': {
+                client.PROVIDER: client.scheduler.get_usage()
+                for client in (self.binance_client, self.twelve_data_client)
+            },
+        }
+    
+    def restore_state(self):
+        """Restore subscribers, alert dedup state, daily API usage and indicators from the snapshot"""
+        if not self.snapshot_path:
+            return
+        
+        state = load_snapshot(self.snapshot_path)
+        if state is None:
+            return
+        
+        self.subscribers.update(state.get('subscribers', []))
+        # Only pairs this process scans (none in a sharded bot's Telegram process)
+        watched = {f"{symbol}_{timeframe}" for symbol, timeframe in self.registry.pairs() if self.owns(symbol, timeframe)}
+        for key, signals in state.get('last_signals', {}).items():
+            if key in watched:
+                self.last_signals[key] = dict(signals)
+        
+        usage = state.get('rate_limits', {})
+        for client in (self.binance_client, self.twelve_data_client):
+            if client.PROVIDER in usage:
+                client.scheduler.restore_usage(usage[client.PROVIDER])
+        
+        age = time.time() - state.get('saved_at', time.time())
+        for key, indicator_state in state.get('indicators', {}).items():
+            if key not in watched:
+                continue
+            symbol, _, timeframe = key.rpartition('_')
+            # Like stale stored history in warm_up: previous values from long
+            # ago would be compared with fresh ones on the first scan
+            if age * 1000 > 2 * INTERVAL_MS.get(timeframe, 0):
+                logger.info(f"Snapshot state of {key} is stale, not restoring")
+                continue
+            indicator = self.registry.indicator(symbol, timeframe)
+            if indicator.set_state(indicator_state):
+                self.restored.add(key)
+            else:
+                logger.warning(f"Indicator settings changed, not restoring {key}")
+        
+        logger.info(
+            f"Restored snapshot from {age:.0f}s ago: {len(self.subscribers)} subscribers, "
+            f"{len(self.restored)} indicators"
+        )
+    
+    def save_snapshot(self):
+        """Write the state snapshot"""
+        if not self.snapshot_path:
+            return
+        try:
+            save_snapshot(self.snapshot_path, self.get_state())
+        except Exception as e:
+            logger.error(f"Error saving snapshot: {e}")
+    
+    async def snapshot_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Periodic job: save the state snapshot"""
+        self.save_snapshot()
+    
+    async def fetch_klines(self, symbol: str, timeframe: str) -> CandleSeries:
+        """Fetch the latest KLINE_LIMIT klines for one symbol/timeframe"""
+        instrument = self.registry.get(symbol)
+        return await instrument.client.get_klines(instrument.ticker, timeframe, limit=KLINE_LIMIT, columnar=True)
+    
+    async def fetch_twelve_data_batch(self, instruments: List[Instrument], timeframe: str) -> Dict[str, CandleSeries]:
+        """Fetch klines for all Twelve Data instruments of a timeframe, keyed by our symbol"""
+        tickers = {instrument.ticker: instrument.symbol for instrument in instruments}
+        klines = await self.twelve_data_client.get_klines_many(
+            list(tickers), timeframe, limit=KLINE_LIMIT, columnar=True
+        )
+        return {tickers[ticker]: data for ticker, data in klines.items()}
+    
+    async def check_new_signals(self, symbol: str, timeframe: str, price: float,
+                                context: ContextTypes.DEFAULT_TYPE, signals: Optional[Dict] = None,
+                                timestamp: Optional[int] = None):
+        """
+        Send alerts for signals that were not active on the previous update
+        
+        Args:
+            signals: Signals already evaluated for this update (batch engine);
+                taken from indicator.get_signals() otherwise
+            timestamp: Open time of the candle the update ended on
+        """
+        # The indicator just updated: cached message parts are stale
+        self.render_cache.invalidate((symbol, timeframe), timestamp)
+        
+        indicator = self.registry.indicator(symbol, timeframe)
+        if self.emit is not None:
+            # Sent before any signal so the bot process renders current values
+            self.emit(('state', symbol, timeframe, timestamp, indicator.get_status(), indicator.get_statistics()))
+        
+        if signals is None:
+            with INDICATOR_SECONDS.time(operation='get_signals'):
+                signals = indicator.get_signals()
+        key = f"{symbol}_{timeframe}"
+        if key not in self.last_signals:
+            self.last_signals[key] = {
+                'buy_1': False,
+                'buy_2': False,
+                'sell_1': False,
+                'sell_2': False
+            }
+        
+        # Check BUY #1
+        if signals['buy_1'] and not self.last_signals[key]['buy_1']:
+            await self.send_signal_alert(context, symbol, timeframe, 'BUY #1', price)
+            self.last_signals[key]['buy_1'] = True
+        elif not signals['buy_1']:
+            self.last_signals[key]['buy_1'] = False
+        
+        # Check BUY #2
+        if signals['buy_2'] and not self.last_signals[key]['buy_2']:
+            await self.send_signal_alert(context, symbol, timeframe, 'BUY #2', price)
+            self.last_signals[key]['buy_2'] = True
+        elif not signals['buy_2']:
+            self.last_signals[key]['buy_2'] = False
+        
+        # Check SELL #1
+        if signals['sell_1'] and not self.last_signals[key]['sell_1']:
+            await self.send_signal_alert(context, symbol, timeframe, 'SELL #1', price)
+            self.last_signals[key]['sell_1'] = True
+        elif not signals['sell_1']:
+            self.last_signals[key]['sell_1'] = False
+        
+        # Check SELL #2
+        if signals['sell_2'] and not self.last_signals[key]['sell_2']:
+            await self.send_signal_alert(context, symbol, timeframe, 'SELL #2', price)
+            self.last_signals[key]['sell_2'] = True
+        elif not signals['sell_2']:
+            self.last_signals[key]['sell_2'] = False
+    
+    async def run_binance_stream(self, context: ContextTypes.DEFAULT_TYPE):
+        """Feed closed Binance candles from the WebSocket stream into the indicators"""
+        owned = [
+            (instrument, timeframe)
+            for instrument in self.registry.by_provider().get(PROVIDER_BINANCE, []) for timeframe in TIMEFRAMES
+            if self.owns(instrument.symbol, timeframe)
+        ]
+        if not owned:
+            return
+        pairs = [(instrument.ticker, timeframe) for instrument, timeframe in owned]
+        
+        async def bootstrap():
+            # Load history (or backfill candles missed while disconnected) over REST
+            await asyncio.gather(*(
+                self.process_symbol(instrument.symbol, timeframe, context)
+                for instrument, timeframe in owned
+            ))
+        
+        async def on_kline(native_symbol: str, interval: str, kline: Dict, is_closed: bool):
+            symbol = self.registry.symbol_for(PROVIDER_BINANCE, native_symbol)
+            if symbol is None or interval not in TIMEFRAMES:
+                return
+            indicator = self.registry.indicator(symbol, interval)
             
-            # Check SELL #1
-            if signals['sell_1'] and not self.last_signals[key]['sell_1']:
-                await self.send_signal_alert(context, symbol, timeframe, 'SELL #1', klines[-1]['close'])
-                self.last_signals[key]['sell_1'] = True
-            elif not signals['sell_1']:
-                self.last_signals[key]['sell_1'] = False
+            if not is_closed:
+                # Behind any queued closed candle, so the preview extends the latest state
+                async with self.compute.ordered([(symbol, interval)]):
+                    indicator.preview_values = indicator.preview(kline['close'])
+                return
             
-            # Check SELL #2
-            if signals['sell_2'] and not self.last_signals[key]['sell_2']:
-                await self.send_signal_alert(context, symbol, timeframe, 'SELL #2', klines[-1]['close'])
-                self.last_signals[key]['sell_2'] = True
-            elif not signals['sell_2']:
-                self.last_signals[key]['sell_2'] = False
+            if (indicator.last_closed_timestamp is not None
+                    and kline['timestamp'] <= indicator.last_closed_timestamp):
+                return
             
-        except Exception as e:
-            logger.error(f"Error processing {symbol} {timeframe}: {e}")
+            try:
+                if self.candle_store is not None:
+                    self.candle_store.append(symbol, interval, dicts_to_klines([kline]))
+                # O(1) per candle: stays on the loop, behind any queued update of the pair
+                async with self.compute.ordered([(symbol, interval)]):
+                    with INDICATOR_SECONDS.time(operation='push_candle'):
+                        updated = indicator.push_candle(kline['close'], kline['timestamp'])
+                    if updated:
+                        await self.check_new_signals(symbol, interval, kline['close'], context,
+                                                     timestamp=kline['timestamp'])
+            except Exception as e:
+                logger.error(f"Error processing {symbol} {interval} stream kline: {e}")
+        
+        await self.binance_client.stream_klines(pairs, on_kline, on_connect=bootstrap)
+    
+    async def post_init(self, application: Application):
+        """post_init hook: restore the snapshot, warm up from stored candles, then start streams"""
+        self.restore_state()
+        self.warm_up()
+        self.broadcaster.start(application.bot)
+        if METRICS_ENABLED:
+            self.metrics_server = MetricsServer(PORT, collect=self.collect_metrics, health=self.health)
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.error(f"Error starting metrics server on port {PORT}: {e}")
+                self.metrics_server = None
+        
+        if self.frontend:
+            # Scans, streams and profiling run in the workers
+            self.shards = ShardSupervisor(
+                SHARD_WORKERS, lambda event: self.handle_shard_event(application, event), self.watchlist
+            )
+            self.shards.start()
+            return
+        
+        if PROFILE_SCANS:
+            self.profiler.arm(PROFILE_SCANS, self.log_profile_report)
+        await self.start_streams(application)
+        if SCAN_SCHEDULE == 'candle_close':
+            self.scheduler = CandleCloseScheduler(
+                TIMEFRAMES, lambda *args: self.scheduled_scan(application, *args)
+            )
+            self.scheduler.start()
+    
+    async def post_shutdown(self, application: Application):
+        """post_shutdown hook: stop scans and streams, flush queued alerts and save a final snapshot"""
+        if self.scheduler is not None:
+            await self.scheduler.stop()
+        if self.shards is not None:
+            await self.shards.stop()
+        await self.stop_streams(application)
+        self.compute.shutdown()
+        await self.broadcaster.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        if self.profiler.active:
+            report, path = self.profiler.finish()
+            await self.log_profile_report(report, path)
+        self.save_snapshot()
+    
+    def watchlist(self) -> List[Tuple[str, str, str]]:
+        """(symbol, provider, ticker) of every watched symbol, for scan workers"""
+        return [(instrument.symbol, instrument.provider, instrument.ticker)
+                for instrument in self.registry.instruments()]
+    
+    async def handle_shard_event(self, application: Application, event: tuple):
+        """Apply a scan worker's event in the Telegram process"""
+        kind = event[0]
+        if kind == 'state':
+            _, symbol, timeframe, timestamp, status, statistics = event
+            if symbol in self.registry:
+                self.registry.indicator(symbol, timeframe).apply(status, statistics)
+                self.render_cache.invalidate((symbol, timeframe), timestamp)
+        elif kind == 'signal':
+            _, symbol, timeframe, signal_type, price = event
+            if symbol in self.registry:
+                await self.send_signal_alert(application, symbol, timeframe, signal_type, price)
+        elif kind == 'scan':
+            _, shard, duration, overruns = event
+            self.last_scan_finished = time.monotonic()
+            self.last_scan_duration = duration
+            SCAN_SECONDS.observe(duration)
+            # Workers report running totals, which restart with the worker
+            previous = self.shard_overruns.get(shard, 0)
+            SCAN_OVERRUNS.inc(overruns - previous if overruns >= previous else overruns)
+            self.shard_overruns[shard] = overruns
+    
+    async def log_profile_report(self, report: str, path: Optional[str]):
+        """Profiler callback for sessions started by PROFILE_SCANS"""
+        logger.info(f"Scan profile ({path}):\n{report}")
+    
+    def collect_metrics(self):
+        """Refresh point-in-time gauges before a /metrics scrape"""
+        for client in (self.binance_client, self.twelve_data_client):
+            stats = client.scheduler.get_stats()
+            RATE_LIMIT_TOKENS.set(stats['tokens'], provider=client.PROVIDER)
+            RATE_LIMIT_WAITING.set(stats['waiting'], provider=client.PROVIDER)
+        BROADCAST_QUEUE_DEPTH.set(self.broadcaster.get_stats()['queued'])
+        SUBSCRIBERS.set(len(self.subscribers))
+        WATCHED_PAIRS.set(len(self.registry.pairs()))
+    
+    def health(self) -> Tuple[bool, Dict]:
+        """/healthz: scans keep finishing and the event loop is responsive"""
+        max_scan_age = HEALTH_MAX_SCAN_AGE
+        if not max_scan_age:
+            # Two missed scans plus slack for the first one
+            if SCAN_SCHEDULE == 'candle_close':
+                period = min(INTERVAL_MS[timeframe] for timeframe in TIMEFRAMES) / 1000
+            else:
+                period = CHECK_INTERVAL
+            max_scan_age = 2 * period + 60
+        
+        scan_age = time.monotonic() - (self.last_scan_finished or self.started_at)
+        loop_lag = EVENT_LOOP_LAG.value()
+        healthy = scan_age <= max_scan_age and loop_lag <= HEALTH_MAX_LOOP_LAG
+        return healthy, {
+            'last_scan_age': round(scan_age, 1),
+            'scan_in_progress': self.scan_in_progress,
+            'event_loop_lag': round(loop_lag, 3),
+        }
+    
+    async def start_streams(self, application: Application):
+        """Start WebSocket ingestion if enabled"""
+        if self.frontend:
+            return
+        if BINANCE_INGESTION == 'websocket' and self.registry.by_provider().get(PROVIDER_BINANCE):
+            # Application exposes .bot like a callback context does
+            self.stream_task = asyncio.create_task(self.run_binance_stream(application))
+    
+    async def cancel_stream(self):
+        if self.stream_task is not None:
+            self.stream_task.cancel()
+            try:
+                await self.stream_task
+            except asyncio.CancelledError:
+                pass
+            self.stream_task = None
+    
+    async def restart_streams(self, application: Application):
+        """Resubscribe after the set of streamed symbols changed"""
+        await self.cancel_stream()
+        await self.start_streams(application)
+    
+    async def stop_streams(self, application: Application):
+        """post_shutdown hook: stop WebSocket ingestion"""
+        await self.cancel_stream()
+        await self.binance_client.close()
+        await self.twelve_data_client.close()
+        await self.http.close()
     
     async def send_signal_alert(self, context: ContextTypes.DEFAULT_TYPE, 
                                 symbol: str, timeframe: str, signal_type: str, price: float):
         """Send signal alert to all subscribers"""
-        indicator = self.indicators[symbol][timeframe]
-        status = indicator.get_status()
+        SIGNALS.inc(signal=signal_type)
+        if self.emit is not None:
+            # Scan worker: the bot process sends it
+            self.emit(('signal', symbol, timeframe, signal_type, price))
+            return
         
-        emoji = '🟢' if 'BUY' in signal_type else '🔴'
-        strength = '💪 MẠNH' if '#2' in signal_type else '⚠️ THẬN TRỌNG'
+        indicator = self.registry.indicator(symbol, timeframe)
+        indicators = self.render_cache.render((symbol, timeframe), render_indicators, indicator.get_status)
+        message = alert_message(symbol, timeframe, signal_type, price, indicators)
         
-        message = f"""
-{emoji} **TÍN HIỆU {signal_type}** {emoji}
-
-📊 **{symbol}** | ⏰ **{timeframe}**
-💰 Giá: ${price:,.2f}
-
-**Độ mạnh:** {strength}
-
-**Chỉ báo:**
-RSI: {status['rsi']:.2f}
-EMA9: {status['ema9']:.2f}
-WMA45: {status['wma45']:.2f}
-
-⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        """
-        
-        # Send to all subscribers
-        for chat_id in self.subscribers:
-            try:
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=message,
-                    parse_mode='Markdown'
-                )
-            except Exception as e:
-                logger.error(f"Error sending message to {chat_id}: {e}")
+        # Queue for all subscribers; delivery runs in the background
+        if not self.broadcaster.running:
+            self.broadcaster.start(context.bot)
+        self.broadcaster.broadcast(list(self.subscribers), message, parse_mode='Markdown')
+    
+    def migrate_subscriber(self, old_chat_id: int, new_chat_id: int):
+        """Follow a group that was upgraded to a supergroup"""
+        if old_chat_id in self.subscribers:
+            self.subscribers.discard(old_chat_id)
+            self.subscribers.add(new_chat_id)
 
 def main():
     """Main function to run the bot"""
@@ -299,7 +1041,13 @@ def main():
     bot = TradingBot()
     
     # Create application
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .post_init(bot.post_init)
+        .post_shutdown(bot.post_shutdown)
+        .build()
+    )
     
     # Add command handlers
     application.add_handler(CommandHandler("start", bot.start))
@@ -307,11 +1055,17 @@ def main():
     application.add_handler(CommandHandler("status", bot.status))
     application.add_handler(CommandHandler("stats", bot.stats))
     application.add_handler(CommandHandler("help", bot.help_command))
+    application.add_handler(CommandHandler("watch", bot.watch))
+    application.add_handler(CommandHandler("unwatch", bot.unwatch))
+    application.add_handler(CommandHandler("profile", bot.profile))
     application.add_handler(CallbackQueryHandler(bot.button_callback))
     
     # Add periodic job to check signals
     job_queue = application.job_queue
-    job_queue.run_repeating(bot.check_signals, interval=CHECK_INTERVAL, first=10)
+    if SCAN_SCHEDULE != 'candle_close' and not SHARD_WORKERS:
+        job_queue.run_repeating(bot.check_signals, interval=CHECK_INTERVAL, first=10)
+    if SNAPSHOT_PATH:
+        job_queue.run_repeating(bot.snapshot_job, interval=SNAPSHOT_INTERVAL, first=SNAPSHOT_INTERVAL)
     
     # Start the bot
     logger.info("Bot started successfully!")
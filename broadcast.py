@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telegram broadcast dispatcher
+Background queue and workers that fan messages out to many chats within
+Telegram's rate limits
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from telegram.error import BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter
+from rate_limiter import TokenBucket
+from metrics import BROADCAST_SEND_SECONDS, BROADCAST_MESSAGES
+from config import (
+    BROADCAST_WORKERS, BROADCAST_GLOBAL_RATE, BROADCAST_CHAT_INTERVAL,
+    BROADCAST_GROUP_INTERVAL, BROADCAST_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastDispatcher:
+    """
+    Queue-backed message fan-out
+    
+    broadcast() only enqueues, so callers (the scan loop) never wait for
+    delivery. Workers send concurrently while keeping to a global message
+    rate and a minimum interval per chat (longer for groups), pause all
+    sending on RetryAfter, retry network errors, and report chats that
+    blocked the bot or no longer exist through `on_blocked`.
+    """
+    
+    def __init__(self, workers: int = BROADCAST_WORKERS, global_rate: float = BROADCAST_GLOBAL_RATE,
+                 chat_interval: float = BROADCAST_CHAT_INTERVAL,
+                 group_interval: float = BROADCAST_GROUP_INTERVAL,
+                 max_retries: int = BROADCAST_MAX_RETRIES,
+                 on_blocked: Optional[Callable[[int], None]] = None,
+                 on_migrated: Optional[Callable[[int, int], None]] = None):
+        self.workers = workers
+        self.bucket = TokenBucket(global_rate, global_rate)
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self.max_retries = max_retries
+        self.on_blocked = on_blocked
+        self.on_migrated = on_migrated
+        
+        self.bot = None
+        self.queue = None
+        self.tasks: List[asyncio.Task] = []
+        self.paused_until = 0.0
+        self.next_slot: Dict[int, float] = {}
+        
+        # Delivery statistics
+        self.sent = 0
+        self.failed = 0
+        self.pruned = 0
+    
+    @property
+    def running(self) -> bool:
+        return bool(self.tasks)
+    
+    def start(self, bot):
+        """Start the workers in the running event loop"""
+        if self.running:
+            return
+        self.bot = bot
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+    
+    async def stop(self, timeout: float = 10.0):
+        """Give queued messages up to `timeout` seconds, then stop the workers"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self.queue.qsize()} undelivered messages")
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+    
+    def broadcast(self, chat_ids: Iterable[int], text: str, **kwargs) -> int:
+        """
+        Queue `text` for every chat (kwargs go to bot.send_message)
+        
+        Returns:
+            Number of messages queued
+        """
+        if not self.running:
+            raise RuntimeError("BroadcastDispatcher is not started")
+        
+        count = 0
+        for chat_id in chat_ids:
+            self.queue.put_nowait((chat_id, text, kwargs, 0))
+            count += 1
+        return count
+    
+    def _interval(self, chat_id: int) -> float:
+        # Group and channel ids are negative
+        return self.group_interval if chat_id < 0 else self.chat_interval
+    
+    async def _wait_turn(self, chat_id: int):
+        """Wait for the chat's next free slot and a global token"""
+        now = time.monotonic()
+        # Reserve the chat's slot up front so its messages keep their order
+        slot = max(now, self.next_slot.get(chat_id, 0.0))
+        self.next_slot[chat_id] = slot + self._interval(chat_id)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        
+        while True:
+            now = time.monotonic()
+            wait = max(self.paused_until - now, self.bucket.delay(1, now))
+            if wait <= 0:
+                self.bucket.consume(1, now)
+                return
+            await asyncio.sleep(wait)
+    
+    async def _worker(self):
+        while True:
+            chat_id, text, kwargs, attempt = await self.queue.get()
+            try:
+                await self._send(chat_id, text, kwargs, attempt)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error sending message to {chat_id}: {e}")
+            finally:
+                self.queue.task_done()
+    
+    async def _send(self, chat_id: int, text: str, kwargs: Dict, attempt: int):
+        await self._wait_turn(chat_id)
+        try:
+            with BROADCAST_SEND_SECONDS.time():
+                await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+            self.sent += 1
+            BROADCAST_MESSAGES.inc(result='sent')
+        except RetryAfter as e:
+            # Flood control applies to the whole bot: pause every worker
+            retry_after = e.retry_after
+            wait = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+            self.paused_until = max(self.paused_until, time.monotonic() + wait)
+            logger.warning(f"Telegram flood control, pausing broadcasts for {wait:.0f}s")
+            self._retry(chat_id, text, kwargs, attempt)
+        except ChatMigrated as e:
+            # Group upgraded to a supergroup with a new id
+            if self.on_migrated is not None:
+                self.on_migrated(chat_id, e.new_chat_id)
+            self.queue.put_nowait((e.new_chat_id, text, kwargs, attempt))
+        except Forbidden as e:
+            # Bot blocked by the user or removed from the group
+            self._prune(chat_id, e)
+        except BadRequest as e:
+            if 'chat not found' in str(e).lower():
+                self._prune(chat_id, e)
+            else:
+                self.failed += 1
+                BROADCAST_MESSAGES.inc(result='failed')
+                logger.error(f"Error sending message to {chat_id}: {e}")
+        except NetworkError as e:
+            # Includes TimedOut
+            if not self._retry(chat_id, text, kwargs, attempt):
+                logger.error(f"Error sending message to {chat_id}: {e}")
+    
+    def _retry(self, chat_id: int, text: str, kwargs: Dict, attempt: int) -> bool:
+        """Requeue a message; False once it is out of retries"""
+        if attempt >= self.max_retries:
+            self.failed += 1
+            BROADCAST_MESSAGES.inc(result='failed')
+            return False
+        BROADCAST_MESSAGES.inc(result='retried')
+        self.queue.put_nowait((chat_id, text, kwargs, attempt + 1))
+        return True
+    
+    def _prune(self, chat_id: int, error: Exception):
+        self.pruned += 1
+        BROADCAST_MESSAGES.inc(result='pruned')
+        self.next_slot.pop(chat_id, None)
+        logger.info(f"Removing chat {chat_id}: {error}")
+        if self.on_blocked is not None:
+            self.on_blocked(chat_id)
+    
+    def get_stats(self) -> Dict:
+        """Delivery counters and queue depth"""
+        return {
+            'queued': self.queue.qsize() if self.queue is not None else 0,
+            'sent': self.sent,
+            'failed': self.failed,
+            'pruned': self.pruned,
+        }
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent candle history
+Append-only binary files of fixed-width KLINE_DTYPE records, one per
+(symbol, interval), read back through numpy.memmap
+"""
+
+import os
+import logging
+import numpy as np
+from typing import List, Optional, Tuple
+from candles import KLINE_DTYPE
+
+logger = logging.getLogger(__name__)
+
+RECORD_SIZE = KLINE_DTYPE.itemsize  # 48 bytes per candle
+
+
+class CandleStore:
+    """
+    On-disk store of closed candles
+    
+    Each (symbol, interval) is a headerless file of KLINE_DTYPE records in
+    chronological order. Only candles newer than the last stored one are
+    appended, so the file never needs rewriting; reads map the file instead
+    of loading it, so years of 1m history cost no RAM until touched.
+    """
+    
+    SUFFIX = '.klines'
+    
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        os.makedirs(data_dir, exist_ok=True)
+        self._last_timestamp = {}
+    
+    def path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.data_dir, f"{symbol}_{interval}{self.SUFFIX}")
+    
+    def _size(self, symbol: str, interval: str) -> int:
+        """Number of complete records, dropping a torn trailing write"""
+        path = self.path(symbol, interval)
+        if not os.path.exists(path):
+            return 0
+        
+        size = os.path.getsize(path)
+        if size % RECORD_SIZE:
+            logger.warning(f"Truncating partial record in {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(size - size % RECORD_SIZE)
+        return size // RECORD_SIZE
+    
+    def keys(self) -> List[Tuple[str, str]]:
+        """Stored (symbol, interval) pairs"""
+        keys = []
+        for name in sorted(os.listdir(self.data_dir)):
+            if name.endswith(self.SUFFIX):
+                symbol, _, interval = name[:-len(self.SUFFIX)].rpartition('_')
+                keys.append((symbol, interval))
+        return keys
+    
+    def count(self, symbol: str, interval: str) -> int:
+        """Number of stored candles"""
+        return self._size(symbol, interval)
+    
+    def read(self, symbol: str, interval: str, start: Optional[int] = None,
+             end: Optional[int] = None) -> np.ndarray:
+        """
+        Memory-mapped view of stored candles (read-only)
+        
+        Args:
+            start, end: Optional open-time bounds in ms (inclusive, exclusive)
+        
+        Returns:
+            Structured KLINE_DTYPE array backed by the file (empty if none)
+        """
+        n = self._size(symbol, interval)
+        if n == 0:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        
+        klines = np.memmap(self.path(symbol, interval), dtype=KLINE_DTYPE, mode='r', shape=(n,))
+        if start is None and end is None:
+            return klines
+        
+        timestamps = klines['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = n if end is None else int(np.searchsorted(timestamps, end, side='left'))
+        return klines[lo:hi]
+    
+    def tail(self, symbol: str, interval: str, n: int) -> np.ndarray:
+        """Copy of the last n stored candles"""
+        klines = self.read(symbol, interval)
+        return np.array(klines[-n:]) if n > 0 else np.empty(0, dtype=KLINE_DTYPE)
+    
+    def last_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        """Open time of the newest stored candle"""
+        key = (symbol, interval)
+        if key not in self._last_timestamp:
+            n = self._size(symbol, interval)
+            if n == 0:
+                return None
+            with open(self.path(symbol, interval), 'rb') as f:
+                f.seek((n - 1) * RECORD_SIZE)
+                record = np.frombuffer(f.read(RECORD_SIZE), dtype=KLINE_DTYPE)
+            self._last_timestamp[key] = int(record['timestamp'][0])
+        return self._last_timestamp[key]
+    
+    def append(self, symbol: str, interval: str, klines: np.ndarray) -> int:
+        """
+        Append closed candles newer than the last stored one
+        
+        Args:
+            klines: Structured KLINE_DTYPE array in chronological order; must
+                not include the still-forming candle
+        
+        Returns:
+            Number of candles written
+        """
+        last = self.last_timestamp(symbol, interval)
+        if last is not None:
+            klines = klines[klines['timestamp'] > last]
+        if len(klines) == 0:
+            return 0
+        
+        klines = np.ascontiguousarray(klines, dtype=KLINE_DTYPE)
+        with open(self.path(symbol, interval), 'ab') as f:
+            f.write(klines.tobytes())
+        self._last_timestamp[(symbol, interval)] = int(klines['timestamp'][-1])
+        return len(klines)
+
+
+if __name__ == '__main__':
+    import argparse
+    from datetime import datetime, timezone
+    from backtest import load_csv
+    from config import DATA_DIR
+    
+    parser = argparse.ArgumentParser(description='Inspect or fill the candle store')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('info', help='List stored series')
+    importer = commands.add_parser('import', help='Append klines from a CSV file')
+    importer.add_argument('csv', help='Klines CSV (timestamp,open,high,low,close,volume)')
+    importer.add_argument('symbol')
+    importer.add_argument('interval')
+    args = parser.parse_args()
+    
+    store = CandleStore(args.data_dir)
+    if args.command == 'import':
+        written = store.append(args.symbol, args.interval, load_csv(args.csv))
+        print(f"Appended {written} candles to {store.path(args.symbol, args.interval)}")
+    else:
+        for symbol, interval in store.keys():
+            klines = store.read(symbol, interval)
+            if not len(klines):
+                continue
+            first, last = (datetime.fromtimestamp(int(t) / 1000, tz=timezone.utc)
+                           for t in (klines['timestamp'][0], klines['timestamp'][-1]))
+            print(f"{symbol} {interval}: {len(klines)} candles, {first:%Y-%m-%d %H:%M} -> {last:%Y-%m-%d %H:%M}")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact columnar candle storage
+Fixed-capacity OHLCV columns backed by NumPy instead of List[Dict]
+"""
+
+import numpy as np
+from typing import List, Dict, Optional, Union
+
+# Structured kline record, used for parsed exchange responses
+KLINE_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+KLINE_DTYPE = np.dtype([
+    ('timestamp', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+])
+
+
+class CandleSeries:
+    """
+    Fixed-capacity rolling window of candles stored column-wise
+    
+    One int64 timestamp column and five float64 OHLCV columns (48 bytes per
+    candle). Columns are allocated with some slack after `capacity`; once
+    the slack is used up the live window is moved back to the front, so
+    appends are amortized O(1) and every column is a contiguous view.
+    """
+    
+    __slots__ = ('capacity', '_start', '_end',
+                 '_timestamp', '_open', '_high', '_low', '_close', '_volume')
+    
+    def __init__(self, capacity: int = 500):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        
+        self.capacity = capacity
+        size = capacity + max(capacity // 4, 16)
+        self._start = 0
+        self._end = 0
+        self._timestamp = np.empty(size, dtype=np.int64)
+        self._open = np.empty(size, dtype=np.float64)
+        self._high = np.empty(size, dtype=np.float64)
+        self._low = np.empty(size, dtype=np.float64)
+        self._close = np.empty(size, dtype=np.float64)
+        self._volume = np.empty(size, dtype=np.float64)
+    
+    @classmethod
+    def from_array(cls, klines: np.ndarray, capacity: Optional[int] = None) -> 'CandleSeries':
+        """Create from a structured kline array (KLINE_DTYPE)"""
+        series = cls(capacity or max(len(klines), 1))
+        series.extend(klines)
+        return series
+    
+    @classmethod
+    def from_dicts(cls, klines: List[Dict], capacity: Optional[int] = None) -> 'CandleSeries':
+        """Create from a list of kline dictionaries"""
+        array = np.array([tuple(k[field] for field in KLINE_FIELDS) for k in klines], dtype=KLINE_DTYPE)
+        return cls.from_array(array, capacity)
+    
+    def __len__(self) -> int:
+        return self._end - self._start
+    
+    def _columns(self):
+        return (self._timestamp, self._open, self._high, self._low, self._close, self._volume)
+    
+    def _reserve(self, n: int) -> int:
+        """Drop the oldest candles to make room for n more; return the write index"""
+        size = len(self)
+        drop = max(size + n - self.capacity, 0)
+        self._start += min(drop, size)
+        
+        if self._end + n > len(self._timestamp):
+            # Slack used up: move the live window to the front
+            size = len(self)
+            for column in self._columns():
+                column[:size] = column[self._start:self._end]
+            self._start = 0
+            self._end = size
+        
+        index = self._end
+        self._end += n
+        return index
+    
+    def append(self, timestamp: int, open: float, high: float, low: float,
+               close: float, volume: float):
+        """Append one candle, dropping the oldest one when full"""
+        i = self._reserve(1)
+        self._timestamp[i] = timestamp
+        self._open[i] = open
+        self._high[i] = high
+        self._low[i] = low
+        self._close[i] = close
+        self._volume[i] = volume
+    
+    def extend(self, klines: Union[np.ndarray, 'CandleSeries']):
+        """Append candles from a structured kline array or another series"""
+        if isinstance(klines, CandleSeries):
+            klines = klines.to_array()
+        if len(klines) > self.capacity:
+            klines = klines[-self.capacity:]
+        
+        n = len(klines)
+        if n == 0:
+            return
+        
+        i = self._reserve(n)
+        for column, field in zip(self._columns(), KLINE_FIELDS):
+            column[i:i + n] = klines[field]
+    
+    def replace_last(self, timestamp: int, open: float, high: float, low: float,
+                     close: float, volume: float):
+        """Overwrite the last (still-forming) candle in place"""
+        if not len(self):
+            raise IndexError("replace_last on empty CandleSeries")
+        
+        i = self._end - 1
+        self._timestamp[i] = timestamp
+        self._open[i] = open
+        self._high[i] = high
+        self._low[i] = low
+        self._close[i] = close
+        self._volume[i] = volume
+    
+    def merge(self, klines: np.ndarray):
+        """
+        Merge a structured kline array: a candle with the same open time as the
+        last one replaces it, newer candles are appended, older ones ignored
+        """
+        if len(self) and len(klines):
+            last = self._timestamp[self._end - 1]
+            same = klines[klines['timestamp'] == last]
+            if len(same):
+                self.replace_last(*same[-1].tolist())
+            klines = klines[klines['timestamp'] > last]
+        self.extend(klines)
+    
+    def tail(self, n: int) -> 'CandleSeries':
+        """Copy of the last n candles"""
+        n = min(n, len(self))
+        series = CandleSeries(max(n, 1))
+        if n:
+            for dst, src in zip(series._columns(), self._columns()):
+                dst[:n] = src[self._end - n:self._end]
+            series._end = n
+        return series
+    
+    # Column views; they change when the series does, copy to keep them
+    @property
+    def timestamp(self) -> np.ndarray:
+        return self._timestamp[self._start:self._end]
+    
+    @property
+    def open(self) -> np.ndarray:
+        return self._open[self._start:self._end]
+    
+    @property
+    def high(self) -> np.ndarray:
+        return self._high[self._start:self._end]
+    
+    @property
+    def low(self) -> np.ndarray:
+        return self._low[self._start:self._end]
+    
+    @property
+    def close(self) -> np.ndarray:
+        return self._close[self._start:self._end]
+    
+    @property
+    def volume(self) -> np.ndarray:
+        return self._volume[self._start:self._end]
+    
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the column buffers"""
+        return sum(column.nbytes for column in self._columns())
+    
+    def __getitem__(self, index: int) -> Dict:
+        """Single candle as a kline dictionary (compatibility with List[Dict])"""
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("CandleSeries index out of range")
+        
+        i = self._start + index
+        return {
+            'timestamp': int(self._timestamp[i]),
+            'open': float(self._open[i]),
+            'high': float(self._high[i]),
+            'low': float(self._low[i]),
+            'close': float(self._close[i]),
+            'volume': float(self._volume[i]),
+        }
+    
+    def to_array(self) -> np.ndarray:
+        """Copy as a structured kline array (KLINE_DTYPE)"""
+        array = np.empty(len(self), dtype=KLINE_DTYPE)
+        for field, column in zip(KLINE_FIELDS, self._columns()):
+            array[field] = column[self._start:self._end]
+        return array
+    
+    def to_dicts(self) -> List[Dict]:
+        """Copy as a list of kline dictionaries"""
+        columns = [column[self._start:self._end].tolist() for column in self._columns()]
+        return [dict(zip(KLINE_FIELDS, row)) for row in zip(*columns)]
+    
+    def __repr__(self) -> str:
+        return f"CandleSeries(len={len(self)}, capacity={self.capacity})"
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Indicator compute stage
+Runs indicator math in a thread or process pool so the event loop only
+awaits results, and keeps updates of the same pair in order
+"""
+
+import asyncio
+import cProfile
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from config import COMPUTE_EXECUTOR, COMPUTE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+EXECUTORS = ('inline', 'thread', 'process')
+
+
+def _profiled(fn: Callable, *args) -> Tuple[object, Dict]:
+    """fn(*args) under a profiler of the worker's own; returns (result, pstats dict)"""
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler holds the hook
+        return fn(*args), {}
+    try:
+        result = fn(*args)
+    finally:
+        profile.disable()
+    profile.create_stats()
+    return result, profile.stats
+
+
+class ComputeStage:
+    """
+    Executor for CPU-bound indicator work
+    
+    'thread': NumPy releases the GIL in its kernels, so matrix passes run
+    alongside the loop. 'process': work runs in spawned processes, so calls
+    must be picklable. 'inline': everything runs on the calling thread, as
+    before.
+    
+    Only pure functions go through run() (window_values,
+    BatchIndicatorEngine.compute); callers apply the results to indicators
+    on the loop. Indicator state therefore only changes between awaits, and
+    readers on the loop (snapshots, /status) never see half an update.
+    
+    While the profiler records a scan cycle, tasks are profiled in the
+    worker and their stats merged into the session (cProfile on the loop
+    thread doesn't see other threads or processes).
+    
+    ordered() serialises work per key (e.g. a (symbol, timeframe) pair):
+    blocks for the same key run in the order they were entered, so indicator
+    state transitions don't depend on which computation finishes first.
+    """
+    
+    def __init__(self, executor: str = COMPUTE_EXECUTOR, workers: int = COMPUTE_WORKERS, profiler=None):
+        """
+        Args:
+            profiler: ScanProfiler whose sessions include the pool's tasks
+        """
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown COMPUTE_EXECUTOR '{executor}' (expected one of {', '.join(EXECUTORS)})")
+        self.mode = executor
+        self.workers = workers
+        self.profiler = profiler
+        self._executor: Optional[Executor] = None
+        self._tails: Dict[Hashable, asyncio.Future] = {}
+    
+    def _get_executor(self) -> Optional[Executor]:
+        # Created on first use: pools are useless to processes that never compute
+        if self._executor is None and self.mode == 'thread':
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='compute')
+        elif self._executor is None and self.mode == 'process':
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+    
+    async def run(self, fn: Callable, *args):
+        """fn(*args) in the executor; fn must not mutate state shared with the loop"""
+        if self.mode == 'inline':
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        if self.profiler is not None and self.profiler.recording:
+            result, stats = await loop.run_in_executor(self._get_executor(), _profiled, fn, *args)
+            self.profiler.add_stats(stats)
+            return result
+        return await loop.run_in_executor(self._get_executor(), fn, *args)
+    
+    @asynccontextmanager
+    async def ordered(self, keys: Iterable[Hashable]):
+        """Wait for earlier blocks holding any of `keys`; later ones wait for this one"""
+        keys = list(keys)
+        done = asyncio.get_running_loop().create_future()
+        # Registering in every key before waiting keeps the wait graph acyclic
+        previous = {id(tail): tail for tail in (self._tails.get(key) for key in keys) if tail is not None}
+        for key in keys:
+            self._tails[key] = done
+        try:
+            if previous:
+                # wait() (unlike gather) leaves the other blocks' futures alone on cancellation
+                await asyncio.wait(previous.values())
+            yield
+        finally:
+            pending = [tail for tail in previous.values() if not tail.done()]
+            if pending:
+                # Cancelled while waiting: later blocks must still wait for the earlier ones
+                waiter = asyncio.ensure_future(asyncio.wait(pending))
+                waiter.add_done_callback(lambda _: self._release(keys, done))
+            else:
+                self._release(keys, done)
+    
+    def _release(self, keys: List[Hashable], done: asyncio.Future):
+        done.set_result(None)
+        for key in keys:
+            if self._tails.get(key) is done:
+                del self._tails[key]
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -10,10 +10,8 @@ import os
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', 'YOUR_BOT_TOKEN_HERE')
 
 # Admin chat IDs (optional - for admin notifications)
-ADMIN_CHAT_IDS = [
-    # Add admin Telegram user IDs here
-    # Example: 123456789
-]
+# Comma-separated Telegram user IDs, e.g. ADMIN_CHAT_IDS=123456789,987654321
+ADMIN_CHAT_IDS = [int(i) for i in os.getenv('ADMIN_CHAT_IDS', '').split(',') if i.strip()]
 
 # ============== API KEYS ==============
 # Twelve Data API Key (for XAU/USD)
@@ -21,7 +19,20 @@ ADMIN_CHAT_IDS = [
 TWELVE_DATA_API_KEY = os.getenv('TWELVE_DATA_API_KEY', 'YOUR_TWELVE_DATA_API_KEY')
 
 # ============== TRADING PAIRS ==============
-SYMBOLS = ['BTCUSD', 'XAUUSD']
+# Comma-separated, e.g. SYMBOLS=BTCUSD,ETHUSD,XAUUSD,EURUSD
+SYMBOLS = [s.strip().upper() for s in os.getenv('SYMBOLS', 'BTCUSD,XAUUSD').split(',') if s.strip()]
+
+# Data provider per symbol: 'binance' or 'twelvedata', optionally with the
+# provider's ticker, e.g. SYMBOL_PROVIDERS=ETHUSD=binance,SOLUSD=binance:SOLUSDT
+# Unlisted symbols use DEFAULT_PROVIDER with the usual ticker format
+# (BTCUSD -> BTCUSDT on Binance, XAUUSD -> XAU/USD on Twelve Data)
+DEFAULT_PROVIDER = os.getenv('DEFAULT_PROVIDER', 'twelvedata')
+SYMBOL_PROVIDERS = {'BTCUSD': ('binance', 'BTCUSDT')}
+for _entry in os.getenv('SYMBOL_PROVIDERS', '').split(','):
+    if '=' in _entry:
+        _symbol, _, _provider = _entry.partition('=')
+        _provider, _, _ticker = _provider.partition(':')
+        SYMBOL_PROVIDERS[_symbol.strip().upper()] = (_provider.strip().lower(), _ticker.strip() or None)
 
 # ============== TIMEFRAMES ==============
 TIMEFRAMES = ['15m', '1h']
@@ -31,20 +42,133 @@ RSI_LENGTH = 14
 EMA_LENGTH = 9
 WMA_LENGTH = 45
 
+# RSI smoothing: 'wilder' (RMA, same as TradingView/Pine) or 'sma' (simple mean)
+RSI_MODE = os.getenv('RSI_MODE', 'wilder')
+
+# Streaming mode: keep running indicator state and advance it once per closed
+# candle in O(1) instead of recomputing the whole window on every check
+INDICATOR_STREAMING = os.getenv('INDICATOR_STREAMING', 'false').lower() == 'true'
+
+# Where indicator math runs: 'thread' or 'process' pool (keeps the event loop
+# free for Telegram updates and HTTP I/O) or 'inline' on the event loop
+COMPUTE_EXECUTOR = os.getenv('COMPUTE_EXECUTOR', 'thread')
+COMPUTE_WORKERS = int(os.getenv('COMPUTE_WORKERS', 2))
+
 # ============== BOT SETTINGS ==============
+# When to scan: 'candle_close' (just after each candle of a timeframe
+# closes) or 'interval' (every timeframe every CHECK_INTERVAL seconds)
+SCAN_SCHEDULE = os.getenv('SCAN_SCHEDULE', 'candle_close')
+
 # Check interval in seconds
 CHECK_INTERVAL = 60  # Check every 60 seconds
 
+# Scan in this many worker processes, each owning a hash partition of the
+# (symbol, timeframe) pairs; the bot process then only serves Telegram.
+# Every process gets an equal share of the API rate limits (0 = scan in the
+# bot process)
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', 0))
+
+# Candle-close scans start this long after the boundary, plus random jitter,
+# and retry pairs whose new candle isn't published yet (growing delay)
+CANDLE_CLOSE_DELAY = float(os.getenv('CANDLE_CLOSE_DELAY', 0.3))  # seconds
+CANDLE_CLOSE_JITTER = float(os.getenv('CANDLE_CLOSE_JITTER', 0.2))  # seconds
+CANDLE_CLOSE_RETRIES = int(os.getenv('CANDLE_CLOSE_RETRIES', 3))
+CANDLE_CLOSE_RETRY_DELAY = float(os.getenv('CANDLE_CLOSE_RETRY_DELAY', 1.0))  # seconds
+
 # Number of candles to fetch for calculation
 KLINE_LIMIT = 100
 
+# Pair buttons per page of the /status keyboard
+STATUS_PAGE_SIZE = int(os.getenv('STATUS_PAGE_SIZE', 8))
+
+# Closed candles are kept on disk here for warm restarts and backtests
+# ('' disables it). On Railway, mount a volume at this path or the history
+# is lost on every redeploy
+DATA_DIR = os.getenv('DATA_DIR', 'data')
+
+# Snapshot of subscribers and indicator state, restored on boot ('' disables it)
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', os.path.join(DATA_DIR, 'snapshot.bin') if DATA_DIR else '')
+SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', 60))  # seconds
+
+# Binance data source: 'rest' (poll every CHECK_INTERVAL) or 'websocket'
+# (kline streams push each closed candle as soon as it closes)
+BINANCE_INGESTION = os.getenv('BINANCE_INGESTION', 'rest')
+
+# Max concurrent HTTP requests per exchange client during a scan
+BINANCE_MAX_CONCURRENCY = int(os.getenv('BINANCE_MAX_CONCURRENCY', 10))
+TWELVE_DATA_MAX_CONCURRENCY = int(os.getenv('TWELVE_DATA_MAX_CONCURRENCY', 2))
+
+# Max symbols per Twelve Data batch request (each symbol still costs 1 credit;
+# the free plan allows 8 credits per minute). Capped at the per-minute credits
+# (per process when sharded): a bigger batch could never be sent
+TWELVE_DATA_BATCH_SIZE = int(os.getenv('TWELVE_DATA_BATCH_SIZE', 8))
+
+# ============== RATE LIMITS ==============
+# Binance request weight per minute (the limit is 6000 per IP; keep headroom)
+BINANCE_WEIGHT_PER_MINUTE = int(os.getenv('BINANCE_WEIGHT_PER_MINUTE', 5000))
+
+# Twelve Data API credits (free plan: 8 per minute, 800 per day); daily
+# credits are spread evenly across the UTC day, and the day's usage is kept
+# in the snapshot across restarts
+TWELVE_DATA_CREDITS_PER_MINUTE = int(os.getenv('TWELVE_DATA_CREDITS_PER_MINUTE', 8))
+TWELVE_DATA_DAILY_CREDITS = int(os.getenv('TWELVE_DATA_DAILY_CREDITS', 800))  # 0 = no daily limit
+
+# Max seconds a /status price lookup waits behind signal scans for budget
+STATUS_MAX_WAIT = float(os.getenv('STATUS_MAX_WAIT', 10))
+
+# Telegram broadcast limits: ~30 messages/s overall, 1/s per chat and about
+# 20/min per group
+BROADCAST_WORKERS = int(os.getenv('BROADCAST_WORKERS', 16))
+BROADCAST_GLOBAL_RATE = float(os.getenv('BROADCAST_GLOBAL_RATE', 25))  # messages per second
+BROADCAST_CHAT_INTERVAL = float(os.getenv('BROADCAST_CHAT_INTERVAL', 1.0))  # seconds
+BROADCAST_GROUP_INTERVAL = float(os.getenv('BROADCAST_GROUP_INTERVAL', 3.0))  # seconds
+BROADCAST_MAX_RETRIES = int(os.getenv('BROADCAST_MAX_RETRIES', 3))
+
+# ============== HTTP CONNECTION POOL ==============
+# Shared by all exchange clients
+HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', 10))
+HTTP_DNS_TTL = int(os.getenv('HTTP_DNS_TTL', 300))  # seconds
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', 30))  # seconds
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))  # seconds
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 10))  # seconds
+HTTP_COMPRESSION = os.getenv('HTTP_COMPRESSION', 'true').lower() == 'true'
+
+# Candles kept per symbol/timeframe for delta fetching (0 = always full fetch)
+KLINE_CACHE_SIZE = int(os.getenv('KLINE_CACHE_SIZE', 500))
+
+# /status price lookups: reuse a fetched price for this long, or the close of
+# a scanned/streamed candle updated at most PRICE_KLINE_MAX_AGE seconds ago
+PRICE_CACHE_TTL = float(os.getenv('PRICE_CACHE_TTL', 5))  # seconds
+PRICE_KLINE_MAX_AGE = float(os.getenv('PRICE_KLINE_MAX_AGE', 15))  # seconds (0 = never)
+
 # ============== OVERBOUGHT/OVERSOLD LEVELS ==============
-OVERBOUGHT_LEVEL = 80
-OVERSOLD_LEVEL = 20
+# RSI levels for setup step 1 and the setup resets
+OVERBOUGHT_LEVEL = float(os.getenv('OVERBOUGHT_LEVEL', 80))
+OVERSOLD_LEVEL = float(os.getenv('OVERSOLD_LEVEL', 20))
 
 # ============== LOGGING ==============
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
+# ============== METRICS ==============
+# Prometheus /metrics and a /healthz check, served on PORT
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+# /healthz fails when no scan finished for this long (0 = derived from the
+# scan schedule) or the event loop lags more than HEALTH_MAX_LOOP_LAG
+HEALTH_MAX_SCAN_AGE = float(os.getenv('HEALTH_MAX_SCAN_AGE', 0))  # seconds
+HEALTH_MAX_LOOP_LAG = float(os.getenv('HEALTH_MAX_LOOP_LAG', 5))  # seconds
+
+# ============== PROFILING ==============
+# Profile the first PROFILE_SCANS scan cycles after start (0 = off); admins
+# can also start a session with /profile N
+PROFILE_SCANS = int(os.getenv('PROFILE_SCANS', 0))
+# pstats dumps are written here
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(DATA_DIR, 'profiles') if DATA_DIR else 'profiles')
+# Event loop callbacks that block longer than this are recorded while profiling
+# (runs the loop in debug mode during the session; 0 = off)
+PROFILE_SLOW_CALLBACK = float(os.getenv('PROFILE_SLOW_CALLBACK', 0.1))  # seconds
+PROFILE_TOP = int(os.getenv('PROFILE_TOP', 20))  # functions in the summary
+
 # ============== RAILWAY SPECIFIC ==============
 # Railway sets PORT environment variable
 PORT = int(os.getenv('PORT', 8080))
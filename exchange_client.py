@@ -6,28 +6,428 @@ Supports Binance (for BTC/USD) and Twelve Data (for XAU/USD)
 """
 
 import aiohttp
+import asyncio
 import logging
-from typing import List, Dict, Optional
-from datetime import datetime
-from config import TWELVE_DATA_API_KEY
+import time
+import numpy as np
+from typing import List, Dict, Optional, Tuple, Callable, Awaitable, Union
+from datetime import datetime, timezone
+from candles import CandleSeries, KLINE_FIELDS, KLINE_DTYPE
+from rate_limiter import RequestScheduler, PRIORITY_SCAN, PRIORITY_STATUS
+from metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS, API_COST
+from config import (
+    TWELVE_DATA_API_KEY, KLINE_CACHE_SIZE, PRICE_CACHE_TTL, PRICE_KLINE_MAX_AGE,
+    BINANCE_MAX_CONCURRENCY, TWELVE_DATA_MAX_CONCURRENCY, TWELVE_DATA_BATCH_SIZE,
+    HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_DNS_TTL, HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_COMPRESSION,
+    BINANCE_WEIGHT_PER_MINUTE, TWELVE_DATA_CREDITS_PER_MINUTE, TWELVE_DATA_DAILY_CREDITS,
+    STATUS_MAX_WAIT
+)
+
+try:
+    # Optional fast JSON decoder
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    import json
+    json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# Candle length in milliseconds for each supported interval
+INTERVAL_MS = {
+    '1m': 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 60 * 60_000,
+    '4h': 4 * 60 * 60_000,
+    '1d': 24 * 60 * 60_000,
+}
+
+
+def parse_binance_klines(rows: list) -> np.ndarray:
+    """
+    Convert decoded Binance /klines rows to a structured kline array
+    
+    Columns are converted in bulk by NumPy instead of building a dict
+    with six float() calls per candle.
+    """
+    klines = np.empty(len(rows), dtype=KLINE_DTYPE)
+    if not rows:
+        return klines
+    
+    columns = list(zip(*rows))
+    for i, field in enumerate(KLINE_FIELDS):
+        klines[field] = columns[i]
+    return klines
+
+
+def parse_twelve_data_values(values: List[Dict]) -> np.ndarray:
+    """
+    Convert Twelve Data time_series values (newest first) to a structured
+    kline array in chronological order
+    
+    Datetimes are parsed in one vectorized call and read as UTC.
+    """
+    values = values[::-1]
+    klines = np.empty(len(values), dtype=KLINE_DTYPE)
+    if not values:
+        return klines
+    
+    klines['timestamp'] = np.array([v['datetime'] for v in values], dtype='datetime64[ms]').astype(np.int64)
+    for field in ('open', 'high', 'low', 'close'):
+        klines[field] = [v[field] for v in values]
+    klines['volume'] = [v.get('volume', 0) for v in values]
+    return klines
+
+
+def klines_to_dicts(klines: np.ndarray) -> List[Dict]:
+    """Compatibility view: structured kline array -> list of kline dictionaries"""
+    return [dict(zip(KLINE_FIELDS, row)) for row in klines.tolist()]
+
+
+def dicts_to_klines(klines: List[Dict]) -> np.ndarray:
+    """List of kline dictionaries -> structured kline array"""
+    return np.array([tuple(k[field] for field in KLINE_FIELDS) for k in klines], dtype=KLINE_DTYPE)
+
+
+def format_utc(timestamp_ms: int) -> str:
+    """Millisecond timestamp -> 'YYYY-MM-DD HH:MM:SS' in UTC"""
+    return datetime.fromtimestamp(timestamp_ms // 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class KlineCache:
+    """
+    Bounded per-(symbol, interval) kline buffer
+    
+    The last cached kline is the still-forming candle; everything before it
+    is closed. Delta fetches start right after the last closed candle, so the
+    forming candle is replaced in place and newer candles are appended.
+    """
+    
+    def __init__(self, max_size: int = KLINE_CACHE_SIZE):
+        self.max_size = max_size
+        self._klines: Dict[Tuple[str, str], CandleSeries] = {}
+        # time.monotonic() of the last reset/merge per (symbol, interval)
+        self._updated: Dict[Tuple[str, str], float] = {}
+    
+    def get(self, symbol: str, interval: str) -> Optional[CandleSeries]:
+        """Cached series (not a copy)"""
+        return self._klines.get((symbol, interval))
+    
+    def last_price(self, symbol: str, max_age: float) -> Optional[float]:
+        """
+        Close of the newest candle of any interval for `symbol`, if its
+        series was updated within `max_age` seconds
+        """
+        now = time.monotonic()
+        best = None
+        for (cached_symbol, interval), updated in self._updated.items():
+            if cached_symbol != symbol or now - updated > max_age:
+                continue
+            series = self._klines[(cached_symbol, interval)]
+            if len(series) and (best is None or updated > best[0]):
+                best = (updated, float(series.close[-1]))
+        return best[1] if best is not None else None
+    
+    def last_closed_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        """Open time of the last closed candle in the cache"""
+        series = self._klines.get((symbol, interval))
+        if series is None or len(series) < 2:
+            return None
+        return int(series.timestamp[-2])
+    
+    def delta_start(self, symbol: str, interval: str, limit: int) -> Optional[int]:
+        """
+        Timestamp to fetch newer candles from
+        
+        Returns:
+            None if a full fetch is needed (empty cache, not enough history,
+            or a gap since the last closed candle so wide that `limit`
+            candles from it might stop short of the forming one)
+        """
+        series = self._klines.get((symbol, interval))
+        last_closed = self.last_closed_timestamp(symbol, interval)
+        if last_closed is None or len(series) < limit:
+            return None
+        
+        interval_ms = INTERVAL_MS.get(interval)
+        if interval_ms is None:
+            return None
+        
+        # About `missed` candles follow the last closed one, the forming one
+        # included; the delta request returns the first `limit` of them
+        missed = (time.time() * 1000 - last_closed) / interval_ms
+        if missed >= limit - 1:
+            return None
+        return last_closed + 1
+    
+    def missing_bars(self, symbol: str, interval: str) -> int:
+        """Number of candles expected since the last closed one"""
+        last_closed = self.last_closed_timestamp(symbol, interval)
+        interval_ms = INTERVAL_MS.get(interval)
+        if last_closed is None or interval_ms is None:
+            return 0
+        return int((time.time() * 1000 - last_closed) // interval_ms)
+    
+    def reset(self, symbol: str, interval: str, klines: np.ndarray):
+        """Replace the cached klines after a full fetch"""
+        self._klines[(symbol, interval)] = CandleSeries.from_array(
+            klines, capacity=max(self.max_size, len(klines), 1)
+        )
+        self._updated[(symbol, interval)] = time.monotonic()
+    
+    def merge(self, symbol: str, interval: str, klines: np.ndarray):
+        """Merge newer klines, replacing the forming candle in place"""
+        series = self._klines.get((symbol, interval))
+        if series is None or len(series) == 0:
+            self.reset(symbol, interval, klines)
+            return
+        series.merge(klines)
+        self._updated[(symbol, interval)] = time.monotonic()
+    
+    def tail(self, symbol: str, interval: str, limit: int) -> CandleSeries:
+        """Copy of the last `limit` cached klines in chronological order"""
+        series = self._klines.get((symbol, interval))
+        if series is None:
+            return CandleSeries(1)
+        return series.tail(limit)
+    
+    def clear(self):
+        self._klines.clear()
+        self._updated.clear()
+
+
+class PriceCache:
+    """
+    Short-lived cache of current prices with request coalescing
+    
+    A fetched price is reused for `ttl` seconds. Failing that, the close of
+    a candle the kline cache received within `kline_max_age` seconds stands
+    in for it. Concurrent misses for one symbol share a single request.
+    """
+    
+    def __init__(self, ttl: float = PRICE_CACHE_TTL, kline_cache: Optional[KlineCache] = None,
+                 kline_max_age: float = PRICE_KLINE_MAX_AGE):
+        self.ttl = ttl
+        self.kline_cache = kline_cache
+        self.kline_max_age = kline_max_age
+        self._prices: Dict[str, Tuple[float, float]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        
+        # Lookup statistics
+        self.hits = 0
+        self.kline_hits = 0
+        self.coalesced = 0
+        self.fetches = 0
+    
+    def get_cached(self, symbol: str) -> Optional[float]:
+        """Fresh cached price, or the fresh kline close, without fetching"""
+        entry = self._prices.get(symbol)
+        if entry is not None and time.monotonic() - entry[1] <= self.ttl:
+            self.hits += 1
+            return entry[0]
+        
+        if self.kline_cache is not None and self.kline_max_age > 0:
+            price = self.kline_cache.last_price(symbol, self.kline_max_age)
+            if price is not None:
+                self.kline_hits += 1
+                return price
+        return None
+    
+    def set(self, symbol: str, price: float):
+        self._prices[symbol] = (price, time.monotonic())
+    
+    async def get(self, symbol: str, fetch: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Cached price, or the result of `fetch()` shared by all callers
+        waiting on the same symbol
+        
+        Args:
+            fetch: Coroutine function returning {'price': float}; a price of
+                0.0 means the fetch failed and is not cached
+        """
+        price = self.get_cached(symbol)
+        if price is not None:
+            return {'price': price}
+        
+        future = self._inflight.get(symbol)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            self.fetches += 1
+            future = self._inflight[symbol] = asyncio.ensure_future(fetch())
+            future.add_done_callback(lambda f: self._fetched(symbol, f))
+        # A cancelled caller must not cancel the request the others wait on
+        return dict(await asyncio.shield(future))
+    
+    def _fetched(self, symbol: str, future: asyncio.Future):
+        self._inflight.pop(symbol, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        price = future.result().get('price', 0.0)
+        if price:
+            self.set(symbol, price)
+    
+    def clear(self):
+        self._prices.clear()
+
+
+class HTTPSessionFactory:
+    """
+    Shared, tuned aiohttp session for all exchange clients
+    
+    One connector with bounded per-host connections, a DNS cache and
+    keep-alive, plus explicit connect/read timeouts so a stalled socket
+    can't hang a scan. Sessions are created lazily inside the running loop.
+    """
+    
+    def __init__(self, limit: int = HTTP_POOL_LIMIT, limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+                 dns_ttl: int = HTTP_DNS_TTL, keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT, read_timeout: float = HTTP_READ_TIMEOUT,
+                 compression: bool = HTTP_COMPRESSION):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.compression = compression
+        self.connector = None
+        self.session = None
+        self.stream_sessions = []
+    
+    def _get_connector(self) -> aiohttp.TCPConnector:
+        if self.connector is None or self.connector.closed:
+            self.connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+        return self.connector
+    
+    def _new_session(self, timeout: aiohttp.ClientTimeout) -> aiohttp.ClientSession:
+        headers = {'Accept-Encoding': 'gzip, deflate' if self.compression else 'identity'}
+        return aiohttp.ClientSession(
+            connector=self._get_connector(),
+            connector_owner=False,
+            timeout=timeout,
+            headers=headers,
+        )
+    
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get or create the shared REST session"""
+        if self.session is None or self.session.closed:
+            self.session = self._new_session(aiohttp.ClientTimeout(
+                connect=self.connect_timeout,
+                sock_read=self.read_timeout,
+            ))
+        return self.session
+    
+    async def create_stream_session(self) -> aiohttp.ClientSession:
+        """
+        Create a session for long-lived WebSocket streams
+        
+        Shares the connector but has no read timeout, which would otherwise
+        drop idle streams.
+        """
+        session = self._new_session(aiohttp.ClientTimeout(connect=self.connect_timeout))
+        self.stream_sessions.append(session)
+        return session
+    
+    async def close(self):
+        """Close all sessions and the connector"""
+        for session in [self.session] + self.stream_sessions:
+            if session and not session.closed:
+                await session.close()
+        self.stream_sessions = []
+        if self.connector and not self.connector.closed:
+            await self.connector.close()
+
+
 class BinanceClient:
     """Client for Binance API"""
     
     BASE_URL = "https://api.binance.com/api/v3"
+    # Provider label for metrics
+    PROVIDER = 'binance'
+    WS_URL = "wss://stream.binance.com:9443/stream"
     
-    def __init__(self):
-        self.session = None
+    # Request weights (GET /klines, GET /ticker/price and GET /exchangeInfo for one symbol)
+    KLINES_WEIGHT = 2
+    PRICE_WEIGHT = 2
+    EXCHANGE_INFO_WEIGHT = 20
+    
+    def __init__(self, cache_size: int = KLINE_CACHE_SIZE,
+                 max_concurrency: int = BINANCE_MAX_CONCURRENCY,
+                 session_factory: Optional[HTTPSessionFactory] = None,
+                 scheduler: Optional[RequestScheduler] = None, rate_share: float = 1.0):
+        # A factory passed in is shared and closed by its owner
+        self.owns_session_factory = session_factory is None
+        self.session_factory = session_factory or HTTPSessionFactory()
+        # Limits in-flight requests when symbols are scanned concurrently
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # Request weight budget per IP, synced from X-MBX-USED-WEIGHT-1M
+        # (rate_share: this process's part of it)
+        self.scheduler = scheduler or RequestScheduler(
+            'Binance', BINANCE_WEIGHT_PER_MINUTE, weight_header='X-MBX-USED-WEIGHT-1M', share=rate_share,
+            min_per_minute=self.EXCHANGE_INFO_WEIGHT
+        )
+        # cache_size=0 disables delta fetching
+        self.kline_cache = KlineCache(cache_size) if cache_size else None
+        self.price_cache = PriceCache(kline_cache=self.kline_cache)
     
     async def _get_session(self):
         """Get or create aiohttp session"""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        return await self.session_factory.get_session()
     
-    async def get_klines(self, symbol: str, interval: str, limit: int = 100) -> List[Dict]:
+    async def _get_json(self, path: str, params: Dict, weight: int,
+                        priority: int = PRIORITY_SCAN, max_wait: Optional[float] = None,
+                        accept: Tuple[int, ...] = (200,)):
+        """
+        GET an endpoint once the rate limiter allows it
+        
+        Args:
+            max_wait: Give up if the request can't be scheduled within this
+                many seconds
+            accept: HTTP statuses whose body is returned (Binance reports
+                unknown symbols as 400 with an error code)
+        
+        Returns:
+            Decoded JSON, or None on an HTTP error or timeout
+        """
+        try:
+            await asyncio.wait_for(self.scheduler.acquire(weight, priority), max_wait)
+        except asyncio.TimeoutError:
+            logger.warning(f"Binance rate limit: no budget for {path} within {max_wait:.0f}s")
+            return None
+        
+        API_COST.inc(weight, provider=self.PROVIDER)
+        
+        session = await self._get_session()
+        async with self.semaphore:
+            started = time.perf_counter()
+            try:
+                async with session.get(f"{self.BASE_URL}{path}", params=params) as response:
+                    self.scheduler.observe(response.status, response.headers)
+                    body = await response.read()
+            except Exception:
+                HTTP_REQUESTS.inc(provider=self.PROVIDER, status='error')
+                raise
+            finally:
+                HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, provider=self.PROVIDER, endpoint=path)
+        
+        HTTP_REQUESTS.inc(provider=self.PROVIDER, status=response.status)
+        if response.status not in accept:
+            logger.error(f"Binance API error: {response.status}")
+            return None
+        
+        return json_loads(body)
+    
+    async def get_klines(self, symbol: str, interval: str, limit: int = 100,
+                         columnar: bool = False) -> Union[List[Dict], CandleSeries]:
         """
         Get candlestick data from Binance
         
@@ -35,83 +435,243 @@ class BinanceClient:
             symbol: Trading pair (e.g., 'BTCUSDT')
             interval: Timeframe (e.g., '15m', '1h')
             limit: Number of candles to fetch
+            columnar: Return a CandleSeries instead of a list of kline
+                dictionaries
         
         Returns:
-            List of kline dictionaries
+            Klines in chronological order
         """
         try:
-            session = await self._get_session()
-            url = f"{self.BASE_URL}/klines"
             params = {
                 'symbol': symbol,
                 'interval': interval,
                 'limit': limit
             }
             
-            async with session.get(url, params=params) as response:
-                if response.status != 200:
-                    logger.error(f"Binance API error: {response.status}")
-                    return []
-                
-                data = await response.json()
-                
-                # Convert to standard format
-                klines = []
-                for k in data:
-                    klines.append({
-                        'timestamp': k[0],
-                        'open': float(k[1]),
-                        'high': float(k[2]),
-                        'low': float(k[3]),
-                        'close': float(k[4]),
-                        'volume': float(k[5])
-                    })
-                
-                return klines
+            # Only ask for candles after the last closed one we already have
+            start = self.kline_cache.delta_start(symbol, interval, limit) if self.kline_cache else None
+            if start is not None:
+                params['startTime'] = start
+            
+            data = await self._get_json('/klines', params, self.KLINES_WEIGHT)
+            if data is None:
+                return [] if not columnar else CandleSeries(1)
+            
+            klines = parse_binance_klines(data)
+            
+            if self.kline_cache is None:
+                series = CandleSeries.from_array(klines)
+            else:
+                if start is None:
+                    self.kline_cache.reset(symbol, interval, klines)
+                else:
+                    self.kline_cache.merge(symbol, interval, klines)
+                series = self.kline_cache.tail(symbol, interval, limit)
+            
+            return series if columnar else series.to_dicts()
                 
         except Exception as e:
             logger.error(f"Error fetching Binance klines: {e}")
-            return []
+            return [] if not columnar else CandleSeries(1)
+    
+    async def get_price(self, symbol: str, priority: int = PRIORITY_STATUS) -> Dict:
+        """Get current price for a symbol (cached briefly, concurrent calls coalesced)"""
+        return await self.price_cache.get(symbol, lambda: self._fetch_price(symbol, priority))
     
-    async def get_price(self, symbol: str) -> Dict:
-        """Get current price for a symbol"""
+    async def _fetch_price(self, symbol: str, priority: int) -> Dict:
         try:
-            session = await self._get_session()
-            url = f"{self.BASE_URL}/ticker/price"
             params = {'symbol': symbol}
             
-            async with session.get(url, params=params) as response:
-                if response.status != 200:
-                    logger.error(f"Binance API error: {response.status}")
-                    return {'price': 0.0}
-                
-                data = await response.json()
-                return {'price': float(data['price'])}
+            max_wait = STATUS_MAX_WAIT if priority == PRIORITY_STATUS else None
+            data = await self._get_json('/ticker/price', params, self.PRICE_WEIGHT, priority, max_wait)
+            if data is None:
+                return {'price': 0.0}
+            
+            return {'price': float(data['price'])}
                 
         except Exception as e:
             logger.error(f"Error fetching Binance price: {e}")
             return {'price': 0.0}
     
+    async def has_symbol(self, symbol: str) -> Optional[bool]:
+        """
+        True if Binance trades the symbol (e.g. 'BTCUSDT')
+        
+        Returns:
+            None if it couldn't be checked (HTTP error, timeout, no budget)
+        """
+        try:
+            data = await self._get_json('/exchangeInfo', {'symbol': symbol}, self.EXCHANGE_INFO_WEIGHT,
+                                        PRIORITY_STATUS, STATUS_MAX_WAIT, accept=(200, 400))
+            if data is None:
+                return None
+            if 'symbols' in data:
+                return any(info['symbol'] == symbol and info.get('status') == 'TRADING' for info in data['symbols'])
+            # -1121: Invalid symbol
+            if data.get('code') == -1121:
+                return False
+            logger.error(f"Unexpected Binance exchangeInfo response: {data}")
+            return None
+            
+        except Exception as e:
+            logger.error(f"Error checking Binance symbol {symbol}: {e}")
+            return None
+    
+    async def stream_klines(self, pairs: List[Tuple[str, str]],
+                            on_kline: Callable[[str, str, Dict, bool], Awaitable[None]],
+                            on_connect: Optional[Callable[[], Awaitable[None]]] = None,
+                            max_reconnect_delay: float = 60.0):
+        """
+        Subscribe to combined <symbol>@kline_<interval> WebSocket streams
+        
+        Runs until cancelled and reconnects with exponential backoff.
+        
+        Args:
+            pairs: (symbol, interval) tuples (e.g., [('BTCUSDT', '15m')])
+            on_kline: Called as on_kline(symbol, interval, kline, is_closed)
+                for every kline update
+            on_connect: Called after each (re)connection, before any kline is
+                delivered, e.g. to backfill history over REST
+            max_reconnect_delay: Upper bound for the reconnect backoff
+        """
+        streams = '/'.join(f"{symbol.lower()}@kline_{interval}" for symbol, interval in pairs)
+        url = f"{self.WS_URL}?streams={streams}"
+        delay = 1.0
+        
+        session = await self.session_factory.create_stream_session()
+        while True:
+            try:
+                async with session.ws_connect(url, heartbeat=30) as ws:
+                    logger.info(f"Binance kline stream connected ({len(pairs)} streams)")
+                    delay = 1.0
+                    
+                    if on_connect is not None:
+                        await on_connect()
+                    
+                    async for msg in ws:
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            if msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                            continue
+                        
+                        k = json_loads(msg.data)['data']['k']
+                        kline = {
+                            'timestamp': k['t'],
+                            'open': float(k['o']),
+                            'high': float(k['h']),
+                            'low': float(k['l']),
+                            'close': float(k['c']),
+                            'volume': float(k['v'])
+                        }
+                        
+                        if self.kline_cache is not None:
+                            self.kline_cache.merge(k['s'], k['i'], dicts_to_klines([kline]))
+                        
+                        await on_kline(k['s'], k['i'], kline, k['x'])
+                
+                logger.warning("Binance kline stream closed")
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Binance kline stream error: {e}")
+            
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_reconnect_delay)
+    
     async def close(self):
         """Close the session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        if self.owns_session_factory:
+            await self.session_factory.close()
 
 
 class TwelveDataClient:
     """Client for Twelve Data API (for forex and commodities)"""
     
     BASE_URL = "https://api.twelvedata.com"
+    # Provider label for metrics
+    PROVIDER = 'twelvedata'
     
-    def __init__(self):
+    def __init__(self, cache_size: int = KLINE_CACHE_SIZE,
+                 max_concurrency: int = TWELVE_DATA_MAX_CONCURRENCY,
+                 session_factory: Optional[HTTPSessionFactory] = None,
+                 scheduler: Optional[RequestScheduler] = None, rate_share: float = 1.0):
         self.api_key = TWELVE_DATA_API_KEY
-        self.session = None
+        # A factory passed in is shared and closed by its owner
+        self.owns_session_factory = session_factory is None
+        self.session_factory = session_factory or HTTPSessionFactory()
+        # Limits in-flight requests when symbols are scanned concurrently
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # API credits (1 per symbol) per minute, spread over the daily quota
+        # (rate_share: this process's part of it)
+        self.scheduler = scheduler or RequestScheduler(
+            'Twelve Data', TWELVE_DATA_CREDITS_PER_MINUTE,
+            daily_limit=TWELVE_DATA_DAILY_CREDITS, remaining_header='api-credits-left', share=rate_share
+        )
+        # A batch costs 1 credit per symbol, so it can't exceed one minute's budget
+        self.batch_size = max(min(TWELVE_DATA_BATCH_SIZE, int(self.scheduler.max_cost)), 1)
+        if TWELVE_DATA_BATCH_SIZE > TWELVE_DATA_CREDITS_PER_MINUTE:
+            logger.warning(f"TWELVE_DATA_BATCH_SIZE={TWELVE_DATA_BATCH_SIZE} exceeds "
+                           f"TWELVE_DATA_CREDITS_PER_MINUTE={TWELVE_DATA_CREDITS_PER_MINUTE}; "
+                           f"using batches of {self.batch_size}")
+        elif self.batch_size < TWELVE_DATA_BATCH_SIZE:
+            logger.info(f"Twelve Data batches of {self.batch_size} fit this process's "
+                        f"{self.scheduler.per_minute:g} credits per minute")
+        # cache_size=0 disables delta fetching
+        self.kline_cache = KlineCache(cache_size) if cache_size else None
+        self.price_cache = PriceCache(kline_cache=self.kline_cache)
     
     async def _get_session(self):
         """Get or create aiohttp session"""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
-        return self.session
+        return await self.session_factory.get_session()
+    
+    async def _get_json(self, path: str, params: Dict, credits: int,
+                        priority: int = PRIORITY_SCAN, max_wait: Optional[float] = None):
+        """
+        GET an endpoint once the rate limiter allows it
+        
+        Args:
+            max_wait: Give up if the request can't be scheduled within this
+                many seconds
+        
+        Returns:
+            Decoded JSON, or None on an HTTP error, timeout or when out of credits
+        """
+        try:
+            await asyncio.wait_for(self.scheduler.acquire(credits, priority), max_wait)
+        except asyncio.TimeoutError:
+            logger.warning(f"Twelve Data rate limit: no budget for {path} within {max_wait:.0f}s")
+            return None
+        
+        API_COST.inc(credits, provider=self.PROVIDER)
+        
+        session = await self._get_session()
+        async with self.semaphore:
+            started = time.perf_counter()
+            try:
+                async with session.get(f"{self.BASE_URL}{path}", params=params) as response:
+                    self.scheduler.observe(response.status, response.headers)
+                    body = await response.read()
+            except Exception:
+                HTTP_REQUESTS.inc(provider=self.PROVIDER, status='error')
+                raise
+            finally:
+                HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, provider=self.PROVIDER, endpoint=path)
+        
+        HTTP_REQUESTS.inc(provider=self.PROVIDER, status=response.status)
+        if response.status != 200:
+            logger.error(f"Twelve Data API error: {response.status}")
+            return None
+        
+        data = json_loads(body)
+        
+        # Running out of credits is reported in the body with HTTP 200
+        if isinstance(data, dict) and data.get('code') == 429:
+            self.scheduler.observe(429, {'Retry-After': 60 - time.time() % 60})
+            logger.error(f"Twelve Data API error: {data.get('message')}")
+            return None
+        
+        return data
     
     def _convert_interval(self, interval: str) -> str:
         """Convert interval format to Twelve Data format"""
@@ -127,7 +687,8 @@ class TwelveDataClient:
         }
         return mapping.get(interval, interval)
     
-    async def get_klines(self, symbol: str, interval: str, limit: int = 100) -> List[Dict]:
+    async def get_klines(self, symbol: str, interval: str, limit: int = 100,
+                         columnar: bool = False) -> Union[List[Dict], CandleSeries]:
         """
         Get candlestick data from Twelve Data
         
@@ -135,90 +696,258 @@ class TwelveDataClient:
             symbol: Trading pair (e.g., 'XAU/USD')
             interval: Timeframe (e.g., '15m', '1h')
             limit: Number of candles to fetch
+            columnar: Return a CandleSeries instead of a list of kline
+                dictionaries
         
         Returns:
-            List of kline dictionaries
+            Klines in chronological order
         """
         try:
             if not self.api_key:
                 logger.error("Twelve Data API key not configured")
-                return []
-            
-            session = await self._get_session()
-            url = f"{self.BASE_URL}/time_series"
+                return [] if not columnar else CandleSeries(1)
             
             params = {
                 'symbol': symbol,
                 'interval': self._convert_interval(interval),
                 'outputsize': limit,
+                'timezone': 'UTC',
                 'apikey': self.api_key
             }
             
-            async with session.get(url, params=params) as response:
-                if response.status != 200:
-                    logger.error(f"Twelve Data API error: {response.status}")
-                    return []
-                
-                data = await response.json()
-                
-                if 'values' not in data:
-                    logger.error(f"Unexpected Twelve Data response: {data}")
-                    return []
+            # Only ask for candles after the last closed one we already have
+            start = self.kline_cache.delta_start(symbol, interval, limit) if self.kline_cache else None
+            if start is not None:
+                params['start_date'] = format_utc(start)
+                params['outputsize'] = min(limit, self.kline_cache.missing_bars(symbol, interval) + 2)
+            
+            data = await self._get_json('/time_series', params, 1)
+            if data is None:
+                return [] if not columnar else CandleSeries(1)
+            
+            if 'values' in data:
+                klines = self._store_klines(symbol, interval, parse_twelve_data_values(data['values']), start, limit)
+            elif start is not None and data.get('status') == 'error' and data.get('code') == 400:
+                # No newer candles since the last closed one
+                klines = self.kline_cache.tail(symbol, interval, limit)
+            else:
+                logger.error(f"Unexpected Twelve Data response: {data}")
+                return [] if not columnar else CandleSeries(1)
+            
+            return klines if columnar else klines.to_dicts()
                 
-                # Convert to standard format
-                klines = []
-                for v in reversed(data['values']):  # Reverse to get chronological order
-                    klines.append({
-                        'timestamp': int(datetime.strptime(v['datetime'], '%Y-%m-%d %H:%M:%S').timestamp() * 1000),
-                        'open': float(v['open']),
-                        'high': float(v['high']),
-                        'low': float(v['low']),
-                        'close': float(v['close']),
-                        'volume': float(v.get('volume', 0))
-                    })
+        except Exception as e:
+            logger.error(f"Error fetching Twelve Data klines: {e}")
+            return [] if not columnar else CandleSeries(1)
+    
+    async def get_klines_many(self, symbols: List[str], interval: str, limit: int = 100,
+                              columnar: bool = False) -> Dict[str, Union[List[Dict], CandleSeries]]:
+        """
+        Get candlestick data for several symbols with one request per batch
+        
+        Args:
+            symbols: Trading pairs (e.g., ['XAU/USD', 'EUR/USD'])
+            interval: Timeframe (e.g., '15m', '1h')
+            limit: Number of candles to fetch per symbol
+            columnar: Return CandleSeries instead of lists of kline
+                dictionaries
+        
+        Returns:
+            Dict of symbol -> klines (missing on error)
+        """
+        result = {}
+        for i in range(0, len(symbols), self.batch_size):
+            result.update(await self._get_klines_batch(symbols[i:i + self.batch_size], interval, limit))
+        
+        if columnar:
+            return result
+        return {symbol: klines.to_dicts() for symbol, klines in result.items()}
+    
+    async def _get_klines_batch(self, symbols: List[str], interval: str,
+                                limit: int) -> Dict[str, CandleSeries]:
+        """Fetch one batch of symbols from the time_series endpoint"""
+        try:
+            if not self.api_key:
+                logger.error("Twelve Data API key not configured")
+                return {}
+            
+            params = {
+                'symbol': ','.join(symbols),
+                'interval': self._convert_interval(interval),
+                'outputsize': limit,
+                'timezone': 'UTC',
+                'apikey': self.api_key
+            }
+            
+            # Delta fetch only if every symbol in the batch has cached history;
+            # start from the oldest last closed candle among them
+            starts = {
+                symbol: self.kline_cache.delta_start(symbol, interval, limit) if self.kline_cache else None
+                for symbol in symbols
+            }
+            delta = all(start is not None for start in starts.values())
+            if delta:
+                start = min(starts.values())
+                missing = max(self.kline_cache.missing_bars(symbol, interval) for symbol in symbols)
+                params['start_date'] = format_utc(start)
+                params['outputsize'] = min(limit, missing + 2)
+            
+            data = await self._get_json('/time_series', params, len(symbols))
+            if data is None:
+                return {}
+            
+            # A single symbol comes back unwrapped
+            if len(symbols) == 1:
+                data = {symbols[0]: data}
+            
+            result = {}
+            for symbol in symbols:
+                entry = data.get(symbol) or {}
+                start = starts[symbol] if delta else None
                 
-                return klines
+                if 'values' not in entry:
+                    if start is not None and entry.get('status') == 'error' and entry.get('code') == 400:
+                        # No newer candles since the last closed one
+                        result[symbol] = self.kline_cache.tail(symbol, interval, limit)
+                    else:
+                        logger.error(f"Unexpected Twelve Data response for {symbol}: {entry}")
+                    continue
                 
+                klines = parse_twelve_data_values(entry['values'])
+                result[symbol] = self._store_klines(symbol, interval, klines, start, limit)
+            
+            return result
+            
         except Exception as e:
-            logger.error(f"Error fetching Twelve Data klines: {e}")
-            return []
+            logger.error(f"Error fetching Twelve Data klines batch: {e}")
+            return {}
     
-    async def get_price(self, symbol: str) -> Dict:
-        """Get current price for a symbol"""
+    def _store_klines(self, symbol: str, interval: str, klines: np.ndarray,
+                      start: Optional[int], limit: int) -> CandleSeries:
+        """Merge fetched klines into the cache and return the last `limit`"""
+        if self.kline_cache is None:
+            return CandleSeries.from_array(klines)
+        
+        if start is None:
+            self.kline_cache.reset(symbol, interval, klines)
+        else:
+            self.kline_cache.merge(symbol, interval, klines)
+        return self.kline_cache.tail(symbol, interval, limit)
+    
+    async def get_price(self, symbol: str, priority: int = PRIORITY_STATUS) -> Dict:
+        """Get current price for a symbol (cached briefly, concurrent calls coalesced)"""
+        return await self.price_cache.get(symbol, lambda: self._fetch_price(symbol, priority))
+    
+    async def _fetch_price(self, symbol: str, priority: int) -> Dict:
         try:
             if not self.api_key:
                 logger.error("Twelve Data API key not configured")
                 return {'price': 0.0}
             
-            session = await self._get_session()
-            url = f"{self.BASE_URL}/price"
+            params = {
+                'symbol': symbol,
+                'apikey': self.api_key
+            }
+            
+            max_wait = STATUS_MAX_WAIT if priority == PRIORITY_STATUS else None
+            data = await self._get_json('/price', params, 1, priority, max_wait)
+            if data is None:
+                return {'price': 0.0}
+            
+            if 'price' not in data:
+                logger.error(f"Unexpected Twelve Data response: {data}")
+                return {'price': 0.0}
+            
+            return {'price': float(data['price'])}
+                
+        except Exception as e:
+            logger.error(f"Error fetching Twelve Data price: {e}")
+            return {'price': 0.0}
+    
+    async def has_symbol(self, symbol: str) -> Optional[bool]:
+        """
+        True if Twelve Data lists the symbol (e.g. 'XAU/USD')
+        
+        Returns:
+            None if it couldn't be checked (no API key, HTTP error, timeout,
+            no credits)
+        """
+        try:
+            if not self.api_key:
+                logger.error("Twelve Data API key not configured")
+                return None
             
             params = {
                 'symbol': symbol,
                 'apikey': self.api_key
             }
             
-            async with session.get(url, params=params) as response:
-                if response.status != 200:
-                    logger.error(f"Twelve Data API error: {response.status}")
-                    return {'price': 0.0}
+            data = await self._get_json('/symbol_search', params, 1, PRIORITY_STATUS, STATUS_MAX_WAIT)
+            if data is None:
+                return None
+            
+            if 'data' not in data:
+                logger.error(f"Unexpected Twelve Data response: {data}")
+                return None
+            
+            return any(match.get('symbol', '').upper() == symbol.upper() for match in data['data'])
+            
+        except Exception as e:
+            logger.error(f"Error checking Twelve Data symbol {symbol}: {e}")
+            return None
+    
+    async def get_prices_many(self, symbols: List[str], priority: int = PRIORITY_STATUS) -> Dict[str, Dict]:
+        """
+        Get current prices for several symbols with one request per batch
+        
+        Returns:
+            Dict of symbol -> {'price': float} (missing on error)
+        """
+        result = {}
+        for symbol in symbols:
+            price = self.price_cache.get_cached(symbol)
+            if price is not None:
+                result[symbol] = {'price': price}
+        symbols = [symbol for symbol in symbols if symbol not in result]
+        
+        for i in range(0, len(symbols), self.batch_size):
+            batch = symbols[i:i + self.batch_size]
+            try:
+                if not self.api_key:
+                    logger.error("Twelve Data API key not configured")
+                    return result
                 
-                data = await response.json()
+                params = {
+                    'symbol': ','.join(batch),
+                    'apikey': self.api_key
+                }
                 
-                if 'price' not in data:
-                    logger.error(f"Unexpected Twelve Data response: {data}")
-                    return {'price': 0.0}
+                max_wait = STATUS_MAX_WAIT if priority == PRIORITY_STATUS else None
+                data = await self._get_json('/price', params, len(batch), priority, max_wait)
+                if data is None:
+                    continue
                 
-                return {'price': float(data['price'])}
+                # A single symbol comes back unwrapped
+                if len(batch) == 1:
+                    data = {batch[0]: data}
                 
-        except Exception as e:
-            logger.error(f"Error fetching Twelve Data price: {e}")
-            return {'price': 0.0}
+                for symbol in batch:
+                    entry = data.get(symbol) or {}
+                    if 'price' not in entry:
+                        logger.error(f"Unexpected Twelve Data response for {symbol}: {entry}")
+                        continue
+                    result[symbol] = {'price': float(entry['price'])}
+                    self.price_cache.set(symbol, result[symbol]['price'])
+                    
+            except Exception as e:
+                logger.error(f"Error fetching Twelve Data prices batch: {e}")
+        
+        return result
     
     async def close(self):
         """Close the session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        if self.owns_session_factory:
+            await self.session_factory.close()
 
 
 # Example usage for testing
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telegram message templates
+Precompiled Markdown templates and a cache of the indicator-dependent
+parts, rendered once per indicator update instead of once per request
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+# Indicator values, shared by alerts and /status
+INDICATORS_TEMPLATE = """**Chỉ báo:**
+RSI: {rsi:.2f}
+EMA9: {ema9:.2f}
+WMA45: {wma45:.2f}"""
+
+SETUP_TEMPLATE = INDICATORS_TEMPLATE + """
+
+**🟢 BUY SETUP:**
+{buy_step1} Bước 1: RSI≥{overbought:g}
+{buy_step2} Bước 2: RSI↓EMA9
+{buy_step3} Bước 3: RSI↓WMA45
+{buy_step4} Bước 4: EMA9↓WMA45
+Status: {buy_ready}
+Crosses: {buy_cross_count}
+Entry #1: {buy_entry1_count}/2
+
+**🔴 SELL SETUP:**
+{sell_step1} Bước 1: RSI≤{oversold:g}
+{sell_step2} Bước 2: RSI↑EMA9
+{sell_step3} Bước 3: RSI↑WMA45
+{sell_step4} Bước 4: EMA9↑WMA45
+Status: {sell_ready}
+Crosses: {sell_cross_count}
+Entry #1: {sell_entry1_count}/2"""
+
+STATS_TEMPLATE = "  {timeframe}: BUY#1={total_buy_1}, BUY#2={total_buy_2}, SELL#1={total_sell_1}, SELL#2={total_sell_2}\n"
+
+STATUS_TEMPLATE = """
+📊 **{symbol} - {timeframe}**
+💰 Giá: ${price:,.2f}
+
+{setup}
+
+⏰ Cập nhật: {time}
+"""
+
+ALERT_TEMPLATE = """
+{emoji} **TÍN HIỆU {signal_type}** {emoji}
+
+📊 **{symbol}** | ⏰ **{timeframe}**
+💰 Giá: ${price:,.2f}
+
+**Độ mạnh:** {strength}
+
+{indicators}
+
+⏰ {time}
+"""
+
+# Bound format methods: rendering is a single call with the fields
+render_indicators = INDICATORS_TEMPLATE.format
+render_setup = SETUP_TEMPLATE.format
+render_stats = STATS_TEMPLATE.format
+render_status = STATUS_TEMPLATE.format
+render_alert = ALERT_TEMPLATE.format
+
+
+def _mark(done: bool) -> str:
+    return '✓' if done else '○'
+
+
+def setup_fields(indicator) -> Dict:
+    """Template fields for SETUP_TEMPLATE from an RSIFollowTrend"""
+    status = indicator.get_status()
+    status.update(
+        overbought=indicator.overbought,
+        oversold=indicator.oversold,
+        buy_ready='🟢 READY!' if status['buy_setup_ready'] else '⏳ Chờ...',
+        sell_ready='🔴 READY!' if status['sell_setup_ready'] else '⏳ Chờ...',
+    )
+    for side in ('buy', 'sell'):
+        for step in range(1, 5):
+            name = f'{side}_step{step}'
+            status[name] = _mark(status[name])
+    return status
+
+
+def alert_message(symbol: str, timeframe: str, signal_type: str, price: float, indicators: str) -> str:
+    """Signal alert around a pre-rendered indicator block"""
+    return render_alert(
+        emoji='🟢' if 'BUY' in signal_type else '🔴',
+        signal_type=signal_type,
+        symbol=symbol,
+        timeframe=timeframe,
+        price=price,
+        strength='💪 MẠNH' if '#2' in signal_type else '⚠️ THẬN TRỌNG',
+        indicators=indicators,
+        time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    )
+
+
+def status_message(symbol: str, timeframe: str, price: float, setup: str) -> str:
+    """/status reply around a pre-rendered setup block"""
+    return render_status(symbol=symbol, timeframe=timeframe, price=price, setup=setup,
+                         time=datetime.now().strftime('%H:%M:%S'))
+
+
+class RenderCache:
+    """
+    Rendered message parts keyed on (pair, candle timestamp, template)
+    
+    invalidate() is called whenever a pair's indicator updates; it drops
+    the pair's entries and records the candle the new values belong to.
+    Until the next update every request for the same part reuses one
+    rendered string.
+    """
+    
+    def __init__(self):
+        self._entries: Dict[Tuple[Hashable, Optional[int], Callable], str] = {}
+        self._timestamps: Dict[Hashable, Optional[int]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def invalidate(self, pair: Hashable, timestamp: Optional[int] = None):
+        """Forget the pair's rendered parts (its indicator just updated)"""
+        self._timestamps[pair] = timestamp
+        for key in [key for key in self._entries if key[0] == pair]:
+            del self._entries[key]
+    
+    def invalidate_symbol(self, symbol: Hashable):
+        """Forget every timeframe of a (symbol, timeframe)-keyed symbol"""
+        for key in [key for key in self._entries if key[0][0] == symbol]:
+            del self._entries[key]
+        for pair in [pair for pair in self._timestamps if pair[0] == symbol]:
+            del self._timestamps[pair]
+    
+    def clear(self):
+        self._entries.clear()
+        self._timestamps.clear()
+    
+    def render(self, pair: Hashable, template: Callable[..., str], fields: Callable[[], Dict]) -> str:
+        """
+        Cached template(**fields())
+        
+        Args:
+            template: One of the render_* format methods
+            fields: Builds the template fields; only called on a miss
+        """
+        key = (pair, self._timestamps.get(pair), template)
+        text = self._entries.get(key)
+        if text is None:
+            self.misses += 1
+            text = self._entries[key] = template(**fields())
+        else:
+            self.hits += 1
+        return text
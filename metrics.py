@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Runtime metrics
+Counters, gauges and histograms for the hot paths, rendered in the
+Prometheus text format and served with a health check over aiohttp
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base class: one metric family with optional labels"""
+    
+    TYPE = ''
+    
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple, object] = {}
+        if not self.label_names:
+            # Unlabelled metrics are exported from the start
+            self._values[()] = self._initial()
+    
+    def _initial(self):
+        return 0.0
+    
+    def _key(self, labels: Dict) -> Tuple:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.label_names)
+    
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+    
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.TYPE}"]
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+    
+    TYPE = 'counter'
+    
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+    
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """Value that goes up and down"""
+    
+    TYPE = 'gauge'
+    
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+    
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+    
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+
+class Histogram(Metric):
+    """Distribution of observations (e.g. latencies) in cumulative buckets"""
+    
+    TYPE = 'histogram'
+    
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels)
+    
+    def _initial(self):
+        # Per-bucket counts (last one is +Inf), sum, count
+        return [[0] * (len(self.buckets) + 1), 0.0, 0]
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = self._initial()
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+    
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+    
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+    
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """All metric families exposed on /metrics"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+    
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+    
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+    
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+    
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# Exchange HTTP
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'rsi_bot_http_request_seconds', 'Exchange REST request latency', ('provider', 'endpoint'))
+HTTP_REQUESTS = REGISTRY.counter(
+    'rsi_bot_http_requests_total', 'Exchange REST requests by HTTP status', ('provider', 'status'))
+API_COST = REGISTRY.counter(
+    'rsi_bot_api_cost_total', 'Request weight (Binance) or API credits (Twelve Data) spent', ('provider',))
+RATE_LIMIT_TOKENS = REGISTRY.gauge(
+    'rsi_bot_rate_limit_tokens', 'Request budget left in the rate limiter', ('provider',))
+RATE_LIMIT_WAITING = REGISTRY.gauge(
+    'rsi_bot_rate_limit_waiting', 'Requests queued for rate limiter budget', ('provider',))
+
+# Indicators and scans
+INDICATOR_SECONDS = REGISTRY.histogram(
+    'rsi_bot_indicator_seconds', 'Indicator update / signal evaluation time', ('operation',),
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5))
+SCAN_SECONDS = REGISTRY.histogram('rsi_bot_scan_seconds', 'Duration of a signal scan cycle')
+SCAN_OVERRUNS = REGISTRY.counter('rsi_bot_scan_overruns_total', 'Scans skipped or running past the next cycle or candle close')
+WATCHED_PAIRS = REGISTRY.gauge('rsi_bot_watched_pairs', 'Watched (symbol, timeframe) pairs')
+SIGNALS = REGISTRY.counter('rsi_bot_signals_total', 'Signal alerts raised', ('signal',))
+
+# Telegram broadcast
+BROADCAST_QUEUE_DEPTH = REGISTRY.gauge('rsi_bot_broadcast_queue_depth', 'Messages waiting to be sent')
+BROADCAST_SEND_SECONDS = REGISTRY.histogram('rsi_bot_broadcast_send_seconds', 'Telegram send_message latency')
+BROADCAST_MESSAGES = REGISTRY.counter(
+    'rsi_bot_broadcast_messages_total', 'Broadcast deliveries by result', ('result',))
+SUBSCRIBERS = REGISTRY.gauge('rsi_bot_subscribers', 'Subscribed chats')
+
+# Process
+EVENT_LOOP_LAG = REGISTRY.gauge('rsi_bot_event_loop_lag_seconds', 'Extra delay of a scheduled event loop wake-up')
+
+
+async def monitor_event_loop(interval: float = 1.0):
+    """Measure how late the event loop wakes up from a sleep (runs until cancelled)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(loop.time() - started - interval, 0.0))
+
+
+class MetricsServer:
+    """
+    /metrics and /healthz on one port
+    
+    Args:
+        collect: Called before each /metrics render to refresh gauges
+        health: Returns (healthy, details); /healthz answers 503 when unhealthy
+    """
+    
+    def __init__(self, port: int, collect: Optional[Callable[[], None]] = None,
+                 health: Optional[Callable[[], Tuple[bool, Dict]]] = None,
+                 registry: MetricsRegistry = REGISTRY):
+        self.port = port
+        self.collect = collect
+        self.health = health
+        self.registry = registry
+        self.runner = None
+        self.lag_task = None
+    
+    async def _metrics(self, request: web.Request) -> web.Response:
+        if self.collect is not None:
+            try:
+                self.collect()
+            except Exception as e:
+                logger.error(f"Error collecting metrics: {e}")
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+    
+    async def _healthz(self, request: web.Request) -> web.Response:
+        healthy, details = self.health() if self.health is not None else (True, {})
+        details = {'status': 'ok' if healthy else 'unhealthy', **details}
+        return web.json_response(details, status=200 if healthy else 503)
+    
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self._metrics)
+        app.router.add_get('/healthz', self._healthz)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '0.0.0.0', self.port).start()
+        self.lag_task = asyncio.create_task(monitor_event_loop())
+        logger.info(f"Metrics on :{self.port}/metrics, health check on :{self.port}/healthz")
+    
+    async def stop(self):
+        if self.lag_task is not None:
+            self.lag_task.cancel()
+            try:
+                await self.lag_task
+            except asyncio.CancelledError:
+                pass
+            self.lag_task = None
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scan cycle profiler
+Opt-in cProfile sessions over a number of check_signals cycles, with a
+record of event loop callbacks that blocked for too long
+"""
+
+import asyncio
+import cProfile
+import logging
+import os
+import pstats
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from config import PROFILE_DIR, PROFILE_SLOW_CALLBACK, PROFILE_TOP
+
+logger = logging.getLogger(__name__)
+
+# on_done(report, dump_path) once a session's last cycle has finished
+DoneCallback = Callable[[str, Optional[str]], Awaitable[None]]
+
+
+class SlowCallbackRecorder(logging.Handler):
+    """Keeps asyncio's debug-mode 'Executing <handle> took N seconds' warnings"""
+    
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages: List[str] = []
+    
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+        if message.startswith('Executing ') and ' took ' in message:
+            self.messages.append(message)
+
+
+class RecordedStats:
+    """pstats.Stats source for stats recorded by a profiler in another thread or process"""
+    
+    def __init__(self, stats: Dict):
+        self.stats = stats
+    
+    def create_stats(self):
+        pass
+
+
+class ScanProfiler:
+    """
+    Profiles the next N scan cycles
+    
+    begin()/end() wrap each cycle; the profiler only runs between them, so
+    idle time and skipped cycles cost nothing. cProfile follows the thread,
+    not the coroutine: other tasks that run while a scan awaits (streams,
+    /status handlers) are included, but the compute stage's pool threads
+    and processes are not. The compute stage profiles its tasks in the
+    worker while a cycle is recording and hands the stats to add_stats(),
+    which merges them into the session. While a session is armed the loop runs
+    in debug mode, which logs callbacks slower than `slow_callback`; debug
+    mode records a traceback per scheduled callback, so traceback/linecache
+    show up in the profile (slow_callback=0 leaves the loop alone).
+    
+    The dump is a standard pstats file (snakeviz, flameprof, gprof2dot).
+    """
+    
+    def __init__(self, output_dir: str = PROFILE_DIR, slow_callback: float = PROFILE_SLOW_CALLBACK,
+                 top: int = PROFILE_TOP):
+        self.output_dir = output_dir
+        self.slow_callback = slow_callback
+        self.top = top
+        self.profile: Optional[cProfile.Profile] = None
+        self.remaining = 0
+        self.cycles = 0
+        self.elapsed = 0.0
+        self.on_done: Optional[DoneCallback] = None
+        self.slow_callbacks = SlowCallbackRecorder()
+        # Stats of compute tasks profiled in pool workers
+        self.task_stats: List[Dict] = []
+        self.recording = False
+        self._started = 0.0
+        self._loop = None
+        self._loop_debug = (False, 0.1)
+    
+    @property
+    def active(self) -> bool:
+        return self.profile is not None
+    
+    def arm(self, cycles: int, on_done: Optional[DoneCallback] = None) -> bool:
+        """Profile the next `cycles` scans; False if a session is already running"""
+        if self.active or cycles <= 0:
+            return False
+        self.profile = cProfile.Profile()
+        self.remaining = self.cycles = cycles
+        self.elapsed = 0.0
+        self.on_done = on_done
+        self.slow_callbacks.messages.clear()
+        self.task_stats = []
+        
+        self._loop = None
+        if self.slow_callback > 0:
+            try:
+                self._loop = asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+        if self._loop is not None:
+            self._loop_debug = (self._loop.get_debug(), self._loop.slow_callback_duration)
+            self._loop.set_debug(True)
+            self._loop.slow_callback_duration = self.slow_callback
+        logging.getLogger('asyncio').addHandler(self.slow_callbacks)
+        logger.info(f"Profiling the next {cycles} scan cycles")
+        return True
+    
+    def begin(self):
+        """A scan cycle starts"""
+        if self.profile is None:
+            return
+        self._started = time.perf_counter()
+        try:
+            self.profile.enable()
+            self.recording = True
+        except ValueError as e:
+            # Another profiler (or debugger) holds the hook
+            logger.error(f"Error starting profiler: {e}")
+            self.finish()
+    
+    async def end(self):
+        """A scan cycle finished; reports once the last one is done"""
+        if self.profile is None:
+            return
+        self.profile.disable()
+        self.recording = False
+        self.elapsed += time.perf_counter() - self._started
+        self.remaining -= 1
+        if self.remaining > 0:
+            return
+        
+        on_done = self.on_done
+        report, path = self.finish()
+        if on_done is not None:
+            try:
+                await on_done(report, path)
+            except Exception as e:
+                logger.error(f"Error delivering profile report: {e}")
+    
+    def add_stats(self, stats: Dict):
+        """Merge the stats of a compute task profiled in a pool worker"""
+        if self.profile is not None and stats:
+            self.task_stats.append(stats)
+    
+    def finish(self) -> Tuple[str, Optional[str]]:
+        """End the session early or on schedule: dump, summarise and restore the loop"""
+        if self.profile is None:
+            return "", None
+        profile, self.profile = self.profile, None
+        # Stopped in the middle of a cycle
+        profile.disable()
+        self.recording = False
+        cycles = self.cycles - self.remaining
+        self.remaining = 0
+        self.on_done = None
+        
+        logging.getLogger('asyncio').removeHandler(self.slow_callbacks)
+        if self._loop is not None:
+            debug, slow_callback = self._loop_debug
+            self._loop.set_debug(debug)
+            self._loop.slow_callback_duration = slow_callback
+            self._loop = None
+        
+        stats = self.merge(profile)
+        path = self.dump(stats)
+        report = self.summary(stats, cycles)
+        self.task_stats = []
+        logger.info(f"Profile of {cycles} scan cycles written to {path}")
+        return report, path
+    
+    def merge(self, profile: cProfile.Profile) -> Optional[pstats.Stats]:
+        """The loop thread's profile plus the compute tasks'; None if nothing was recorded"""
+        merged = None
+        for source in [profile] + [RecordedStats(stats) for stats in self.task_stats]:
+            try:
+                stats = pstats.Stats(source)
+            except TypeError:
+                # Nothing was recorded
+                continue
+            if merged is None:
+                merged = stats
+            else:
+                merged.add(stats)
+        return merged
+    
+    def dump(self, stats: Optional[pstats.Stats]) -> Optional[str]:
+        """Write the pstats file; None if it can't be written"""
+        if stats is None:
+            return None
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"scan-{datetime.now().strftime('%Y%m%d-%H%M%S')}.pstats")
+            stats.dump_stats(path)
+            return path
+        except Exception as e:
+            logger.error(f"Error writing profile: {e}")
+            return None
+    
+    def summary(self, stats: Optional[pstats.Stats], cycles: int) -> str:
+        """Top functions by own time, then the slowest event loop callbacks"""
+        lines = [f"{cycles} scans, {self.elapsed:.2f}s profiled"]
+        if self.task_stats:
+            lines[0] += f" (+{len(self.task_stats)} compute tasks)"
+        stats = stats.stats if stats is not None else {}
+        
+        hottest = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        if hottest:
+            lines.append(f"{'own ms':>9} {'cum ms':>9} {'calls':>7}  function")
+        for (filename, line, function), (_, calls, own, cumulative, _) in hottest:
+            # Built-ins have no source location
+            location = f" ({os.path.basename(filename)}:{line})" if line else ""
+            lines.append(f"{own * 1000:9.1f} {cumulative * 1000:9.1f} {calls:7d}  {function}{location}")
+        
+        slow = self.slow_callbacks.messages
+        if slow:
+            lines.append("")
+            lines.append(f"{len(slow)} callbacks blocked the loop > {self.slow_callback * 1000:.0f}ms:")
+            lines.extend(message[:200] for message in slow[:5])
+        return '\n'.join(lines)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rate-limit-aware request scheduling
+Token buckets with request priority, header-driven backoff and a daily quota planner
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Request priorities (lower runs first)
+PRIORITY_SCAN = 0    # Signal scans
+PRIORITY_STATUS = 1  # /status price lookups
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity`"""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def delay(self, cost: float, now: float) -> float:
+        """Seconds until `cost` tokens are available"""
+        self._refill(now)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+    
+    def consume(self, cost: float, now: float):
+        self._refill(now)
+        self.tokens -= cost
+    
+    def drain(self, remaining: float, now: float):
+        """Align with the server's view when it reports fewer tokens left"""
+        self._refill(now)
+        self.tokens = min(self.tokens, remaining)
+
+
+class RequestScheduler:
+    """
+    Gate in front of one provider's API
+    
+    Requests acquire tokens from a per-minute bucket before they are sent;
+    the highest-priority waiter is always served first. Responses feed back
+    into the scheduler (observe) to back off on 429/418 or when the provider
+    reports the budget is nearly used. With a daily limit, credits are spread
+    evenly across the UTC day, allowing bursts of up to one minute's budget.
+    
+    Processes sharing one API key or IP each get a `share` of the limits;
+    the provider's headers report the shared total and are scaled to it.
+    A share never drops below `min_per_minute` (the largest single request):
+    a process that can't afford its requests would stall, so small limits
+    split between many processes are overcommitted instead and the provider's
+    429s and remaining-budget headers keep the total in check.
+    """
+    
+    def __init__(self, name: str, per_minute: float, daily_limit: Optional[int] = None,
+                 weight_header: Optional[str] = None, remaining_header: Optional[str] = None,
+                 share: float = 1.0, min_per_minute: float = 1.0):
+        self.name = name
+        self.total_per_minute = per_minute
+        self.per_minute = min(max(per_minute * share, min_per_minute), per_minute)
+        if self.per_minute > per_minute * share:
+            logger.warning(f"{self.name}: a {share:.0%} share is below {min_per_minute:g} per minute; "
+                           f"using {self.per_minute:g} (processes may exceed the shared limit)")
+        self.share = self.per_minute / per_minute if per_minute else share
+        self.bucket = TokenBucket(self.per_minute / 60.0, self.per_minute)
+        self.daily_limit = daily_limit * self.share if daily_limit else daily_limit
+        self.weight_header = weight_header        # e.g. X-MBX-USED-WEIGHT-1M
+        self.remaining_header = remaining_header  # e.g. api-credits-left
+        
+        self.blocked_until = 0.0
+        self.backoff = 0.0
+        self.day = None
+        self.daily_used = 0
+        
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._changed = asyncio.Event()
+    
+    def _notify(self):
+        """Wake every waiter so the queue head re-checks"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+    
+    def _roll_day(self):
+        today = datetime.now(timezone.utc).date()
+        if today != self.day:
+            self.day = today
+            self.daily_used = 0
+    
+    def _daily_delay(self, cost: float) -> float:
+        """Seconds until the daily planner allows `cost` more credits"""
+        if not self.daily_limit:
+            return 0.0
+        
+        self._roll_day()
+        now = datetime.now(timezone.utc)
+        elapsed = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+        
+        if self.daily_used + cost > self.daily_limit:
+            # Quota spent: wait for the next UTC day
+            return SECONDS_PER_DAY - elapsed
+        
+        # Even spread over the day plus one minute's worth of burst
+        needed = self.daily_used + cost - self.per_minute
+        allowed_at = needed / self.daily_limit * SECONDS_PER_DAY
+        return max(allowed_at - elapsed, 0.0)
+    
+    def delay(self, cost: float = 1) -> float:
+        """Seconds until a request of `cost` may be sent"""
+        now = time.monotonic()
+        return max(
+            self.blocked_until - now,
+            self.bucket.delay(cost, now),
+            self._daily_delay(cost),
+        )
+    
+    @property
+    def max_cost(self) -> float:
+        """Largest request the budget can ever cover"""
+        if self.daily_limit:
+            return min(self.per_minute, self.daily_limit)
+        return self.per_minute
+    
+    async def acquire(self, cost: float = 1, priority: int = PRIORITY_SCAN):
+        """
+        Wait until the request may be sent, then spend its budget
+        
+        Raises:
+            ValueError: cost is more than the bucket ever holds; such a request
+                would wait forever and block every request queued behind it
+        """
+        if cost > self.max_cost:
+            raise ValueError(f"{self.name} request of cost {cost:g} exceeds the budget of {self.max_cost:g}")
+        entry = (priority, next(self._sequence))
+        heapq.heappush(self._waiting, entry)
+        self._notify()
+        
+        try:
+            while True:
+                changed = self._changed
+                if self._waiting[0] == entry:
+                    wait = self.delay(cost)
+                    if wait <= 0:
+                        self.bucket.consume(cost, time.monotonic())
+                        self._roll_day()
+                        self.daily_used += cost
+                        return
+                    try:
+                        # Re-check early if a higher-priority request arrives
+                        await asyncio.wait_for(changed.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await changed.wait()
+        finally:
+            self._waiting.remove(entry)
+            heapq.heapify(self._waiting)
+            self._notify()
+    
+    def observe(self, status: int, headers: Mapping[str, str]):
+        """Adapt to a response: honour Retry-After, back off on 429/418, track used budget"""
+        now = time.monotonic()
+        
+        if status in (418, 429):
+            retry_after = headers.get('Retry-After')
+            if retry_after is not None:
+                wait = float(retry_after)
+            else:
+                self.backoff = min(max(self.backoff * 2, 1.0), 300.0)
+                wait = self.backoff
+            self.blocked_until = max(self.blocked_until, now + wait)
+            logger.warning(f"{self.name} rate limited ({status}), backing off {wait:.0f}s")
+            return
+        
+        self.backoff = 0.0
+        
+        remaining = None
+        if self.weight_header and headers.get(self.weight_header) is not None:
+            remaining = (self.total_per_minute - float(headers[self.weight_header])) * self.share
+        elif self.remaining_header and headers.get(self.remaining_header) is not None:
+            remaining = float(headers[self.remaining_header]) * self.share
+        
+        if remaining is not None:
+            self.bucket.drain(remaining, now)
+            if remaining <= 0:
+                # Budget for this minute is gone; wait for the next window
+                self.blocked_until = max(self.blocked_until, now + 60 - time.time() % 60)
+    
+    def get_usage(self) -> dict:
+        """Daily quota use, for the state snapshot"""
+        self._roll_day()
+        return {'day': self.day.isoformat(), 'used': self.daily_used}
+    
+    def restore_usage(self, usage: Mapping):
+        """
+        Continue counting today's credits after a restart
+        
+        The provider bills the whole UTC day, so without this a restarted
+        process would plan against a fresh daily limit. Usage saved on an
+        earlier day is ignored.
+        """
+        self._roll_day()
+        if usage.get('day') == self.day.isoformat():
+            self.daily_used = max(self.daily_used, usage.get('used', 0))
+    
+    def get_stats(self) -> dict:
+        """Current budget state"""
+        return {
+            'tokens': self.bucket.tokens,
+            'waiting': len(self._waiting),
+            'blocked_for': max(self.blocked_until - time.monotonic(), 0.0),
+            'daily_used': self.daily_used,
+            'daily_limit': self.daily_limit,
+        }
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Watched symbol registry
+Maps each symbol to its data provider client and native ticker, and owns
+the per-(symbol, timeframe) indicators, created on first use
+"""
+
+import logging
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from config import SYMBOL_PROVIDERS, DEFAULT_PROVIDER
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_BINANCE = 'binance'
+PROVIDER_TWELVE_DATA = 'twelvedata'
+
+
+def native_ticker(symbol: str, provider: str) -> str:
+    """
+    Default provider ticker for a symbol
+    
+    Binance quotes USD pairs in USDT ('BTCUSD' -> 'BTCUSDT'); Twelve Data
+    uses 'BASE/QUOTE' ('XAUUSD' -> 'XAU/USD').
+    """
+    if provider == PROVIDER_BINANCE:
+        return symbol + 'T' if symbol.endswith('USD') else symbol
+    return f"{symbol[:3]}/{symbol[3:]}"
+
+
+def display_name(symbol: str) -> str:
+    """Human-readable pair name ('BTCUSD' -> 'BTC/USD')"""
+    return f"{symbol[:3]}/{symbol[3:]}" if len(symbol) == 6 else symbol
+
+
+class Instrument:
+    """A watched symbol and where its data comes from"""
+    
+    __slots__ = ('symbol', 'provider', 'ticker', 'client')
+    
+    def __init__(self, symbol: str, provider: str, ticker: str, client):
+        self.symbol = symbol
+        self.provider = provider
+        self.ticker = ticker
+        self.client = client
+    
+    def __repr__(self) -> str:
+        return f"Instrument({self.symbol!r}, {self.provider!r}, {self.ticker!r})"
+
+
+class SymbolRegistry:
+    """
+    Symbols watched by the bot
+    
+    Lookups by symbol or by (provider, ticker) are dictionary hits, so the
+    scan, stream and /status paths never branch on symbol names. Symbols
+    can be added and removed while the bot runs; an indicator is only
+    allocated the first time its (symbol, timeframe) is used.
+    """
+    
+    def __init__(self, clients: Dict[str, object], timeframes: List[str],
+                 indicator_factory: Callable[[Instrument], object]):
+        """
+        Args:
+            clients: Provider name -> exchange client
+            indicator_factory: Builds a new indicator for an instrument
+        """
+        self.clients = clients
+        self.timeframes = list(timeframes)
+        self.indicator_factory = indicator_factory
+        self._instruments: Dict[str, Instrument] = {}
+        self._by_ticker: Dict[Tuple[str, str], str] = {}
+        self._indicators: Dict[Tuple[str, str], object] = {}
+    
+    def resolve(self, symbol: str, provider: Optional[str] = None,
+                ticker: Optional[str] = None) -> Tuple[str, str, str]:
+        """
+        (symbol, provider, ticker) add() would watch
+        
+        Provider and ticker default to SYMBOL_PROVIDERS, then to
+        DEFAULT_PROVIDER and native_ticker().
+        
+        Raises:
+            ValueError: Unknown provider
+        """
+        symbol = symbol.upper()
+        configured_provider, configured_ticker = SYMBOL_PROVIDERS.get(symbol, (DEFAULT_PROVIDER, None))
+        provider = (provider or configured_provider).lower()
+        if provider not in self.clients:
+            raise ValueError(f"Unknown provider '{provider}' (expected one of {', '.join(self.clients)})")
+        if ticker is None:
+            ticker = configured_ticker if provider == configured_provider and configured_ticker else None
+        return symbol, provider, ticker or native_ticker(symbol, provider)
+    
+    def add(self, symbol: str, provider: Optional[str] = None, ticker: Optional[str] = None) -> Instrument:
+        """
+        Watch a symbol (replaces an existing entry)
+        
+        Raises:
+            ValueError: Unknown provider
+        """
+        symbol, provider, ticker = self.resolve(symbol, provider, ticker)
+        
+        if symbol in self._instruments:
+            self.remove(symbol)
+        instrument = Instrument(symbol, provider, ticker, self.clients[provider])
+        self._instruments[symbol] = instrument
+        self._by_ticker[(provider, ticker)] = symbol
+        return instrument
+    
+    def remove(self, symbol: str) -> bool:
+        """Stop watching a symbol and drop its indicators"""
+        instrument = self._instruments.pop(symbol.upper(), None)
+        if instrument is None:
+            return False
+        self._by_ticker.pop((instrument.provider, instrument.ticker), None)
+        for timeframe in self.timeframes:
+            self._indicators.pop((instrument.symbol, timeframe), None)
+        return True
+    
+    def get(self, symbol: str) -> Optional[Instrument]:
+        return self._instruments.get(symbol)
+    
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._instruments
+    
+    def __len__(self) -> int:
+        return len(self._instruments)
+    
+    def symbols(self) -> List[str]:
+        """Watched symbols in the order they were added"""
+        return list(self._instruments)
+    
+    def instruments(self) -> List[Instrument]:
+        return list(self._instruments.values())
+    
+    def by_provider(self) -> Dict[str, List[Instrument]]:
+        """Watched instruments grouped by provider"""
+        groups: Dict[str, List[Instrument]] = {}
+        for instrument in self._instruments.values():
+            groups.setdefault(instrument.provider, []).append(instrument)
+        return groups
+    
+    def symbol_for(self, provider: str, ticker: str) -> Optional[str]:
+        """Our symbol for a provider's native ticker"""
+        return self._by_ticker.get((provider, ticker))
+    
+    def pairs(self) -> List[Tuple[str, str]]:
+        """Every watched (symbol, timeframe)"""
+        return [(symbol, timeframe) for symbol in self._instruments for timeframe in self.timeframes]
+    
+    def indicator(self, symbol: str, timeframe: str):
+        """
+        Indicator for a watched pair, created on first use
+        
+        Raises:
+            KeyError: Symbol not watched or timeframe not configured
+        """
+        key = (symbol, timeframe)
+        indicator = self._indicators.get(key)
+        if indicator is None:
+            if symbol not in self._instruments or timeframe not in self.timeframes:
+                raise KeyError(f"{symbol} {timeframe} is not watched")
+            indicator = self._indicators[key] = self.indicator_factory(self._instruments[symbol])
+        return indicator
+    
+    def indicators(self) -> Iterator[Tuple[str, str, object]]:
+        """(symbol, timeframe, indicator) for every indicator created so far"""
+        for (symbol, timeframe), indicator in list(self._indicators.items()):
+            yield symbol, timeframe, indicator
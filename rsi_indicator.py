@@ -6,16 +6,413 @@ Based on Pine Script logic with 4-step setup
 """
 
 import numpy as np
-from typing import List, Dict
+from collections import deque
+from typing import List, Dict, Optional, Tuple, Union
 import logging
+from candles import CandleSeries
+
+try:
+    # Optional JIT for the smoothing recursions
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 logger = logging.getLogger(__name__)
 
+# Anything update() accepts: kline dictionaries, a structured kline array or a CandleSeries
+Klines = Union[List[Dict], np.ndarray, CandleSeries]
+
+# RSI smoothing modes
+RSI_MODE_WILDER = 'wilder'  # Wilder's RMA, same as Pine ta.rsi
+RSI_MODE_SMA = 'sma'        # Simple mean of the last `period` gains/losses
+
+# Attributes captured by get_state/set_state
+STREAM_STATE_FIELDS = (
+    'last_close', 'delta_count', 'gain_sum', 'loss_sum', 'avg_gain', 'avg_loss',
+    'ema_count', 'ema_sum', 'ema_acc', 'wma_sum', 'wma_weighted_sum', 'wma_pushes',
+)
+INDICATOR_STATE_FIELDS = (
+    'buy_step1_touched_overbought', 'buy_step2_crossed_ema9_down',
+    'buy_step3_crossed_wma45_down', 'buy_step4_ema9_crossed_wma45_down',
+    'buy_rsi_ema9_cross_count', 'buy_entry1_count',
+    'sell_step1_touched_oversold', 'sell_step2_crossed_ema9_up',
+    'sell_step3_crossed_wma45_up', 'sell_step4_ema9_crossed_wma45_up',
+    'sell_rsi_ema9_cross_count', 'sell_entry1_count',
+    'total_buy_1', 'total_buy_2', 'total_sell_1', 'total_sell_2',
+    'prev_rsi', 'prev_ema9', 'prev_wma45',
+    'current_rsi', 'current_ema9', 'current_wma45',
+    'last_closed_timestamp',
+)
+
+
+def _plain(value):
+    """NumPy scalars -> Python scalars, for serializable state"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def kline_columns(klines: Klines) -> Tuple[np.ndarray, np.ndarray]:
+    """(timestamps, closes) arrays for any supported kline container"""
+    if isinstance(klines, CandleSeries):
+        return klines.timestamp, klines.close
+    if isinstance(klines, np.ndarray):
+        return klines['timestamp'], klines['close'].astype(np.float64)
+    timestamps = np.array([k['timestamp'] for k in klines], dtype=np.int64)
+    closes = np.array([float(k['close']) for k in klines])
+    return timestamps, closes
+
+
+def _expanding_mean(values: np.ndarray) -> np.ndarray:
+    """Mean of values[:i+1] for every i"""
+    return np.cumsum(values) / np.arange(1, len(values) + 1)
+
+
+@njit(cache=True)
+def _wilder_smooth(values, seed, alpha, out):
+    """out[0] = seed, then out[i] = out[i-1] + alpha * (values[i-1] - out[i-1])"""
+    acc = seed
+    out[0] = acc
+    for i in range(len(values)):
+        acc += alpha * (values[i] - acc)
+        out[i + 1] = acc
+
+
+@njit(cache=True)
+def _ema_smooth(values, multiplier, out):
+    """EMA seeded with values[0], written to out"""
+    acc = values[0]
+    out[0] = acc
+    for i in range(1, len(values)):
+        acc = (values[i] * multiplier) + (acc * (1 - multiplier))
+        out[i] = acc
+
+
+def _recurrence(smooth, values: np.ndarray, n: int, *args) -> np.ndarray:
+    """
+    Run a smoothing recursion into a new array of length n
+    
+    Each step depends on the previous one, so NumPy can't vectorize it:
+    with Numba the loop is compiled, otherwise it runs over plain Python
+    floats (much faster than indexing NumPy scalars).
+    """
+    if NUMBA_AVAILABLE:
+        out = np.empty(n)
+        smooth(values, *args, out)
+        return out
+    out = [0.0] * n
+    smooth(values.tolist(), *args, out)
+    return np.array(out)
+
+
+def rsi_series(prices: np.ndarray, period: int, mode: str = RSI_MODE_WILDER) -> np.ndarray:
+    """
+    Calculate the full RSI series in a single O(n) pass
+    
+    Gains and losses are array operations; the Wilder smoothing recursion
+    runs as a compiled loop when Numba is installed.
+    
+    Args:
+        prices: Closing prices
+        period: RSI length
+        mode: 'wilder' (RMA smoothing, matches Pine) or 'sma' (simple mean)
+    
+    Returns:
+        Array with the same length as prices. The first `period` values
+        (not enough data yet) are 50.0, like calculate_rsi.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n = len(prices)
+    rsi = np.full(n, 50.0)
+    if n < period + 1:
+        return rsi
+    
+    deltas = np.diff(prices)
+    gains = np.maximum(deltas, 0.0)
+    losses = np.maximum(-deltas, 0.0)
+    
+    if mode == RSI_MODE_WILDER:
+        # Seeded with the simple mean of the first `period` deltas
+        alpha = 1.0 / period
+        avg_gain = _recurrence(_wilder_smooth, gains[period:], n - period, float(gains[:period].mean()), alpha)
+        avg_loss = _recurrence(_wilder_smooth, losses[period:], n - period, float(losses[:period].mean()), alpha)
+    elif mode == RSI_MODE_SMA:
+        # Rolling sums over the last `period` deltas
+        gain_sum = np.cumsum(np.concatenate(([0.0], gains)))
+        loss_sum = np.cumsum(np.concatenate(([0.0], losses)))
+        avg_gain = (gain_sum[period:] - gain_sum[:-period]) / period
+        avg_loss = (loss_sum[period:] - loss_sum[:-period]) / period
+    else:
+        raise ValueError(f"Unknown RSI mode: {mode}")
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi[period:] = np.where(avg_loss == 0, 100.0, values)
+    return rsi
+
+
+def ema_series(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Calculate the full EMA series in a single O(n) pass
+    
+    Element i equals calculate_ema(values[:i+1], period): the expanding
+    mean until `period` values are available, then the EMA seeded with
+    the first value. The recursion runs as a compiled loop when Numba is
+    installed.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return values.copy()
+    
+    result = _expanding_mean(values)
+    if n < period:
+        return result
+    
+    ema = _recurrence(_ema_smooth, values, n, 2 / (period + 1))
+    result[period - 1:] = ema[period - 1:]
+    return result
+
+
+def wma_series(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Calculate the full WMA series in a single O(n) pass
+    
+    Element i equals calculate_wma(values[:i+1], period): the expanding
+    mean until `period` values are available, then the linearly weighted
+    average of the last `period` values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return values.copy()
+    
+    result = _expanding_mean(values)
+    if n < period:
+        return result
+    
+    weights = np.arange(1, period + 1, dtype=np.float64)
+    # np.convolve flips the kernel, so pass the weights reversed
+    result[period - 1:] = np.convolve(values, weights[::-1], mode='valid') / weights.sum()
+    return result
+
+
+def window_values(closes: np.ndarray, rsi_length: int, ema_length: int, wma_length: int,
+                  rsi_mode: str = RSI_MODE_WILDER) -> Optional[Tuple[float, float, float]]:
+    """
+    Latest (RSI, EMA of RSI, WMA of RSI) of a window of closes
+    
+    Pure function of its arguments, so it can run in a compute worker.
+    
+    Returns:
+        None if the window is too short for the indicator settings
+    """
+    if len(closes) < max(rsi_length, ema_length, wma_length) + 10:
+        return None
+    
+    # Calculate RSI series (skip the warm-up bars)
+    rsi_array = rsi_series(closes, rsi_length, rsi_mode)[rsi_length:]
+    return (
+        float(rsi_array[-1]),
+        float(ema_series(rsi_array, ema_length)[-1]),
+        float(wma_series(rsi_array, wma_length)[-1]),
+    )
+
+
+class IndicatorStream:
+    """
+    Incremental RSI -> EMA/WMA state
+    
+    Keeps running Wilder averages (or rolling sums for 'sma' mode), the EMA
+    accumulator and a ring-buffer WMA with a rolling weighted sum, so each
+    closed candle is applied in O(1). Produces the same values as
+    rsi_series/ema_series/wma_series over the full history.
+    """
+    
+    def __init__(self, rsi_length: int = 14, ema_length: int = 9, wma_length: int = 45,
+                 rsi_mode: str = RSI_MODE_WILDER):
+        if rsi_mode not in (RSI_MODE_WILDER, RSI_MODE_SMA):
+            raise ValueError(f"Unknown RSI mode: {rsi_mode}")
+        
+        self.rsi_length = rsi_length
+        self.ema_length = ema_length
+        self.wma_length = wma_length
+        self.rsi_mode = rsi_mode
+        
+        # RSI state
+        self.last_close = None
+        self.delta_count = 0
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.gains = deque(maxlen=rsi_length)
+        self.losses = deque(maxlen=rsi_length)
+        
+        # EMA state (over RSI values)
+        self.ema_count = 0
+        self.ema_sum = 0.0
+        self.ema_acc = 0.0
+        
+        # WMA state: ring buffer, plain sum and weighted sum of the window
+        self.wma_window = deque(maxlen=wma_length)
+        self.wma_sum = 0.0
+        self.wma_weighted_sum = 0.0
+        self.wma_pushes = 0
+    
+    def _advance(self, close: float) -> Tuple[tuple, Optional[Tuple[float, float, float]]]:
+        """
+        Compute the state after `close` without mutating anything
+        
+        Returns:
+            (new scalar state, (rsi, ema, wma) or None while warming up)
+        """
+        if self.last_close is None:
+            state = (close, 0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0, 0.0, 0.0, 0.0, 0.0)
+            return state, None
+        
+        period = self.rsi_length
+        delta = close - self.last_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        delta_count = self.delta_count + 1
+        gain_sum = self.gain_sum
+        loss_sum = self.loss_sum
+        avg_gain = self.avg_gain
+        avg_loss = self.avg_loss
+        
+        if delta_count <= period:
+            gain_sum += gain
+            loss_sum += loss
+            if delta_count == period:
+                avg_gain = gain_sum / period
+                avg_loss = loss_sum / period
+        elif self.rsi_mode == RSI_MODE_WILDER:
+            alpha = 1.0 / period
+            avg_gain += alpha * (gain - avg_gain)
+            avg_loss += alpha * (loss - avg_loss)
+        else:
+            gain_sum += gain - self.gains[0]
+            loss_sum += loss - self.losses[0]
+            avg_gain = gain_sum / period
+            avg_loss = loss_sum / period
+        
+        ema_count = self.ema_count
+        ema_sum = self.ema_sum
+        ema_acc = self.ema_acc
+        wma_sum = self.wma_sum
+        wma_weighted_sum = self.wma_weighted_sum
+        
+        if delta_count < period:
+            state = (close, delta_count, gain_sum, loss_sum, avg_gain, avg_loss,
+                     ema_count, ema_sum, ema_acc, wma_sum, wma_weighted_sum, gain, loss)
+            return state, None
+        
+        rsi = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        
+        # EMA: expanding mean until `ema_length` values, seeded with the first RSI
+        multiplier = 2 / (self.ema_length + 1)
+        ema_acc = rsi if ema_count == 0 else (rsi * multiplier) + (ema_acc * (1 - multiplier))
+        ema_count += 1
+        ema_sum += rsi
+        ema = ema_sum / ema_count if ema_count < self.ema_length else ema_acc
+        
+        # WMA: every weight in the window drops by one when a new value enters
+        size = len(self.wma_window)
+        if size < self.wma_length:
+            wma_weighted_sum += (size + 1) * rsi
+            wma_sum += rsi
+            size += 1
+        else:
+            wma_weighted_sum += self.wma_length * rsi - wma_sum
+            wma_sum += rsi - self.wma_window[0]
+        if size < self.wma_length:
+            wma = wma_sum / size
+        else:
+            wma = wma_weighted_sum / (self.wma_length * (self.wma_length + 1) / 2)
+        
+        state = (close, delta_count, gain_sum, loss_sum, avg_gain, avg_loss,
+                 ema_count, ema_sum, ema_acc, wma_sum, wma_weighted_sum, gain, loss)
+        return state, (rsi, ema, wma)
+    
+    def push(self, close: float) -> Optional[Tuple[float, float, float]]:
+        """
+        Apply a closed candle
+        
+        Returns:
+            (rsi, ema, wma) after the candle, or None while warming up
+        """
+        state, values = self._advance(float(close))
+        (self.last_close, delta_count, self.gain_sum, self.loss_sum,
+         self.avg_gain, self.avg_loss, self.ema_count, self.ema_sum, self.ema_acc,
+         self.wma_sum, self.wma_weighted_sum, gain, loss) = state
+        
+        if delta_count > self.delta_count:
+            self.gains.append(gain)
+            self.losses.append(loss)
+        self.delta_count = delta_count
+        
+        if values is not None:
+            self.wma_window.append(values[0])
+            self.wma_pushes += 1
+            # Recompute the rolling sums once per full turn of the ring to
+            # keep floating point drift bounded (amortized O(1))
+            if self.wma_pushes % self.wma_length == 0:
+                window = np.fromiter(self.wma_window, dtype=np.float64, count=len(self.wma_window))
+                self.wma_sum = float(window.sum())
+                self.wma_weighted_sum = float(np.dot(window, np.arange(1, len(window) + 1)))
+        
+        return values
+    
+    def peek(self, close: float) -> Optional[Tuple[float, float, float]]:
+        """Values the still-forming candle would produce, without committing it"""
+        return self._advance(float(close))[1]
+    
+    def get_state(self) -> Dict:
+        """Running state as plain Python values"""
+        state = {name: _plain(getattr(self, name)) for name in STREAM_STATE_FIELDS}
+        state['gains'] = list(self.gains)
+        state['losses'] = list(self.losses)
+        state['wma_window'] = list(self.wma_window)
+        return state
+    
+    def set_state(self, state: Dict):
+        """Restore state produced by get_state"""
+        for name in STREAM_STATE_FIELDS:
+            setattr(self, name, state[name])
+        self.gains = deque(state['gains'], maxlen=self.rsi_length)
+        self.losses = deque(state['losses'], maxlen=self.rsi_length)
+        self.wma_window = deque(state['wma_window'], maxlen=self.wma_length)
+
+
 class RSIFollowTrend:
-    def __init__(self, rsi_length: int = 14, ema_length: int = 9, wma_length: int = 45):
+    def __init__(self, rsi_length: int = 14, ema_length: int = 9, wma_length: int = 45,
+                 rsi_mode: str = RSI_MODE_WILDER, streaming: bool = False,
+                 overbought: float = 80, oversold: float = 20):
+        if rsi_mode not in (RSI_MODE_WILDER, RSI_MODE_SMA):
+            raise ValueError(f"Unknown RSI mode: {rsi_mode}")
+        if not oversold < overbought:
+            raise ValueError("oversold level must be below overbought level")
+        
         self.rsi_length = rsi_length
         self.ema_length = ema_length
         self.wma_length = wma_length
+        self.rsi_mode = rsi_mode
+        
+        # RSI levels for step 1 and the setup resets
+        self.overbought = overbought
+        self.oversold = oversold
+        
+        # Streaming mode: state advances once per closed candle
+        self.streaming = streaming
+        self.stream = None
+        self.last_closed_timestamp = None
+        self.preview_values = None
         
         # State variables for BUY logic
         self.buy_step1_touched_overbought = False
@@ -90,51 +487,149 @@ class RSIFollowTrend:
         wma = np.sum(values[-period:] * weights) / np.sum(weights)
         return wma
     
-    def update(self, klines: List[Dict]):
-        """Update indicator with new kline data"""
+    def update(self, klines: Klines) -> bool:
+        """
+        Update indicator with new kline data
+        
+        Accepts a CandleSeries, a structured kline array (KLINE_DTYPE) or a
+        list of kline dictionaries.
+        
+        Returns:
+            True if the indicator values advanced and signals should be checked
+        """
         try:
             # Extract closing prices
-            closes = np.array([float(k['close']) for k in klines])
+            timestamps, closes = kline_columns(klines)
             
-            if len(closes) < max(self.rsi_length, self.ema_length, self.wma_length) + 10:
-                logger.warning("Not enough data to calculate indicators")
-                return
+            if self.streaming:
+                return self._update_streaming(timestamps, closes)
             
-            # Calculate RSI
-            rsi_values = []
-            for i in range(self.rsi_length, len(closes)):
-                rsi = self.calculate_rsi(closes[:i+1], self.rsi_length)
-                rsi_values.append(rsi)
-            
-            rsi_array = np.array(rsi_values)
-            
-            # Store previous values
-            self.prev_rsi = self.current_rsi
-            self.prev_ema9 = self.current_ema9
-            self.prev_wma45 = self.current_wma45
-            
-            # Calculate current values
-            self.current_rsi = rsi_array[-1]
-            self.current_ema9 = self.calculate_ema(rsi_array, self.ema_length)
-            self.current_wma45 = self.calculate_wma(rsi_array, self.wma_length)
-            
-            # Only process if we have previous values
-            if self.prev_rsi is None:
-                return
-            
-            # Process BUY logic
-            self._process_buy_logic()
-            
-            # Process SELL logic
-            self._process_sell_logic()
+            return self.apply_values(window_values(
+                closes, self.rsi_length, self.ema_length, self.wma_length, self.rsi_mode
+            ))
             
         except Exception as e:
             logger.error(f"Error updating indicator: {e}")
+            return False
+    
+    def apply_values(self, values: Optional[Tuple[float, float, float]]) -> bool:
+        """
+        Advance to values computed by window_values (windowed mode)
+        
+        Returns:
+            True if the indicator values advanced and signals should be checked
+        """
+        if values is None:
+            logger.warning("Not enough data to calculate indicators")
+            return False
+        
+        self._set_values(*values)
+        return True
+    
+    def _set_values(self, rsi: float, ema9: float, wma45: float):
+        """Shift current values to previous and run the step logic"""
+        # Store previous values
+        self.prev_rsi = self.current_rsi
+        self.prev_ema9 = self.current_ema9
+        self.prev_wma45 = self.current_wma45
+        
+        self.current_rsi = rsi
+        self.current_ema9 = ema9
+        self.current_wma45 = wma45
+        
+        # Only process if we have previous values
+        if self.prev_rsi is None:
+            return
+        
+        # Process BUY logic
+        self._process_buy_logic()
+        
+        # Process SELL logic
+        self._process_sell_logic()
+    
+    def _update_streaming(self, timestamps: np.ndarray, closes: np.ndarray) -> bool:
+        """
+        Apply klines in streaming mode
+        
+        The last kline is treated as the still-forming candle: it is only
+        previewed. Closed candles newer than the last applied one are pushed.
+        """
+        if len(closes) < 2:
+            return False
+        
+        advanced = False
+        if (self.stream is None or self.last_closed_timestamp is None
+                or timestamps[0] > self.last_closed_timestamp):
+            # First call, or the window no longer overlaps what we have seen
+            self._seed(timestamps[:-1], closes[:-1])
+        else:
+            new = timestamps[:-1] > self.last_closed_timestamp
+            for timestamp, close in zip(timestamps[:-1][new].tolist(), closes[:-1][new].tolist()):
+                advanced = self.push_candle(close, timestamp) or advanced
+        
+        self.preview_values = self.preview(closes[-1])
+        return advanced
+    
+    def seed(self, klines: Klines):
+        """
+        Rebuild the streaming state from closed klines
+        
+        Sets current and previous values from the last two candles without
+        running the step logic, so the next closed candle is evaluated at once.
+        """
+        self._seed(*kline_columns(klines))
+    
+    def _seed(self, timestamps: np.ndarray, closes: np.ndarray):
+        self.stream = IndicatorStream(self.rsi_length, self.ema_length,
+                                      self.wma_length, self.rsi_mode)
+        self.prev_rsi = self.prev_ema9 = self.prev_wma45 = None
+        self.current_rsi = self.current_ema9 = self.current_wma45 = None
+        self.last_closed_timestamp = None
+        
+        for timestamp, close in zip(timestamps.tolist(), closes.tolist()):
+            values = self.stream.push(close)
+            self.last_closed_timestamp = timestamp
+            if values is not None:
+                self.prev_rsi, self.prev_ema9, self.prev_wma45 = (
+                    self.current_rsi, self.current_ema9, self.current_wma45
+                )
+                self.current_rsi, self.current_ema9, self.current_wma45 = values
+    
+    def push_candle(self, close: float, timestamp: int) -> bool:
+        """
+        Apply one closed candle in O(1) (streaming mode)
+        
+        Returns:
+            True if the indicator values advanced
+        """
+        if self.stream is None:
+            self.stream = IndicatorStream(self.rsi_length, self.ema_length,
+                                          self.wma_length, self.rsi_mode)
+        
+        values = self.stream.push(close)
+        self.last_closed_timestamp = timestamp
+        if values is None:
+            return False
+        
+        self._set_values(*values)
+        return True
+    
+    def preview(self, close: float) -> Optional[Dict[str, float]]:
+        """Indicator values for a still-forming candle, without committing state"""
+        if self.stream is None:
+            return None
+        
+        values = self.stream.peek(close)
+        if values is None:
+            return None
+        
+        rsi, ema9, wma45 = values
+        return {'rsi': rsi, 'ema9': ema9, 'wma45': wma45}
     
     def _process_buy_logic(self):
         """Process BUY signal logic"""
         # Step 1: RSI touched overbought
-        if self.current_rsi >= 80:
+        if self.current_rsi >= self.overbought:
             self.buy_step1_touched_overbought = True
         
         # Step 2: RSI crossunder EMA9
@@ -174,13 +669,13 @@ class RSIFollowTrend:
             self._reset_buy_state()
         
         # Reset if RSI touches oversold
-        if self.current_rsi <= 20:
+        if self.current_rsi <= self.oversold:
             self._reset_buy_state()
     
     def _process_sell_logic(self):
         """Process SELL signal logic"""
         # Step 1: RSI touched oversold
-        if self.current_rsi <= 20:
+        if self.current_rsi <= self.oversold:
             self.sell_step1_touched_oversold = True
         
         # Step 2: RSI crossover EMA9
@@ -220,7 +715,7 @@ class RSIFollowTrend:
             self._reset_sell_state()
         
         # Reset if RSI touches overbought
-        if self.current_rsi >= 80:
+        if self.current_rsi >= self.overbought:
             self._reset_sell_state()
     
     def _reset_buy_state(self):
@@ -315,6 +810,45 @@ class RSIFollowTrend:
             'sell_entry1_count': self.sell_entry1_count,
         }
     
+    def settings(self) -> Dict:
+        """Parameters the state depends on"""
+        return {
+            'rsi_length': self.rsi_length,
+            'ema_length': self.ema_length,
+            'wma_length': self.wma_length,
+            'rsi_mode': self.rsi_mode,
+            'overbought': self.overbought,
+            'oversold': self.oversold,
+            'streaming': self.streaming,
+        }
+    
+    def get_state(self) -> Dict:
+        """Full indicator state (setup steps, counts, statistics, last values) as plain Python values"""
+        state = {name: _plain(getattr(self, name)) for name in INDICATOR_STATE_FIELDS}
+        state['settings'] = self.settings()
+        state['stream'] = self.stream.get_state() if self.stream is not None else None
+        return state
+    
+    def set_state(self, state: Dict) -> bool:
+        """
+        Restore state produced by get_state
+        
+        Returns:
+            False (nothing restored) if the state was saved with different settings
+        """
+        if state.get('settings') != self.settings():
+            return False
+        
+        for name in INDICATOR_STATE_FIELDS:
+            setattr(self, name, state[name])
+        
+        self.stream = None
+        if state.get('stream') is not None:
+            self.stream = IndicatorStream(self.rsi_length, self.ema_length,
+                                          self.wma_length, self.rsi_mode)
+            self.stream.set_state(state['stream'])
+        return True
+    
     def get_statistics(self) -> Dict:
         """Get signal statistics"""
         return {
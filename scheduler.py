@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Candle-close-aligned scan scheduler
+Wakes up just after each candle boundary and scans only the timeframes
+whose candle closed, instead of polling every timeframe at a fixed interval
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+from exchange_client import INTERVAL_MS
+from config import CANDLE_CLOSE_DELAY, CANDLE_CLOSE_JITTER, CANDLE_CLOSE_RETRIES, CANDLE_CLOSE_RETRY_DELAY
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]
+
+# scan(timeframes, closed_at, pairs) -> pairs whose closed candle has not
+# been published yet (closed_at=None: process whatever is there)
+ScanCallback = Callable[[List[str], Optional[int], Optional[List[Pair]]], Awaitable[List[Pair]]]
+
+
+def next_boundary(now_ms: float, interval_ms: int) -> int:
+    """Open time of the next candle (candles are aligned to the Unix epoch)"""
+    return (int(now_ms) // interval_ms + 1) * interval_ms
+
+
+class CandleCloseScheduler:
+    """
+    Runs a scan shortly after every candle close
+    
+    At each boundary only the timeframes that closed are scanned, e.g. with
+    15m and 1h the 1h group joins every fourth 15m scan. Each wake-up is
+    `delay` seconds after the boundary plus up to `jitter` seconds, so
+    exchanges have published the candle and restarts don't synchronise
+    requests. Pairs whose new candle hasn't appeared yet are retried with a
+    growing delay; the last attempt processes whatever data there is.
+    Boundaries that pass while a scan (with its retries) is still running
+    are scanned right after it, so no closed candle is skipped.
+    """
+    
+    def __init__(self, timeframes: Sequence[str], scan: ScanCallback,
+                 delay: float = CANDLE_CLOSE_DELAY, jitter: float = CANDLE_CLOSE_JITTER,
+                 retries: int = CANDLE_CLOSE_RETRIES, retry_delay: float = CANDLE_CLOSE_RETRY_DELAY):
+        unknown = [timeframe for timeframe in timeframes if timeframe not in INTERVAL_MS]
+        if unknown:
+            raise ValueError(f"Unsupported timeframes: {', '.join(unknown)}")
+        self.timeframes = list(timeframes)
+        self.scan = scan
+        self.delay = delay
+        self.jitter = jitter
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.task: Optional[asyncio.Task] = None
+        
+        # Seconds from candle boundary to the last scan's start
+        self.last_lag = 0.0
+    
+    def next_run(self, now_ms: float) -> Tuple[int, List[str]]:
+        """Next boundary and the timeframes that close on it"""
+        boundary = min(next_boundary(now_ms, INTERVAL_MS[timeframe]) for timeframe in self.timeframes)
+        due = [timeframe for timeframe in self.timeframes if boundary % INTERVAL_MS[timeframe] == 0]
+        return boundary, due
+    
+    def closed_since(self, since_ms: float, now_ms: float) -> List[Tuple[int, List[str]]]:
+        """(boundary, timeframes) of the latest closes after `since_ms`, oldest first"""
+        groups = {}
+        for timeframe in self.timeframes:
+            boundary = int(now_ms) // INTERVAL_MS[timeframe] * INTERVAL_MS[timeframe]
+            if boundary > since_ms:
+                groups.setdefault(boundary, []).append(timeframe)
+        return sorted(groups.items())
+    
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+    
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+    
+    async def run(self):
+        """Initial scan of every timeframe, then one scan per candle close until cancelled"""
+        # Closes up to here are covered by the initial scan
+        scanned = time.time() * 1000
+        try:
+            await self.scan(self.timeframes, None, None)
+        except Exception as e:
+            logger.error(f"Error in initial scan: {e}")
+        
+        while True:
+            runs = self.closed_since(scanned, time.time() * 1000)
+            if runs:
+                # Closed while the previous scan was running: scan them now
+                logger.warning(f"Scan ran past the candle close of {', '.join(sum((due for _, due in runs), []))}, "
+                               f"catching up")
+            else:
+                boundary, due = self.next_run(time.time() * 1000)
+                wait = (boundary - time.time() * 1000) / 1000 + self.delay + random.uniform(0, self.jitter)
+                await asyncio.sleep(max(wait, 0))
+                runs = [(boundary, due)]
+            
+            for boundary, due in runs:
+                try:
+                    self.last_lag = time.time() - boundary / 1000
+                    await self.run_boundary(due, boundary)
+                except Exception as e:
+                    logger.error(f"Error in scheduled scan: {e}")
+                scanned = max(scanned, boundary)
+    
+    async def run_boundary(self, timeframes: List[str], boundary: int):
+        """Scan the closed timeframes, retrying pairs that are not published yet"""
+        pending = await self.scan(timeframes, boundary if self.retries else None, None)
+        for attempt in range(1, self.retries + 1):
+            if not pending:
+                return
+            await asyncio.sleep(self.retry_delay * attempt)
+            # Out of retries: use the data as it is (e.g. market closed)
+            closed_at = boundary if attempt < self.retries else None
+            pending = await self.scan(timeframes, closed_at, pending)
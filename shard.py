@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sharded scanning
+Worker processes that each scan a hash partition of the watched
+(symbol, timeframe) pairs and report indicator state and signals to the
+Telegram process over a multiprocessing queue
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+import zlib
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from config import SCAN_SCHEDULE, CHECK_INTERVAL, TIMEFRAMES, SNAPSHOT_INTERVAL, PROFILE_SCANS
+
+logger = logging.getLogger(__name__)
+
+# Events (worker -> bot process), in order per worker:
+#   ('state', symbol, timeframe, timestamp, status, statistics)  indicator updated
+#   ('signal', symbol, timeframe, signal_type, price)            new signal
+#   ('scan', shard, duration, overruns)                          scan cycle finished
+# Commands (bot process -> every worker):
+#   ('watch', symbol, provider, ticker), ('unwatch', symbol), ('stop',)
+Event = tuple
+Watchlist = List[Tuple[str, str, str]]
+
+
+def shard_of(symbol: str, timeframe: str, shards: int) -> int:
+    """Worker that owns a pair (stable across processes and restarts)"""
+    return zlib.crc32(f"{symbol}_{timeframe}".encode()) % shards
+
+
+class IndicatorView:
+    """
+    Bot-process copy of a worker-owned indicator
+    
+    Holds what messages need (get_status, get_statistics and the levels),
+    refreshed from the worker's 'state' events.
+    """
+    
+    streaming = False
+    
+    def __init__(self, indicator):
+        self.overbought = indicator.overbought
+        self.oversold = indicator.oversold
+        self.status = indicator.get_status()
+        self.statistics = indicator.get_statistics()
+    
+    def apply(self, status: Dict, statistics: Dict):
+        self.status = status
+        self.statistics = statistics
+    
+    def get_status(self) -> Dict:
+        # Callers may add fields to the returned dict
+        return dict(self.status)
+    
+    def get_statistics(self) -> Dict:
+        return dict(self.statistics)
+
+
+class ShardSupervisor:
+    """
+    Starts the scan workers, relays their events and restarts any that die
+    
+    Events from all workers arrive on one queue, read in a thread so the
+    event loop never blocks on it; per worker they keep their order.
+    """
+    
+    def __init__(self, workers: int, on_event: Callable[[Event], Awaitable[None]],
+                 watchlist: Callable[[], Watchlist], monitor_interval: float = 5.0):
+        """
+        Args:
+            on_event: Handles one worker event in the bot process
+            watchlist: Current (symbol, provider, ticker) list, passed to
+                (re)started workers
+        """
+        self.workers = workers
+        self.on_event = on_event
+        self.watchlist = watchlist
+        self.monitor_interval = monitor_interval
+        # spawn: children don't inherit the running event loop or threads
+        self.context = multiprocessing.get_context('spawn')
+        self.events = self.context.Queue()
+        self.commands: List[Optional[multiprocessing.Queue]] = [None] * workers
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self.reader: Optional[asyncio.Task] = None
+        self.monitor: Optional[asyncio.Task] = None
+        self.restarts = 0
+    
+    def _spawn(self, index: int):
+        commands = self.context.Queue()
+        process = self.context.Process(
+            target=run_worker, args=(index, self.workers, self.watchlist(), self.events, commands),
+            name=f"scan-shard-{index}", daemon=True
+        )
+        process.start()
+        self.commands[index] = commands
+        self.processes[index] = process
+    
+    def start(self):
+        for index in range(self.workers):
+            self._spawn(index)
+        self.reader = asyncio.create_task(self._read())
+        self.monitor = asyncio.create_task(self._monitor())
+        logger.info(f"Started {self.workers} scan workers")
+    
+    def send(self, command: tuple):
+        """Send a command to every worker (each applies it to the pairs it owns)"""
+        for commands in self.commands:
+            if commands is not None:
+                commands.put(command)
+    
+    async def _read(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            event = await loop.run_in_executor(None, self.events.get)
+            if event is None:
+                return
+            try:
+                await self.on_event(event)
+            except Exception as e:
+                logger.error(f"Error handling shard event {event[0]}: {e}")
+    
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.monitor_interval)
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive():
+                    self.restarts += 1
+                    logger.error(f"Scan worker {index} exited with code {process.exitcode}, restarting")
+                    self._spawn(index)
+    
+    async def stop(self, timeout: float = 10):
+        """Stop the workers (they save their snapshots) and the event reader"""
+        if self.monitor is not None:
+            self.monitor.cancel()
+            self.monitor = None
+        self.send(('stop',))
+        
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            await loop.run_in_executor(None, process.join, max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning(f"Scan worker {index} did not stop in time, terminating")
+                process.terminate()
+            self.processes[index] = None
+        
+        if self.reader is not None:
+            # Events still queued are handled before the sentinel
+            self.events.put(None)
+            await self.reader
+            self.reader = None
+
+
+def run_worker(index: int, shards: int, watchlist: Watchlist,
+               events: multiprocessing.Queue, commands: multiprocessing.Queue):
+    """Process entry point of scan worker `index`"""
+    # Ctrl+C reaches the whole process group; the bot process stops workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_worker_main(index, shards, watchlist, events, commands))
+
+
+async def _scan_every(bot, interval: float):
+    """SCAN_SCHEDULE=interval: one scan every `interval` seconds"""
+    while True:
+        started = time.monotonic()
+        await bot.check_signals(None)
+        await asyncio.sleep(max(interval - (time.monotonic() - started), 0))
+
+
+async def _worker_main(index: int, shards: int, watchlist: Watchlist,
+                       events: multiprocessing.Queue, commands: multiprocessing.Queue):
+    # Imported here: the bot module imports this one
+    from bot import TradingBot
+    from scheduler import CandleCloseScheduler
+    
+    bot = TradingBot(shard=(index, shards), emit=events.put)
+    for symbol in bot.registry.symbols():
+        bot.registry.remove(symbol)
+    for symbol, provider, ticker in watchlist:
+        bot.registry.add(symbol, provider, ticker)
+    
+    bot.restore_state()
+    bot.warm_up()
+    if PROFILE_SCANS:
+        bot.profiler.arm(PROFILE_SCANS, bot.log_profile_report)
+    # Without a Telegram application the bot argument is None; alerts are
+    # emitted as events instead of sent
+    await bot.start_streams(None)
+    if SCAN_SCHEDULE == 'candle_close':
+        scheduler = CandleCloseScheduler(TIMEFRAMES, lambda *args: bot.scheduled_scan(None, *args))
+        scheduler.start()
+        scan_task = None
+    else:
+        scheduler = None
+        scan_task = asyncio.create_task(_scan_every(bot, CHECK_INTERVAL))
+    logger.info(f"Scan worker {index}/{shards} owns {sum(bot.owns(*pair) for pair in bot.registry.pairs())} pairs")
+    
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            command = await loop.run_in_executor(None, commands.get, True, SNAPSHOT_INTERVAL)
+        except queue.Empty:
+            bot.save_snapshot()
+            continue
+        
+        try:
+            if command[0] == 'stop':
+                break
+            elif command[0] == 'watch':
+                await bot.watch_symbol(*command[1:], application=None)
+            elif command[0] == 'unwatch':
+                await bot.unwatch_symbol(command[1], application=None)
+        except Exception as e:
+            logger.error(f"Scan worker {index}: error handling {command[0]}: {e}")
+    
+    if scheduler is not None:
+        await scheduler.stop()
+    if scan_task is not None:
+        scan_task.cancel()
+        try:
+            await scan_task
+        except asyncio.CancelledError:
+            pass
+    await bot.stop_streams(None)
+    bot.compute.shutdown()
+    if bot.profiler.active:
+        report, path = bot.profiler.finish()
+        await bot.log_profile_report(report, path)
+    bot.save_snapshot()
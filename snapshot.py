@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bot state snapshots
+Versioned, compressed snapshot files written atomically (msgpack when
+available, JSON otherwise)
+"""
+
+import os
+import json
+import zlib
+import struct
+import logging
+import tempfile
+from typing import Dict, Optional
+
+try:
+    # Optional compact binary encoding
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RSIS'
+SNAPSHOT_VERSION = 1
+
+# Payload encodings
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+
+# magic, format version, codec
+HEADER = struct.Struct('>4sBB')
+
+
+def encode_snapshot(state: Dict) -> bytes:
+    """Header + zlib-compressed msgpack (or JSON) payload"""
+    if msgpack is not None:
+        codec, payload = CODEC_MSGPACK, msgpack.packb(state, use_bin_type=True)
+    else:
+        codec, payload = CODEC_JSON, json.dumps(state, separators=(',', ':')).encode('utf-8')
+    return HEADER.pack(MAGIC, SNAPSHOT_VERSION, codec) + zlib.compress(payload)
+
+
+def decode_snapshot(data: bytes) -> Dict:
+    """Inverse of encode_snapshot; raises ValueError for unreadable data"""
+    if len(data) < HEADER.size:
+        raise ValueError("snapshot too short")
+    
+    magic, version, codec = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a snapshot file")
+    if version > SNAPSHOT_VERSION:
+        raise ValueError(f"snapshot version {version} is newer than supported ({SNAPSHOT_VERSION})")
+    
+    payload = zlib.decompress(data[HEADER.size:])
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ValueError("snapshot needs msgpack, which is not installed")
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    if codec == CODEC_JSON:
+        return json.loads(payload)
+    raise ValueError(f"unknown snapshot codec {codec}")
+
+
+def save_snapshot(path: str, state: Dict):
+    """
+    Write a snapshot atomically
+    
+    The data goes to a temporary file in the same directory, is flushed to
+    disk and then renamed over `path`, so a crash never leaves a partial
+    snapshot behind.
+    """
+    data = encode_snapshot(state)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_snapshot(path: str) -> Optional[Dict]:
+    """Read a snapshot; None if missing or unreadable"""
+    if not os.path.exists(path):
+        return None
+    
+    try:
+        with open(path, 'rb') as f:
+            return decode_snapshot(f.read())
+    except Exception as e:
+        logger.error(f"Error loading snapshot {path}: {e}")
+        return None
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parallel parameter sweep for the RSI Follow Trend setup
+Evaluates a grid of RSI/EMA/WMA lengths and OB/OS levels across worker
+processes that read the candles from shared memory
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from multiprocessing import shared_memory
+from typing import List, Dict, Optional, Sequence, Tuple
+from rsi_indicator import RSI_MODE_WILDER, rsi_series, ema_series, wma_series
+from backtest import (
+    signal_events, add_source_arguments, load_source,
+    EVENT_BUY_1, EVENT_BUY_2, EVENT_SELL_1, EVENT_SELL_2
+)
+
+RESULT_FIELDS = (
+    'rsi_length', 'ema_length', 'wma_length', 'overbought', 'oversold',
+    'trades', 'buy_1', 'buy_2', 'sell_1', 'sell_2',
+    'win_rate', 'mean_return', 'total_return',
+)
+
+# Worker-side view of the shared closes (set by _attach)
+_shm = None
+_closes = None
+
+
+def _attach(name: str, length: int):
+    """Pool initializer: map the shared closes without copying them"""
+    global _shm, _closes
+    _shm = shared_memory.SharedMemory(name=name)
+    _closes = np.ndarray((length,), dtype=np.float64, buffer=_shm.buf)
+
+
+@lru_cache(maxsize=4)
+def _rsi(rsi_length: int, rsi_mode: str) -> np.ndarray:
+    """RSI series, reused across the EMA/WMA combinations a worker gets"""
+    return rsi_series(_closes, rsi_length, rsi_mode)[rsi_length:]
+
+
+def score_events(closes: np.ndarray, events: np.ndarray, offset: int, horizon: int) -> Dict:
+    """
+    Score signals by their forward return over `horizon` candles
+    
+    BUY signals are scored long and SELL signals short, entering at the
+    signal candle's close. Signals without `horizon` candles after them are
+    left out of the returns but still counted.
+    
+    Args:
+        offset: Candle index of events[0]
+    """
+    long = np.flatnonzero(events & (EVENT_BUY_1 | EVENT_BUY_2)) + offset
+    short = np.flatnonzero(events & (EVENT_SELL_1 | EVENT_SELL_2)) + offset
+    long = long[long + horizon < len(closes)]
+    short = short[short + horizon < len(closes)]
+    
+    returns = np.concatenate((
+        closes[long + horizon] / closes[long] - 1.0,
+        1.0 - closes[short + horizon] / closes[short],
+    ))
+    
+    return {
+        'trades': len(returns),
+        'buy_1': int(np.count_nonzero(events & EVENT_BUY_1)),
+        'buy_2': int(np.count_nonzero(events & EVENT_BUY_2)),
+        'sell_1': int(np.count_nonzero(events & EVENT_SELL_1)),
+        'sell_2': int(np.count_nonzero(events & EVENT_SELL_2)),
+        'win_rate': float(np.mean(returns > 0)) if len(returns) else 0.0,
+        'mean_return': float(returns.mean()) if len(returns) else 0.0,
+        'total_return': float(returns.sum()),
+    }
+
+
+def _evaluate(rsi_length: int, ema_length: int, wma_length: int,
+              levels: Sequence[Tuple[float, float]], rsi_mode: str, horizon: int) -> List[Dict]:
+    """Worker task: one set of lengths, every (overbought, oversold) pair"""
+    rsi = _rsi(rsi_length, rsi_mode)
+    ema9 = ema_series(rsi, ema_length)
+    wma45 = wma_series(rsi, wma_length)
+    
+    results = []
+    for overbought, oversold in levels:
+        events = signal_events(rsi, ema9, wma45, overbought, oversold)
+        result = {
+            'rsi_length': rsi_length,
+            'ema_length': ema_length,
+            'wma_length': wma_length,
+            'overbought': overbought,
+            'oversold': oversold,
+        }
+        result.update(score_events(_closes, events, rsi_length + 1, horizon))
+        results.append(result)
+    return results
+
+
+def run_sweep(closes: np.ndarray, rsi_lengths: Sequence[int], ema_lengths: Sequence[int],
+              wma_lengths: Sequence[int], overbought_levels: Sequence[float],
+              oversold_levels: Sequence[float], rsi_mode: str = RSI_MODE_WILDER,
+              horizon: int = 10, workers: Optional[int] = None, min_trades: int = 1) -> List[Dict]:
+    """
+    Evaluate every parameter combination in parallel
+    
+    The closes are copied once into shared memory; each task only carries
+    its parameters.
+    
+    Returns:
+        Results with at least `min_trades` scored trades, best total
+        forward return first
+    """
+    closes = np.ascontiguousarray(closes, dtype=np.float64)
+    levels = [(ob, os_) for ob, os_ in itertools.product(overbought_levels, oversold_levels) if os_ < ob]
+    lengths = list(itertools.product(rsi_lengths, ema_lengths, wma_lengths))
+    
+    shm = shared_memory.SharedMemory(create=True, size=max(closes.nbytes, 1))
+    try:
+        np.ndarray(closes.shape, dtype=np.float64, buffer=shm.buf)[:] = closes
+        
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(shm.name, len(closes))) as pool:
+            futures = [
+                pool.submit(_evaluate, rsi_length, ema_length, wma_length, levels, rsi_mode, horizon)
+                for rsi_length, ema_length, wma_length in lengths
+            ]
+            for future in as_completed(futures):
+                results.extend(future.result())
+    finally:
+        shm.close()
+        shm.unlink()
+    
+    results = [r for r in results if r['trades'] >= min_trades]
+    results.sort(key=lambda r: (r['total_return'], r['win_rate']), reverse=True)
+    return results
+
+
+def write_results(results: List[Dict], path: str):
+    """Write ranked results as CSV"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=('rank',) + RESULT_FIELDS)
+        writer.writeheader()
+        for rank, result in enumerate(results, 1):
+            writer.writerow({'rank': rank, **result})
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',')]
+
+
+def _float_list(value: str) -> List[float]:
+    return [float(v) for v in value.split(',')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parameter sweep for the RSI Follow Trend setup')
+    add_source_arguments(parser)
+    parser.add_argument('--rsi', type=_int_list, default=[7, 10, 14, 21], help='RSI lengths')
+    parser.add_argument('--ema', type=_int_list, default=[5, 9, 13], help='EMA lengths')
+    parser.add_argument('--wma', type=_int_list, default=[30, 45, 60], help='WMA lengths')
+    parser.add_argument('--overbought', type=_float_list, default=[70, 75, 80])
+    parser.add_argument('--oversold', type=_float_list, default=[20, 25, 30])
+    parser.add_argument('--rsi-mode', default=RSI_MODE_WILDER)
+    parser.add_argument('--horizon', type=int, default=10, help='Forward return horizon in candles')
+    parser.add_argument('--min-trades', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--out', default='sweep_results.csv')
+    parser.add_argument('--top', type=int, default=10, help='Number of results to print')
+    args = parser.parse_args()
+    
+    closes = load_source(args)['close']
+    started = time.perf_counter()
+    results = run_sweep(closes, args.rsi, args.ema, args.wma, args.overbought, args.oversold,
+                        rsi_mode=args.rsi_mode, horizon=args.horizon,
+                        workers=args.workers, min_trades=args.min_trades)
+    elapsed = time.perf_counter() - started
+    
+    write_results(results, args.out)
+    print(f"{len(results)} results in {elapsed:.1f}s -> {args.out}")
+    for rank, r in enumerate(results[:args.top], 1):
+        print(f"{rank:>3}. RSI {r['rsi_length']} EMA {r['ema_length']} WMA {r['wma_length']} "
+              f"OB {r['overbought']:g} OS {r['oversold']:g}: {r['trades']} trades, "
+              f"win {r['win_rate']:.0%}, mean {r['mean_return']:+.3%}, total {r['total_return']:+.2%}")
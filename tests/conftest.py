@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+Test setup
+Imports the bot modules from the repository root, with a configuration
+that keeps state out of the working tree
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Read by config.py on import: no candle store or snapshots, no scan workers
+os.environ['DATA_DIR'] = ''
+os.environ['SNAPSHOT_PATH'] = ''
+os.environ['SHARD_WORKERS'] = '0'
+os.environ['METRICS_ENABLED'] = 'false'
+os.environ['PROFILE_SCANS'] = '0'
+# Tests only talk to local servers: no credit budget to pace against
+os.environ['TWELVE_DATA_CREDITS_PER_MINUTE'] = '10000'
+os.environ['TWELVE_DATA_DAILY_CREDITS'] = '0'
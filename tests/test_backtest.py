@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+run_backtest against RSIFollowTrend fed every candle in streaming mode
+"""
+
+import numpy as np
+import pytest
+
+from backtest import run_backtest, indicator_series
+from rsi_indicator import RSIFollowTrend, RSI_MODE_WILDER, RSI_MODE_SMA, IndicatorStream
+
+
+def klines(seed: int, n: int = 1200) -> list:
+    rng = np.random.default_rng(seed)
+    closes = 1000.0 + np.cumsum(rng.normal(0, 5, n))
+    return [{'timestamp': i * 60_000, 'close': close} for i, close in enumerate(closes.tolist())]
+
+
+def streamed_events(candles: list, mode: str, overbought: float, oversold: float):
+    """(timestamp, signal) per fired signal, and the final statistics"""
+    indicator = RSIFollowTrend(rsi_mode=mode, streaming=True, overbought=overbought, oversold=oversold)
+    events = []
+    for candle in candles:
+        totals = indicator.get_statistics()
+        if not indicator.push_candle(candle['close'], candle['timestamp']):
+            continue
+        signals = indicator.get_signals()
+        statistics = indicator.get_statistics()
+        for name in ('buy_1', 'buy_2', 'sell_1', 'sell_2'):
+            # #2 entries only show in the totals
+            if signals[name] or (name.endswith('_2') and statistics[f'total_{name}'] > totals[f'total_{name}']):
+                events.append((candle['timestamp'], name))
+    return events, indicator.get_statistics()
+
+
+@pytest.mark.parametrize('seed', [1, 4, 8, 17])
+@pytest.mark.parametrize('mode, overbought, oversold', [
+    (RSI_MODE_WILDER, 80, 20), (RSI_MODE_WILDER, 70, 30), (RSI_MODE_SMA, 80, 20),
+])
+def test_backtest_matches_streaming_indicator(seed, mode, overbought, oversold):
+    candles = klines(seed)
+    
+    report = run_backtest(candles, rsi_mode=mode, overbought=overbought, oversold=oversold)
+    events, statistics = streamed_events(candles, mode, overbought, oversold)
+    
+    assert [(event['timestamp'], event['signal']) for event in report['events']] == events
+    assert report['statistics'] == statistics
+    assert report['bars'] == len(candles)
+
+
+def test_backtest_covers_every_signal_type():
+    report = run_backtest(klines(1))
+    
+    assert {event['signal'] for event in report['events']} == {'buy_1', 'buy_2', 'sell_1', 'sell_2'}
+
+
+def test_event_values_are_the_candles_indicator_values():
+    candles = klines(4)
+    stream = IndicatorStream()
+    values = {candle['timestamp']: stream.push(candle['close']) for candle in candles}
+    
+    report = run_backtest(candles)
+    
+    assert report['events']
+    for event in report['events']:
+        rsi, ema9, wma45 = values[event['timestamp']]
+        assert event['close'] == candles[event['timestamp'] // 60_000]['close']
+        assert (event['rsi'], event['ema9'], event['wma45']) == pytest.approx((rsi, ema9, wma45), abs=1e-9)
+
+
+def test_short_history_has_no_events():
+    candles = klines(1, n=15)
+    
+    report = run_backtest(candles)
+    
+    assert report['events'] == []
+    assert report['bars'] == 15
+    assert len(indicator_series(np.array([candle['close'] for candle in candles]))[0]) == 1
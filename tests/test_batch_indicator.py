@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+BatchIndicatorEngine against per-indicator RSIFollowTrend.update() and
+get_signals() on the same windows
+"""
+
+import numpy as np
+import pytest
+
+from batch_indicator import BatchIndicatorEngine, rsi_matrix, ema_matrix, wma_matrix
+from rsi_indicator import (
+    RSIFollowTrend, RSI_MODE_WILDER, RSI_MODE_SMA, INDICATOR_STATE_FIELDS,
+    rsi_series, ema_series, wma_series
+)
+
+# (overbought, oversold) per pair; tighter levels complete more setups
+LEVELS = [(80, 20), (70, 30), (65, 35), (80, 20), (70, 30)]
+WINDOW = 100
+
+
+def random_walks(pairs: int, n: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 1000.0 + np.cumsum(rng.normal(0, 5, (pairs, n)), axis=1)
+
+
+def assert_same_state(batched: RSIFollowTrend, single: RSIFollowTrend, context: str):
+    for name in INDICATOR_STATE_FIELDS:
+        expected = getattr(single, name)
+        if isinstance(expected, float):
+            assert getattr(batched, name) == pytest.approx(expected, abs=1e-9), f"{name} {context}"
+        else:
+            assert getattr(batched, name) == expected, f"{name} {context}"
+
+
+@pytest.mark.parametrize('mode', [RSI_MODE_WILDER, RSI_MODE_SMA])
+def test_matrix_series_match_per_row_series(mode):
+    closes = random_walks(4, 300)
+    
+    rsi = rsi_matrix(closes, 14, mode)
+    
+    for row, expected in zip(rsi, closes):
+        np.testing.assert_allclose(row, rsi_series(expected, 14, mode), rtol=0, atol=1e-9)
+    for period in (1, 9, 45):
+        for row, values in zip(ema_matrix(rsi, period), rsi):
+            np.testing.assert_allclose(row, ema_series(values, period), rtol=0, atol=1e-9)
+        for row, values in zip(wma_matrix(rsi, period), rsi):
+            np.testing.assert_allclose(row, wma_series(values, period), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize('mode', [RSI_MODE_WILDER, RSI_MODE_SMA])
+def test_update_many_matches_per_indicator_updates(mode):
+    closes = random_walks(len(LEVELS), 600)
+    engine = BatchIndicatorEngine(rsi_mode=mode)
+    batched = [RSIFollowTrend(rsi_mode=mode, overbought=high, oversold=low) for high, low in LEVELS]
+    single = [RSIFollowTrend(rsi_mode=mode, overbought=high, oversold=low) for high, low in LEVELS]
+    
+    fired = {name: 0 for name in ('buy_1', 'buy_2', 'sell_1', 'sell_2')}
+    # Windows grow from too short to WINDOW bars, then slide; lengths differ
+    # per pair (some pairs share a matrix pass, some don't)
+    for end in range(30, closes.shape[1]):
+        windows = [closes[i, max(end - WINDOW - i % 3, 0):end - i % 2] for i in range(len(LEVELS))]
+        
+        signals = engine.update_many(batched, windows)
+        
+        for i, (indicator, window) in enumerate(zip(single, windows)):
+            updated = indicator.update([{'timestamp': 0, 'close': close} for close in window.tolist()])
+            context = f"pair {i} bar {end}"
+            if not updated:
+                assert signals[i] is None, context
+                assert len(window) < engine.min_bars, context
+            else:
+                assert signals[i] == indicator.get_signals(), context
+                for name in fired:
+                    fired[name] += signals[i][name]
+            assert_same_state(batched[i], indicator, context)
+    
+    # The data completes setups on both sides
+    assert fired['buy_1'] and fired['sell_1'], fired
+    assert sum(indicator.total_buy_2 + indicator.total_sell_2 for indicator in batched)
+
+
+def test_update_rejects_mismatched_indicators():
+    engine = BatchIndicatorEngine()
+    closes = random_walks(1, 100)
+    
+    with pytest.raises(ValueError):
+        engine.update([RSIFollowTrend(streaming=True)], closes)
+    with pytest.raises(ValueError):
+        engine.update([RSIFollowTrend(rsi_length=21)], closes)
+    with pytest.raises(ValueError):
+        engine.update([RSIFollowTrend(), RSIFollowTrend()], closes)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+BroadcastDispatcher against a fake Telegram bot: flood control, per-chat
+pacing and chats that went away
+"""
+
+import asyncio
+import time
+
+from telegram.error import ChatMigrated, Forbidden, RetryAfter
+
+from broadcast import BroadcastDispatcher
+
+
+class FakeBot:
+    """send_message that records deliveries and raises scripted errors per chat"""
+    
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.sent = []
+    
+    async def send_message(self, chat_id, text, **kwargs):
+        errors = self.errors.get(chat_id)
+        if errors:
+            raise errors.pop(0)
+        self.sent.append((chat_id, text, time.monotonic()))
+
+
+def deliver(dispatcher: BroadcastDispatcher, bot: FakeBot, messages):
+    """Broadcast (chat_ids, text) pairs and wait until everything is handled"""
+    async def scenario():
+        dispatcher.start(bot)
+        started = time.monotonic()
+        for chat_ids, text in messages:
+            dispatcher.broadcast(chat_ids, text)
+        await dispatcher.stop(timeout=5)
+        return started
+    
+    return asyncio.run(scenario())
+
+
+def test_retry_after_pauses_every_worker_and_retries():
+    bot = FakeBot({1: [RetryAfter(0.2)]})
+    dispatcher = BroadcastDispatcher(workers=3, global_rate=1000, chat_interval=0, group_interval=0)
+    
+    started = deliver(dispatcher, bot, [([1], 'first'), ([2, 3, 4], 'second')])
+    
+    assert sorted(chat_id for chat_id, *_ in bot.sent) == [1, 2, 3, 4]
+    # The first send hit flood control: nothing went out until the pause ended
+    assert min(sent_at for *_, sent_at in bot.sent) - started >= 0.2
+    assert dispatcher.get_stats() == {'queued': 0, 'sent': 4, 'failed': 0, 'pruned': 0}
+
+
+def test_messages_to_one_chat_keep_order_and_spacing():
+    bot = FakeBot()
+    dispatcher = BroadcastDispatcher(workers=4, global_rate=1000, chat_interval=0.05, group_interval=0.15)
+    
+    deliver(dispatcher, bot, [([7, -100], f"message {i}") for i in range(3)])
+    
+    for chat_id, interval in ((7, 0.05), (-100, 0.15)):
+        sent = [(text, sent_at) for sent_to, text, sent_at in bot.sent if sent_to == chat_id]
+        assert [text for text, _ in sent] == [f"message {i}" for i in range(3)]
+        gaps = [later - earlier for (_, earlier), (_, later) in zip(sent, sent[1:])]
+        # Groups wait longer between messages than private chats
+        assert all(gap >= interval * 0.9 for gap in gaps), gaps
+
+
+def test_blocked_chats_are_pruned_and_migrated_chats_followed():
+    blocked, migrated = [], []
+    bot = FakeBot({5: [Forbidden('bot was blocked by the user')], -1: [ChatMigrated(-1001)]})
+    dispatcher = BroadcastDispatcher(workers=2, global_rate=1000, chat_interval=0, group_interval=0,
+                                     on_blocked=blocked.append,
+                                     on_migrated=lambda old, new: migrated.append((old, new)))
+    
+    deliver(dispatcher, bot, [([5, -1, 6], 'alert')])
+    
+    assert blocked == [5]
+    assert migrated == [(-1, -1001)]
+    assert sorted(chat_id for chat_id, *_ in bot.sent) == [-1001, 6]
+    assert dispatcher.get_stats()['pruned'] == 1
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+CandleStore: append-only files read back through memmap, across reopens
+and torn writes
+"""
+
+import numpy as np
+
+from candle_store import CandleStore, RECORD_SIZE
+from candles import KLINE_DTYPE
+
+MS = 60_000
+
+
+def klines(start: int, count: int) -> np.ndarray:
+    array = np.zeros(count, dtype=KLINE_DTYPE)
+    array['timestamp'] = (start + np.arange(count)) * MS
+    array['close'] = 100.0 + start + np.arange(count)
+    return array
+
+
+def test_append_only_writes_newer_candles_and_survives_reopen(tmp_path):
+    store = CandleStore(str(tmp_path))
+    
+    assert store.append('BTCUSD', '1m', klines(0, 10)) == 10
+    # Overlap with what is stored already
+    assert store.append('BTCUSD', '1m', klines(5, 10)) == 5
+    assert store.append('BTCUSD', '1m', klines(0, 3)) == 0
+    
+    reopened = CandleStore(str(tmp_path))
+    stored = reopened.read('BTCUSD', '1m')
+    assert isinstance(stored, np.memmap)
+    assert stored.tolist() == klines(0, 15).tolist()
+    assert reopened.last_timestamp('BTCUSD', '1m') == 14 * MS
+    assert reopened.keys() == [('BTCUSD', '1m')]
+    
+    # Appending through the new instance continues the same file
+    assert reopened.append('BTCUSD', '1m', klines(14, 3)) == 2
+    assert store.count('BTCUSD', '1m') == 17
+
+
+def test_read_bounds_and_tail(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append('XAUUSD', '15m', klines(0, 20))
+    
+    assert store.read('XAUUSD', '15m', start=5 * MS, end=8 * MS)['timestamp'].tolist() == [5 * MS, 6 * MS, 7 * MS]
+    assert len(store.read('XAUUSD', '15m', start=30 * MS)) == 0
+    tail = store.tail('XAUUSD', '15m', 3)
+    assert not isinstance(tail, np.memmap)
+    assert tail['timestamp'].tolist() == [17 * MS, 18 * MS, 19 * MS]
+    assert len(store.read('ETHUSD', '15m')) == 0
+    assert store.last_timestamp('ETHUSD', '15m') is None
+
+
+def test_torn_trailing_write_is_truncated(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append('BTCUSD', '1m', klines(0, 4))
+    path = store.path('BTCUSD', '1m')
+    with open(path, 'ab') as f:
+        # A crash in the middle of the next record
+        f.write(klines(4, 1).tobytes()[:RECORD_SIZE // 2])
+    
+    reopened = CandleStore(str(tmp_path))
+    
+    assert reopened.count('BTCUSD', '1m') == 4
+    assert (tmp_path / 'BTCUSD_1m.klines').stat().st_size == 4 * RECORD_SIZE
+    assert reopened.last_timestamp('BTCUSD', '1m') == 3 * MS
+    assert reopened.append('BTCUSD', '1m', klines(3, 3)) == 2
+    assert reopened.read('BTCUSD', '1m').tolist() == klines(0, 6).tolist()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+CandleSeries: rolling window, in-place replacement of the forming candle
+and conversions
+"""
+
+import numpy as np
+import pytest
+
+from candles import CandleSeries, KLINE_DTYPE, KLINE_FIELDS
+
+
+def candle(i: int) -> tuple:
+    return (i * 60_000, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 10.0 * i)
+
+
+def test_window_keeps_the_last_capacity_candles_across_compactions():
+    series = CandleSeries(capacity=5)
+    # Slack is max(5 // 4, 16) = 16 slots: the window moves to the front several times
+    for i in range(100):
+        series.append(*candle(i))
+        assert len(series) == min(i + 1, 5)
+        assert series.timestamp.tolist() == [candle(j)[0] for j in range(max(i - 4, 0), i + 1)]
+    
+    assert series.close.tolist() == [candle(j)[4] for j in range(95, 100)]
+    assert series[0] == dict(zip(KLINE_FIELDS, candle(95)))
+    assert series[-1] == dict(zip(KLINE_FIELDS, candle(99)))
+    with pytest.raises(IndexError):
+        series[5]
+
+
+def test_extend_past_capacity_keeps_the_newest():
+    array = np.array([candle(i) for i in range(30)], dtype=KLINE_DTYPE)
+    series = CandleSeries(capacity=8)
+    
+    series.extend(array[:5])
+    series.extend(array[5:])
+    
+    assert series.to_array().tolist() == array[-8:].tolist()
+    assert CandleSeries.from_array(array).to_dicts() == [dict(zip(KLINE_FIELDS, candle(i))) for i in range(30)]
+
+
+def test_replace_last_and_merge_update_the_forming_candle():
+    series = CandleSeries(capacity=4)
+    with pytest.raises(IndexError):
+        series.replace_last(*candle(0))
+    for i in range(3):
+        series.append(*candle(i))
+    
+    series.replace_last(2 * 60_000, 1.0, 2.0, 0.5, 1.5, 7.0)
+    assert len(series) == 3
+    assert series[-1]['close'] == 1.5
+    
+    # Older candles ignored, the same open time replaced, newer ones appended
+    revised = np.array([candle(1), (2 * 60_000, 0, 0, 0, 9.0, 0), candle(3), candle(4)], dtype=KLINE_DTYPE)
+    series.merge(revised)
+    assert series.timestamp.tolist() == [candle(i)[0] for i in range(1, 5)]
+    assert series.close.tolist() == [candle(1)[4], 9.0, candle(3)[4], candle(4)[4]]
+
+
+def test_tail_is_a_copy():
+    series = CandleSeries.from_dicts([dict(zip(KLINE_FIELDS, candle(i))) for i in range(10)])
+    
+    tail = series.tail(3)
+    series.replace_last(*candle(50))
+    
+    assert tail.timestamp.tolist() == [candle(i)[0] for i in range(7, 10)]
+    assert len(series.tail(50)) == 10
+    assert len(CandleSeries(1).tail(5)) == 0
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+ComputeStage: per-key ordering of blocks, cancellation while queued and
+pure-function offload
+"""
+
+import asyncio
+
+import pytest
+
+from compute import ComputeStage
+from profiler import ScanProfiler
+
+
+def test_same_key_blocks_run_in_entry_order():
+    async def scenario():
+        stage = ComputeStage('inline')
+        order = []
+        
+        async def job(name, delay):
+            async with stage.ordered([('BTCUSD', '15m')]):
+                # Earlier blocks take longer; order must still hold
+                await asyncio.sleep(delay)
+                order.append(name)
+        
+        await asyncio.gather(job(1, 0.03), job(2, 0.02), job(3, 0))
+        return order, stage
+    
+    order, stage = asyncio.run(scenario())
+    
+    assert order == [1, 2, 3]
+    assert stage._tails == {}
+
+
+def test_different_keys_overlap():
+    async def scenario():
+        stage = ComputeStage('inline')
+        inside = set()
+        both_inside = asyncio.Event()
+        
+        async def job(key):
+            async with stage.ordered([key]):
+                inside.add(key)
+                if len(inside) == 2:
+                    both_inside.set()
+                # Would time out if the second key waited for the first
+                await asyncio.wait_for(both_inside.wait(), 1.0)
+        
+        await asyncio.gather(job(('BTCUSD', '15m')), job(('XAUUSD', '15m')))
+        return stage
+    
+    stage = asyncio.run(scenario())
+    
+    assert stage._tails == {}
+
+
+def test_block_cancelled_while_queued_never_runs():
+    async def scenario():
+        stage = ComputeStage('inline')
+        key = ('BTCUSD', '15m')
+        release = asyncio.Event()
+        ran = []
+        
+        async def job(name, keys, wait=None):
+            async with stage.ordered(keys):
+                ran.append(name)
+                if wait is not None:
+                    await wait.wait()
+        
+        first = asyncio.create_task(job('first', [key], release))
+        await asyncio.sleep(0)
+        # Queued behind the first one; also holds a second key
+        cancelled = asyncio.create_task(job('cancelled', [key, ('BTCUSD', '1h')]))
+        await asyncio.sleep(0)
+        last = asyncio.create_task(job('last', [key]))
+        await asyncio.sleep(0)
+        
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        await asyncio.sleep(0.01)
+        # The cancellation doesn't let later blocks jump the queue
+        assert ran == ['first']
+        
+        release.set()
+        await asyncio.gather(first, last)
+        # Let the cancelled block's release callback run
+        await asyncio.sleep(0)
+        return ran, stage
+    
+    ran, stage = asyncio.run(scenario())
+    
+    assert ran == ['first', 'last']
+    assert stage._tails == {}
+
+
+@pytest.mark.parametrize('executor', ['inline', 'thread'])
+def test_run_returns_results(executor):
+    async def scenario():
+        stage = ComputeStage(executor, 2)
+        try:
+            return await asyncio.gather(*(stage.run(pow, 2, n) for n in range(8)))
+        finally:
+            stage.shutdown()
+    
+    assert asyncio.run(scenario()) == [2 ** n for n in range(8)]
+
+
+def test_unknown_executor_is_rejected():
+    with pytest.raises(ValueError):
+        ComputeStage('gpu')
+
+
+def test_pool_tasks_are_profiled_while_a_cycle_records(tmp_path):
+    async def scenario():
+        profiler = ScanProfiler(output_dir=str(tmp_path), slow_callback=0)
+        stage = ComputeStage('thread', 1, profiler=profiler)
+        try:
+            profiler.arm(1)
+            await stage.run(sorted, [3, 1, 2])
+            profiler.begin()
+            await stage.run(sorted, [3, 1, 2])
+            recorded = len(profiler.task_stats)
+            await profiler.end()
+        finally:
+            stage.shutdown()
+        return recorded
+    
+    # Only the task run inside the cycle
+    assert asyncio.run(scenario()) == 1
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+KlineCache: when a delta fetch is safe and how fetched candles merge
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from candles import KLINE_DTYPE
+from exchange_client import KlineCache, INTERVAL_MS
+
+INTERVAL = '15m'
+MS = INTERVAL_MS[INTERVAL]
+LIMIT = 100
+
+
+def klines(start: int, count: int, close: float = 100.0) -> np.ndarray:
+    array = np.zeros(count, dtype=KLINE_DTYPE)
+    array['timestamp'] = start + np.arange(count) * MS
+    array['close'] = close + np.arange(count)
+    return array
+
+
+def cache_behind(candles_behind: int) -> KlineCache:
+    """LIMIT cached candles whose last closed one opened `candles_behind` intervals before the current candle"""
+    forming = int(time.time() * 1000) // MS * MS
+    last_closed = forming - candles_behind * MS
+    cache = KlineCache()
+    cache.reset('BTCUSDT', INTERVAL, klines(last_closed - (LIMIT - 2) * MS, LIMIT))
+    return cache
+
+
+def test_delta_fetch_when_the_forming_candle_is_within_reach():
+    cache = cache_behind(3)
+    
+    start = cache.delta_start('BTCUSDT', INTERVAL, LIMIT)
+    
+    assert start == cache.last_closed_timestamp('BTCUSDT', INTERVAL) + 1
+
+
+@pytest.mark.parametrize('candles_behind, delta', [
+    (LIMIT - 3, True),
+    (LIMIT - 2, True),
+    # `limit` candles from the last closed one might not reach the forming one
+    (LIMIT - 1, False),
+    (LIMIT, False),
+    (LIMIT + 5, False),
+])
+def test_full_fetch_when_a_delta_could_miss_the_forming_candle(candles_behind, delta):
+    cache = cache_behind(candles_behind)
+    missed = (time.time() * 1000 - cache.last_closed_timestamp('BTCUSDT', INTERVAL)) / MS
+    
+    start = cache.delta_start('BTCUSDT', INTERVAL, LIMIT)
+    
+    assert (start is not None) == (missed < LIMIT - 1) == delta
+
+
+def test_full_fetch_without_enough_history():
+    cache = KlineCache()
+    assert cache.delta_start('BTCUSDT', INTERVAL, LIMIT) is None
+    
+    forming = int(time.time() * 1000) // MS * MS
+    cache.reset('BTCUSDT', INTERVAL, klines(forming - 9 * MS, 10))
+    assert cache.delta_start('BTCUSDT', INTERVAL, LIMIT) is None
+
+
+def test_merge_overlapping_delta_replaces_forming_and_appends():
+    cache = KlineCache(max_size=12)
+    cache.reset('BTCUSDT', INTERVAL, klines(0, 10))
+    
+    # Re-sent closed candle 8 (ignored), candle 9 now closed, 10 and the forming 11
+    cache.merge('BTCUSDT', INTERVAL, klines(8 * MS, 4, close=500.0))
+    
+    series = cache.get('BTCUSDT', INTERVAL)
+    assert series.timestamp.tolist() == [i * MS for i in range(12)]
+    assert series.close.tolist() == [100.0 + i for i in range(9)] + [501.0, 502.0, 503.0]
+    assert cache.last_closed_timestamp('BTCUSDT', INTERVAL) == 10 * MS
+    
+    # Only the forming candle changed
+    cache.merge('BTCUSDT', INTERVAL, klines(11 * MS, 1, close=600.0))
+    assert len(series) == 12
+    assert series.close[-1] == 600.0
+    
+    # Past max_size the oldest candles go
+    cache.merge('BTCUSDT', INTERVAL, klines(11 * MS, 3, close=700.0))
+    assert series.timestamp.tolist() == [i * MS for i in range(2, 14)]
+    assert cache.tail('BTCUSDT', INTERVAL, 3).close.tolist() == [700.0, 701.0, 702.0]
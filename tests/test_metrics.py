@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Metrics: the Prometheus text exposition format and the /metrics and
+/healthz endpoints
+"""
+
+import asyncio
+
+import aiohttp
+import pytest
+
+from metrics import MetricsRegistry, MetricsServer
+
+
+def test_counters_and_gauges_render_with_labels():
+    registry = MetricsRegistry()
+    requests = registry.counter('http_requests_total', 'Requests by status', ('provider', 'status'))
+    scans = registry.counter('scans_total', 'Scans')
+    pairs = registry.gauge('watched_pairs', 'Watched pairs')
+    
+    requests.inc(provider='binance', status=200)
+    requests.inc(2, provider='binance', status=200)
+    requests.inc(provider='twelve "data"\n', status=429)
+    pairs.set(12.5)
+    
+    assert requests.value(provider='binance', status=200) == 3
+    assert registry.render() == (
+        '# HELP http_requests_total Requests by status\n'
+        '# TYPE http_requests_total counter\n'
+        'http_requests_total{provider="binance",status="200"} 3\n'
+        'http_requests_total{provider="twelve \\"data\\"\\n",status="429"} 1\n'
+        # Unlabelled metrics are there before the first update
+        '# HELP scans_total Scans\n'
+        '# TYPE scans_total counter\n'
+        'scans_total 0\n'
+        '# HELP watched_pairs Watched pairs\n'
+        '# TYPE watched_pairs gauge\n'
+        'watched_pairs 12.5\n'
+    )
+    with pytest.raises(ValueError):
+        requests.inc(provider='binance')
+    with pytest.raises(ValueError):
+        registry.gauge('watched_pairs', 'Again')
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram('latency_seconds', 'Latency', ('endpoint',), buckets=(0.5, 0.1))
+    
+    for value in (0.05, 0.1, 0.3, 2.0):
+        latency.observe(value, endpoint='klines')
+    
+    assert latency.count(endpoint='klines') == 4
+    assert latency.count(endpoint='ticker') == 0
+    assert latency.render().split('\n') == [
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        # Bounds are inclusive
+        'latency_seconds_bucket{endpoint="klines",le="0.1"} 2',
+        'latency_seconds_bucket{endpoint="klines",le="0.5"} 3',
+        'latency_seconds_bucket{endpoint="klines",le="+Inf"} 4',
+        'latency_seconds_sum{endpoint="klines"} 2.45',
+        'latency_seconds_count{endpoint="klines"} 4',
+    ]
+
+
+def test_server_answers_metrics_and_health():
+    registry = MetricsRegistry()
+    scrapes = registry.counter('scrapes_total', 'Scrapes')
+    healthy = [True]
+    
+    async def scenario():
+        server = MetricsServer(0, collect=scrapes.inc, health=lambda: (healthy[0], {'stale_pairs': 0}),
+                               registry=registry)
+        await server.start()
+        port = server.runner.addresses[0][1]
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f'http://127.0.0.1:{port}/metrics') as response:
+                    metrics = (response.status, response.content_type, await response.text())
+                async with session.get(f'http://127.0.0.1:{port}/healthz') as response:
+                    ok = (response.status, await response.json())
+                healthy[0] = False
+                async with session.get(f'http://127.0.0.1:{port}/healthz') as response:
+                    failing = (response.status, await response.json())
+        finally:
+            await server.stop()
+        return metrics, ok, failing
+    
+    metrics, ok, failing = asyncio.run(scenario())
+    
+    # collect() runs before each render
+    assert metrics == (200, 'text/plain', '# HELP scrapes_total Scrapes\n# TYPE scrapes_total counter\nscrapes_total 1\n')
+    assert ok == (200, {'status': 'ok', 'stale_pairs': 0})
+    assert failing == (503, {'status': 'unhealthy', 'stale_pairs': 0})
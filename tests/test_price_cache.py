@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+PriceCache: one request for concurrent lookups, TTL expiry and the kline
+cache fallback
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from candles import KLINE_DTYPE
+from exchange_client import KlineCache, PriceCache
+
+
+class Fetcher:
+    """fetch() that counts calls and answers after a short delay"""
+    
+    def __init__(self, price: float = 100.0):
+        self.price = price
+        self.calls = 0
+    
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        return {'price': self.price}
+
+
+def test_concurrent_lookups_share_one_request():
+    async def scenario():
+        cache = PriceCache(ttl=60)
+        fetch = Fetcher()
+        results = await asyncio.gather(*(cache.get('BTCUSDT', fetch) for _ in range(5)))
+        # Served from the cache afterwards
+        results.append(await cache.get('BTCUSDT', fetch))
+        return cache, fetch, results
+    
+    cache, fetch, results = asyncio.run(scenario())
+    
+    assert fetch.calls == 1
+    assert results == [{'price': 100.0}] * 6
+    assert (cache.fetches, cache.coalesced, cache.hits) == (1, 4, 1)
+
+
+def test_prices_expire_after_ttl():
+    async def scenario():
+        cache = PriceCache(ttl=0.05)
+        fetch = Fetcher()
+        first = await cache.get('BTCUSDT', fetch)
+        fetch.price = 101.0
+        cached = await cache.get('BTCUSDT', fetch)
+        await asyncio.sleep(0.06)
+        expired = await cache.get('BTCUSDT', fetch)
+        return fetch, [first, cached, expired]
+    
+    fetch, results = asyncio.run(scenario())
+    
+    assert [result['price'] for result in results] == [100.0, 100.0, 101.0]
+    assert fetch.calls == 2
+
+
+def test_failed_fetches_are_not_cached():
+    async def scenario():
+        cache = PriceCache(ttl=60)
+        fetch = Fetcher(price=0.0)
+        await cache.get('BTCUSDT', fetch)
+        await cache.get('BTCUSDT', fetch)
+        
+        async def broken():
+            raise RuntimeError("exchange down")
+        
+        with pytest.raises(RuntimeError):
+            await cache.get('ETHUSDT', broken)
+        return cache, fetch
+    
+    cache, fetch = asyncio.run(scenario())
+    
+    assert fetch.calls == 2
+    assert cache.get_cached('BTCUSDT') is None
+    assert cache._inflight == {}
+
+
+def test_recent_kline_close_stands_in_for_a_fetch():
+    klines = KlineCache()
+    candles = np.zeros(2, dtype=KLINE_DTYPE)
+    candles['timestamp'] = [0, 60_000]
+    candles['close'] = [99.0, 99.5]
+    klines.reset('BTCUSDT', '1m', candles)
+    
+    async def scenario():
+        cache = PriceCache(ttl=60, kline_cache=klines, kline_max_age=30)
+        fetch = Fetcher()
+        return cache, fetch, await cache.get('BTCUSDT', fetch)
+    
+    cache, fetch, result = asyncio.run(scenario())
+    
+    assert result == {'price': 99.5}
+    assert fetch.calls == 0
+    assert cache.kline_hits == 1
+    # Not when the kline fallback is disabled
+    assert PriceCache(ttl=60, kline_cache=klines, kline_max_age=0).get_cached('BTCUSDT') is None
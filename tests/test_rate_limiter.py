@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+RequestScheduler: priorities, backoff, header sync, the daily planner and
+daily usage carried across restarts
+"""
+
+import asyncio
+from datetime import date, datetime, timezone
+
+import pytest
+
+import bot as bot_module
+from rate_limiter import RequestScheduler, PRIORITY_SCAN, PRIORITY_STATUS, SECONDS_PER_DAY
+
+
+def seconds_into_day() -> float:
+    now = datetime.now(timezone.utc)
+    return now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+
+
+def test_higher_priority_waiter_is_served_first():
+    async def scenario():
+        # 10 tokens per second, none left
+        scheduler = RequestScheduler('test', 600)
+        scheduler.bucket.tokens = 0
+        served = []
+        
+        async def request(name, priority):
+            await scheduler.acquire(1, priority)
+            served.append(name)
+        
+        status = asyncio.create_task(request('status', PRIORITY_STATUS))
+        await asyncio.sleep(0)
+        scan = asyncio.create_task(request('scan', PRIORITY_SCAN))
+        await asyncio.gather(status, scan)
+        return served, scheduler
+    
+    served, scheduler = asyncio.run(scenario())
+    
+    assert served == ['scan', 'status']
+    assert scheduler.get_stats()['waiting'] == 0
+
+
+def test_rate_limit_responses_block_the_scheduler():
+    scheduler = RequestScheduler('test', 1200)
+    
+    scheduler.observe(429, {'Retry-After': '5'})
+    assert scheduler.delay() == pytest.approx(5, abs=0.1)
+    
+    # Without Retry-After the backoff doubles per rate-limited response
+    scheduler = RequestScheduler('test', 1200)
+    scheduler.observe(418, {})
+    assert scheduler.backoff == 1.0
+    scheduler.observe(429, {})
+    assert scheduler.backoff == 2.0
+    assert scheduler.delay() == pytest.approx(2, abs=0.1)
+    
+    scheduler.observe(200, {})
+    assert scheduler.backoff == 0.0
+
+
+def test_used_weight_header_drains_the_bucket_by_share():
+    scheduler = RequestScheduler('test', 1200, weight_header='X-MBX-USED-WEIGHT-1M', share=0.5)
+    
+    scheduler.observe(200, {'X-MBX-USED-WEIGHT-1M': '1000'})
+    
+    # 200 of the shared 1200 left, half of it this process's
+    assert scheduler.bucket.tokens == pytest.approx(100, abs=1)
+    assert scheduler.delay(50) == 0
+    # Never raised by the header
+    scheduler.observe(200, {'X-MBX-USED-WEIGHT-1M': '0'})
+    assert scheduler.bucket.tokens == pytest.approx(100, abs=1)
+
+
+def test_no_credits_left_blocks_until_the_next_minute():
+    scheduler = RequestScheduler('test', 8, remaining_header='api-credits-left')
+    
+    scheduler.observe(200, {'api-credits-left': '0'})
+    
+    assert scheduler.bucket.tokens <= 0
+    assert 0 < scheduler.get_stats()['blocked_for'] <= 60
+
+
+def test_daily_planner_spreads_credits_over_the_day():
+    scheduler = RequestScheduler('test', 8, daily_limit=800)
+    
+    # A minute's worth of burst is always allowed
+    assert scheduler._daily_delay(8) == 0
+    
+    scheduler._roll_day()
+    scheduler.daily_used = 400
+    allowed_at = (400 + 1 - 8) / 800 * SECONDS_PER_DAY
+    assert scheduler._daily_delay(1) == pytest.approx(max(allowed_at - seconds_into_day(), 0), abs=1)
+    
+    # Quota spent: nothing until the next UTC day
+    scheduler.daily_used = 800
+    assert scheduler._daily_delay(1) == pytest.approx(SECONDS_PER_DAY - seconds_into_day(), abs=1)
+
+
+def test_requests_over_the_budget_are_rejected():
+    async def scenario():
+        with pytest.raises(ValueError):
+            await RequestScheduler('test', 8).acquire(9)
+        with pytest.raises(ValueError):
+            await RequestScheduler('test', 8, daily_limit=5).acquire(6)
+        scheduler = RequestScheduler('test', 8)
+        await scheduler.acquire(8)
+        return scheduler
+    
+    scheduler = asyncio.run(scenario())
+    
+    assert scheduler.daily_used == 8
+    assert scheduler.get_stats()['waiting'] == 0
+
+
+def test_share_keeps_the_largest_request_affordable():
+    scheduler = RequestScheduler('test', 1200, daily_limit=None, share=0.001, min_per_minute=20)
+    
+    assert scheduler.per_minute == 20
+    assert scheduler.max_cost == 20
+
+
+def test_daily_usage_carries_over_within_the_day():
+    saved = RequestScheduler('test', 8, daily_limit=800)
+    saved._roll_day()
+    saved.daily_used = 300
+    
+    restarted = RequestScheduler('test', 8, daily_limit=800)
+    restarted.restore_usage(saved.get_usage())
+    assert restarted.daily_used == 300
+    
+    # Yesterday's usage doesn't count against today's quota
+    next_day = RequestScheduler('test', 8, daily_limit=800)
+    next_day.restore_usage({'day': date(2000, 1, 1).isoformat(), 'used': 300})
+    assert next_day.daily_used == 0
+
+
+def test_snapshot_restores_daily_usage(tmp_path):
+    saved = bot_module.TradingBot()
+    saved.snapshot_path = str(tmp_path / 'snapshot')
+    saved.twelve_data_client.scheduler._roll_day()
+    saved.twelve_data_client.scheduler.daily_used = 120
+    saved.save_snapshot()
+    
+    restarted = bot_module.TradingBot()
+    restarted.snapshot_path = saved.snapshot_path
+    restarted.restore_state()
+    
+    assert restarted.twelve_data_client.scheduler.daily_used == 120
+    assert restarted.binance_client.scheduler.daily_used == 0
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Full-series RSI/EMA/WMA against straightforward reference implementations
+and the per-value RSIFollowTrend.calculate_* methods
+"""
+
+import numpy as np
+import pytest
+
+from rsi_indicator import (
+    RSIFollowTrend, RSI_MODE_WILDER, RSI_MODE_SMA, rsi_series, ema_series, wma_series, window_values
+)
+
+
+def random_walk(n: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 1000.0 + np.cumsum(rng.normal(0, 5, n))
+
+
+def wilder_rsi_reference(prices, period: int) -> list:
+    """Pine ta.rsi: RMA of gains and losses seeded with their simple mean"""
+    rsi = [50.0] * len(prices)
+    if len(prices) < period + 1:
+        return rsi
+    deltas = [b - a for a, b in zip(prices, prices[1:])]
+    avg_gain = sum(max(d, 0.0) for d in deltas[:period]) / period
+    avg_loss = sum(max(-d, 0.0) for d in deltas[:period]) / period
+    for i in range(period, len(prices)):
+        if i > period:
+            delta = deltas[i - 1]
+            avg_gain = (avg_gain * (period - 1) + max(delta, 0.0)) / period
+            avg_loss = (avg_loss * (period - 1) + max(-delta, 0.0)) / period
+        rsi[i] = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return rsi
+
+
+@pytest.mark.parametrize('period', [2, 14, 30])
+def test_wilder_rsi_matches_pine_reference(period):
+    prices = random_walk(600)
+    
+    np.testing.assert_allclose(rsi_series(prices, period), wilder_rsi_reference(prices.tolist(), period),
+                               rtol=0, atol=1e-9)
+
+
+def test_wilder_is_the_default_mode():
+    prices = random_walk(300)
+    
+    assert RSIFollowTrend().rsi_mode == RSI_MODE_WILDER
+    np.testing.assert_array_equal(rsi_series(prices, 14), rsi_series(prices, 14, RSI_MODE_WILDER))
+    assert not np.allclose(rsi_series(prices, 14), rsi_series(prices, 14, RSI_MODE_SMA))
+
+
+def test_rsi_edge_cases():
+    # Not enough data: neutral 50
+    np.testing.assert_array_equal(rsi_series(np.arange(10.0), 14), np.full(10, 50.0))
+    # Only gains: 100
+    assert rsi_series(np.arange(40.0), 14)[-1] == 100.0
+    assert rsi_series(np.arange(40.0), 14, RSI_MODE_SMA)[-1] == 100.0
+    with pytest.raises(ValueError):
+        rsi_series(np.arange(40.0), 14, 'ema')
+
+
+def test_sma_rsi_matches_calculate_rsi():
+    prices = random_walk(200)
+    indicator = RSIFollowTrend()
+    series = rsi_series(prices, 14, RSI_MODE_SMA)
+    
+    for i in range(15, len(prices) + 1):
+        assert series[i - 1] == pytest.approx(indicator.calculate_rsi(prices[:i], 14), abs=1e-9)
+
+
+@pytest.mark.parametrize('period', [1, 9, 45])
+def test_ema_and_wma_series_match_per_value_calculations(period):
+    values = random_walk(150, seed=3)
+    indicator = RSIFollowTrend()
+    ema = ema_series(values, period)
+    wma = wma_series(values, period)
+    
+    for i in range(1, len(values) + 1):
+        assert ema[i - 1] == pytest.approx(indicator.calculate_ema(values[:i], period), rel=1e-12)
+        assert wma[i - 1] == pytest.approx(indicator.calculate_wma(values[:i], period), rel=1e-12)
+
+
+def test_window_values_need_enough_bars():
+    prices = random_walk(100)
+    
+    assert window_values(prices[:54], 14, 9, 45) is None
+    rsi, ema9, wma45 = window_values(prices, 14, 9, 45)
+    rsi_array = rsi_series(prices, 14)[14:]
+    assert (rsi, ema9, wma45) == (rsi_array[-1], ema_series(rsi_array, 9)[-1], wma_series(rsi_array, 45)[-1])
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Scan cycles against local Binance and Twelve Data servers: indicators
+updated from delta fetches (concurrent, through the compute stage) end up
+where a fresh windowed update over the full window would
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import bot as bot_module
+from compute import ComputeStage
+from config import KLINE_LIMIT, TIMEFRAMES
+from rsi_indicator import RSIFollowTrend
+
+INTERVAL_MS = {'15m': 15 * 60_000, '15min': 15 * 60_000, '1h': 60 * 60_000}
+# Candles on the servers at the first scan; each later scan sees one more
+HISTORY = 130
+SCANS = 3
+# The forming candle's close until it closes
+FORMING_OFFSET = 7.0
+
+
+class FakeExchange:
+    """
+    /klines (Binance) and /time_series (Twelve Data) over one timeline per
+    interval, ending with the candle forming now so delta fetches apply
+    """
+    
+    def __init__(self):
+        self.visible = HISTORY
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        now = int(time.time() * 1000)
+        total = HISTORY + SCANS - 1
+        self.start = {interval: now // ms * ms - (total - 1) * ms for interval, ms in INTERVAL_MS.items()}
+        self.closes = {}
+    
+    def close(self, ticker: str, interval: str, index: int) -> float:
+        key = (ticker, INTERVAL_MS[interval])
+        if key not in self.closes:
+            rng = np.random.default_rng(len(self.closes) + 1)
+            self.closes[key] = (1000.0 + np.cumsum(rng.normal(0, 5, HISTORY + SCANS))).tolist()
+        forming = FORMING_OFFSET if index == self.visible - 1 else 0.0
+        return self.closes[key][index] + forming
+    
+    def candles(self, ticker: str, interval: str) -> list:
+        """(open time, close) of the candles currently served, the last one forming"""
+        ms = INTERVAL_MS[interval]
+        return [(self.start[interval] + i * ms, self.close(ticker, interval, i)) for i in range(self.visible)]
+    
+    def window(self, ticker: str, interval: str) -> list:
+        """The last KLINE_LIMIT candles as kline dictionaries"""
+        return [{'timestamp': timestamp, 'close': close}
+                for timestamp, close in self.candles(ticker, interval)[-KLINE_LIMIT:]]
+    
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/klines', self.klines)
+        app.router.add_get('/time_series', self.time_series)
+        return app
+    
+    async def _served(self):
+        # Keep the request open for a moment so concurrent ones overlap
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            self.in_flight -= 1
+    
+    async def klines(self, request: web.Request) -> web.Response:
+        query = request.query
+        self.requests.append(('binance', query['symbol'], query['interval'], 'startTime' in query))
+        await self._served()
+        
+        candles = self.candles(query['symbol'], query['interval'])
+        limit = int(query.get('limit', 500))
+        if 'startTime' in query:
+            candles = [candle for candle in candles if candle[0] >= int(query['startTime'])][:limit]
+        else:
+            candles = candles[-limit:]
+        ms = INTERVAL_MS[query['interval']]
+        return web.json_response([
+            [timestamp, str(close), str(close), str(close), str(close), '1', timestamp + ms - 1, '0', 1, '0', '0', '0']
+            for timestamp, close in candles
+        ])
+    
+    async def time_series(self, request: web.Request) -> web.Response:
+        query = request.query
+        symbols = query['symbol'].split(',')
+        self.requests.append(('twelvedata', query['symbol'], query['interval'], 'start_date' in query))
+        await self._served()
+        
+        entries = {}
+        for symbol in symbols:
+            candles = self.candles(symbol, query['interval'])
+            if 'start_date' in query:
+                start = datetime.strptime(query['start_date'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+                candles = [candle for candle in candles if candle[0] >= start.timestamp() * 1000]
+            candles = candles[-int(query['outputsize']):]
+            entries[symbol] = {'status': 'ok', 'values': [
+                {'datetime': datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                 'open': str(close), 'high': str(close), 'low': str(close), 'close': str(close), 'volume': '1'}
+                for timestamp, close in reversed(candles)
+            ]}
+        # A single symbol comes back unwrapped
+        return web.json_response(entries[symbols[0]] if len(symbols) == 1 else entries)
+
+
+def approx_state(state):
+    """get_state() with floats compared to 1e-9 (the batch engine's matrix pass may differ in the last bits)"""
+    if isinstance(state, dict):
+        return {name: approx_state(value) for name, value in state.items()}
+    if isinstance(state, list):
+        return [approx_state(value) for value in state]
+    if isinstance(state, float):
+        return pytest.approx(state, abs=1e-9)
+    return state
+
+
+@pytest.mark.parametrize('executor', ['inline', 'thread'])
+@pytest.mark.parametrize('streaming', [False, True])
+def test_delta_fetched_scans_match_windowed_updates(monkeypatch, executor, streaming):
+    monkeypatch.setattr(bot_module, 'INDICATOR_STREAMING', streaming)
+    
+    async def scenario():
+        fake = FakeExchange()
+        server = TestServer(fake.app())
+        await server.start_server()
+        
+        bot = bot_module.TradingBot()
+        bot.compute = ComputeStage(executor, 2, profiler=bot.profiler)
+        base_url = str(server.make_url('')).rstrip('/')
+        bot.binance_client.BASE_URL = base_url
+        bot.twelve_data_client.BASE_URL = base_url
+        
+        alerts = []
+        
+        async def check_new_signals(symbol, timeframe, price, context, signals=None, timestamp=None):
+            alerts.append((symbol, timeframe, timestamp))
+        
+        monkeypatch.setattr(bot, 'check_new_signals', check_new_signals)
+        
+        pairs = [(instrument, timeframe) for instrument in bot.registry.instruments() for timeframe in TIMEFRAMES]
+        references = {
+            (instrument.symbol, timeframe): RSIFollowTrend(streaming=streaming) for instrument, timeframe in pairs
+        }
+        mismatches = []
+        try:
+            for scan in range(SCANS):
+                fake.visible = HISTORY + scan
+                # Overlapping scans: the second one waits for the first
+                await asyncio.gather(bot.check_signals(None), bot.check_signals(None, TIMEFRAMES))
+                
+                for instrument, timeframe in pairs:
+                    reference = references[(instrument.symbol, timeframe)]
+                    window = fake.window(instrument.ticker, timeframe)
+                    # The same window twice, like the two scans
+                    reference.update(window)
+                    reference.update(window)
+                    state = bot.registry.indicator(instrument.symbol, timeframe).get_state()
+                    if state != approx_state(reference.get_state()):
+                        mismatches.append((scan, instrument.symbol, timeframe))
+        finally:
+            bot.compute.shutdown()
+            await bot.http.close()
+            await server.close()
+        
+        return fake, mismatches, alerts, len(pairs)
+    
+    fake, mismatches, alerts, pairs = asyncio.run(scenario())
+    
+    assert mismatches == []
+    if streaming:
+        # Signals are checked once per newly closed candle (the first scan seeds)
+        assert len(alerts) == len(set(alerts)) == pairs * (SCANS - 1)
+    else:
+        # Every update of both scans
+        assert len(alerts) == pairs * SCANS * 2
+    # The first scan fetches full windows, the later ones only newer candles
+    binance = [delta for provider, *_, delta in fake.requests if provider == 'binance']
+    twelve_data = [delta for provider, *_, delta in fake.requests if provider == 'twelvedata']
+    assert binance and twelve_data
+    assert not any(binance[:len(TIMEFRAMES)]) and all(binance[len(TIMEFRAMES):])
+    assert not any(twelve_data[:len(TIMEFRAMES)]) and all(twelve_data[len(TIMEFRAMES):])
+    # Each scan's fetches run concurrently
+    assert fake.max_in_flight > 1
+
+
+class SlowTwelveData(FakeExchange):
+    """/time_series answers only once every Binance pair has asked for /klines (or after a timeout)"""
+    
+    def __init__(self, binance_pairs: int):
+        super().__init__()
+        self.binance_pairs = binance_pairs
+        self.binance_requested = asyncio.Event()
+        self.twelve_data_waited = []
+    
+    async def klines(self, request: web.Request) -> web.Response:
+        self.binance_pairs -= 1
+        if self.binance_pairs <= 0:
+            self.binance_requested.set()
+        return await super().klines(request)
+    
+    async def time_series(self, request: web.Request) -> web.Response:
+        try:
+            await asyncio.wait_for(self.binance_requested.wait(), 2.0)
+            self.twelve_data_waited.append(False)
+        except asyncio.TimeoutError:
+            self.twelve_data_waited.append(True)
+        return await super().time_series(request)
+
+
+def test_slow_twelve_data_does_not_hold_up_binance(monkeypatch):
+    async def scenario():
+        bot = bot_module.TradingBot()
+        binance_pairs = len(bot.registry.by_provider().get(bot_module.PROVIDER_BINANCE, [])) * len(TIMEFRAMES)
+        fake = SlowTwelveData(binance_pairs)
+        server = TestServer(fake.app())
+        await server.start_server()
+        
+        base_url = str(server.make_url('')).rstrip('/')
+        bot.binance_client.BASE_URL = base_url
+        bot.twelve_data_client.BASE_URL = base_url
+        
+        async def check_new_signals(*args, **kwargs):
+            pass
+        
+        monkeypatch.setattr(bot, 'check_new_signals', check_new_signals)
+        try:
+            await bot.check_signals(None)
+        finally:
+            bot.compute.shutdown()
+            await bot.http.close()
+            await server.close()
+        
+        return fake, binance_pairs
+    
+    fake, binance_pairs = asyncio.run(scenario())
+    
+    assert binance_pairs
+    assert sum(provider == 'binance' for provider, *_ in fake.requests) == binance_pairs
+    # Every Twelve Data batch was still in flight when the Binance requests arrived
+    assert fake.twelve_data_waited == [False] * len(TIMEFRAMES)
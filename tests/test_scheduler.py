@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+CandleCloseScheduler: which timeframes close when, catching up on closes
+missed during a slow scan, and retries of unpublished candles
+"""
+
+import asyncio
+
+import pytest
+
+import scheduler as scheduler_module
+from scheduler import CandleCloseScheduler, next_boundary
+
+MINUTE = 60_000
+HOUR = 60 * MINUTE
+
+
+async def no_scan(timeframes, closed_at, only):
+    return []
+
+
+def test_next_run_groups_timeframes_closing_together():
+    scheduler = CandleCloseScheduler(['15m', '1h'], no_scan)
+    
+    assert next_boundary(10 * HOUR + 1, 15 * MINUTE) == 10 * HOUR + 15 * MINUTE
+    assert scheduler.next_run(10 * HOUR + 20 * MINUTE) == (10 * HOUR + 30 * MINUTE, ['15m'])
+    assert scheduler.next_run(10 * HOUR + 50 * MINUTE) == (11 * HOUR, ['15m', '1h'])
+    with pytest.raises(ValueError):
+        CandleCloseScheduler(['7m'], no_scan)
+
+
+def test_closed_since_reports_the_latest_close_per_timeframe():
+    scheduler = CandleCloseScheduler(['15m', '1h'], no_scan)
+    
+    assert scheduler.closed_since(10 * HOUR + 59 * MINUTE, 11 * HOUR + 19 * MINUTE) == [
+        (11 * HOUR, ['1h']), (11 * HOUR + 15 * MINUTE, ['15m']),
+    ]
+    assert scheduler.closed_since(11 * HOUR, 11 * HOUR + 14 * MINUTE) == []
+
+
+class FakeClock:
+    """Stands in for the scheduler module's `time`"""
+    
+    def __init__(self, now_ms: int):
+        self.now_ms = now_ms
+    
+    def time(self) -> float:
+        return self.now_ms / 1000
+
+
+def test_closes_during_a_slow_scan_are_caught_up(monkeypatch):
+    clock = FakeClock(10 * HOUR + 59 * MINUTE)
+    monkeypatch.setattr(scheduler_module, 'time', clock)
+    calls = []
+    
+    async def scan(timeframes, closed_at, only):
+        calls.append((timeframes, closed_at))
+        if len(calls) == 1:
+            # The initial scan runs past the 11:00 and 11:15 closes
+            clock.now_ms += 20 * MINUTE
+        return []
+    
+    async def scenario():
+        scheduler = CandleCloseScheduler(['15m', '1h'], scan, delay=0, jitter=0, retries=1)
+        scheduler.start()
+        while len(calls) < 3:
+            await asyncio.sleep(0.01)
+        # Then it waits for the 11:30 close
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+    
+    asyncio.run(asyncio.wait_for(scenario(), 5))
+    
+    assert calls == [
+        (['15m', '1h'], None),
+        # Each missed boundary, oldest first
+        (['1h'], 11 * HOUR),
+        (['15m'], 11 * HOUR + 15 * MINUTE),
+    ]
+
+
+def test_unpublished_pairs_are_retried_then_processed_as_is():
+    calls = []
+    pending = [('XAUUSD', '15m')]
+    
+    async def scan(timeframes, closed_at, only):
+        calls.append((closed_at, only))
+        return pending
+    
+    scheduler = CandleCloseScheduler(['15m'], scan, retries=3, retry_delay=0.01)
+    asyncio.run(scheduler.run_boundary(['15m'], 11 * HOUR))
+    
+    assert calls == [
+        (11 * HOUR, None),
+        (11 * HOUR, pending),
+        (11 * HOUR, pending),
+        # Out of retries
+        (None, pending),
+    ]
+    
+    # Published on the first retry: no more scans
+    calls.clear()
+    results = [pending, []]
+    
+    async def published(timeframes, closed_at, only):
+        calls.append((closed_at, only))
+        return results.pop(0)
+    
+    asyncio.run(CandleCloseScheduler(['15m'], published, retries=3, retry_delay=0.01).run_boundary(['15m'], 11 * HOUR))
+    assert calls == [(11 * HOUR, None), (11 * HOUR, pending)]
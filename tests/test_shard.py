@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Sharding: stable ownership of pairs, relaying worker events and commands,
+and the bot-process view of worker-owned indicators
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+
+import shard
+from rsi_indicator import RSIFollowTrend
+from shard import IndicatorView, ShardSupervisor, shard_of
+
+SYMBOLS = [f"SYM{i}USDT" for i in range(200)]
+
+
+def test_shard_of_is_stable_and_spreads_pairs():
+    # crc32, not hash(): the same in every process regardless of PYTHONHASHSEED
+    assert shard_of('BTCUSDT', '1h', 4) == 3
+    assert shard_of('XAUUSD', '15m', 4) == 0
+    code = "from shard import shard_of; print(shard_of('BTCUSDT', '1h', 4))"
+    for seed in ('1', '2'):
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                env={**os.environ, 'PYTHONHASHSEED': seed},
+                                cwd=os.path.dirname(os.path.abspath(shard.__file__)))
+        assert result.stdout.strip() == '3'
+    
+    counts = [0] * 4
+    for symbol in SYMBOLS:
+        counts[shard_of(symbol, '1h', 4)] += 1
+    assert all(count > 25 for count in counts), counts
+    assert {shard_of(symbol, '1h', 1) for symbol in SYMBOLS} == {0}
+
+
+class FakeQueue:
+    def __init__(self):
+        self.items = []
+    
+    def put(self, item):
+        self.items.append(item)
+
+
+def test_events_are_relayed_in_order_until_the_sentinel():
+    handled = []
+    
+    async def on_event(event):
+        if event[0] == 'broken':
+            raise RuntimeError("handler failed")
+        handled.append(event)
+    
+    async def scenario():
+        supervisor = ShardSupervisor(2, on_event, watchlist=list)
+        events = [
+            ('state', 'BTCUSDT', '1h', 3_600_000, {'rsi': 55.0}, {}),
+            ('broken',),
+            ('signal', 'BTCUSDT', '1h', 'buy_1', 65000.0),
+            ('scan', 0, 0.5, 0),
+        ]
+        for event in events:
+            supervisor.events.put(event)
+        supervisor.events.put(None)
+        # A failing handler doesn't stop the reader
+        await asyncio.wait_for(supervisor._read(), 5)
+        
+        # Commands go to every running worker
+        supervisor.commands = [FakeQueue(), None]
+        supervisor.send(('unwatch', 'BTCUSDT'))
+        return events, supervisor.commands[0].items
+    
+    events, commands = asyncio.run(scenario())
+    
+    assert handled == [events[0], events[2], events[3]]
+    assert commands == [('unwatch', 'BTCUSDT')]
+
+
+def test_indicator_view_applies_state_events():
+    indicator = RSIFollowTrend(overbought=70, oversold=30)
+    view = IndicatorView(indicator)
+    
+    assert (view.overbought, view.oversold) == (70, 30)
+    assert view.get_status() == indicator.get_status()
+    
+    view.apply({'rsi': 72.5}, {'total_buy_1': 1})
+    status = view.get_status()
+    status['price'] = 100.0
+    
+    # Callers get copies
+    assert view.get_status() == {'rsi': 72.5}
+    assert view.get_statistics() == {'total_buy_1': 1}
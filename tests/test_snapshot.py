@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+State snapshots: encoding round trip and what a restarted bot restores
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+import bot as bot_module
+from snapshot import encode_snapshot, decode_snapshot, save_snapshot, load_snapshot
+
+
+def updated_bot() -> bot_module.TradingBot:
+    """A bot whose BTCUSD indicators have values"""
+    bot = bot_module.TradingBot()
+    closes = 1000.0 + np.cumsum(np.random.default_rng(1).normal(0, 5, 100))
+    klines = [{'timestamp': i * 60_000, 'close': close} for i, close in enumerate(closes.tolist())]
+    for timeframe in ('15m', '1h'):
+        assert bot.registry.indicator('BTCUSD', timeframe).update(klines)
+    bot.last_signals['BTCUSD_15m'] = {'buy_1': True}
+    bot.subscribers.add(42)
+    return bot
+
+
+def test_encoding_round_trip():
+    state = {'saved_at': 1.5, 'subscribers': [1, 2], 'indicators': {'BTCUSD_15m': {'current_rsi': 55.5}}}
+    
+    assert decode_snapshot(encode_snapshot(state)) == state
+    with pytest.raises(ValueError):
+        decode_snapshot(b'JUNK' + encode_snapshot(state)[4:])
+
+
+def test_restore_skips_indicator_state_older_than_two_candles(tmp_path):
+    saved = updated_bot()
+    state = saved.get_state()
+    # 45 minutes old: three 15m candles, but under two 1h candles
+    state['saved_at'] = time.time() - 45 * 60
+    path = str(tmp_path / 'snapshot')
+    save_snapshot(path, state)
+    
+    restarted = bot_module.TradingBot()
+    restarted.snapshot_path = path
+    restarted.restore_state()
+    
+    assert restarted.restored == {'BTCUSD_1h'}
+    assert restarted.registry.indicator('BTCUSD', '15m').current_rsi is None
+    assert restarted.registry.indicator('BTCUSD', '1h').get_state() == saved.registry.indicator('BTCUSD', '1h').get_state()
+    # Subscribers and alert dedup state don't go stale
+    assert 42 in restarted.subscribers
+    assert restarted.last_signals['BTCUSD_15m'] == {'buy_1': True}
+
+
+def test_restore_fresh_snapshot(tmp_path):
+    saved = updated_bot()
+    saved.snapshot_path = str(tmp_path / 'snapshot')
+    saved.save_snapshot()
+    assert load_snapshot(saved.snapshot_path)['subscribers'] == [42]
+    
+    restarted = bot_module.TradingBot()
+    restarted.snapshot_path = saved.snapshot_path
+    restarted.restore_state()
+    
+    assert restarted.restored == {'BTCUSD_15m', 'BTCUSD_1h'}
+    for timeframe in ('15m', '1h'):
+        assert (restarted.registry.indicator('BTCUSD', timeframe).get_state()
+                == saved.registry.indicator('BTCUSD', timeframe).get_state())
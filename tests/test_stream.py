@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Binance kline WebSocket stream against a local aiohttp server: closed
+candles reach the client and the bot's indicators across a disconnect
+"""
+
+import asyncio
+import json
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import bot as bot_module
+from exchange_client import BinanceClient, HTTPSessionFactory
+
+INTERVAL_MS = 15 * 60 * 1000
+START = 1_700_000_100_000 // INTERVAL_MS * INTERVAL_MS
+HISTORY = 120
+
+
+def candle_open(index: int) -> int:
+    return START + index * INTERVAL_MS
+
+
+def close_price(index: int) -> float:
+    # Zigzag with a drift, so RSI moves on every candle
+    return 60000.0 + index * 3.0 + (25.0 if index % 3 else -40.0)
+
+
+def kline_frame(index: int, closed: bool, close: float = None) -> str:
+    close = close_price(index) if close is None else close
+    return json.dumps({'stream': 'btcusdt@kline_15m', 'data': {'e': 'kline', 'k': {
+        't': candle_open(index), 's': 'BTCUSDT', 'i': '15m',
+        'o': str(close), 'h': str(close), 'l': str(close), 'c': str(close), 'v': '1', 'x': closed,
+    }}})
+
+
+class FakeBinance:
+    """
+    /klines serves HISTORY candles (the last one still forming); /stream
+    sends scripted frames per connection and drops the first connection
+    """
+    
+    def __init__(self):
+        self.connections = 0
+        self.streams = []
+        # Frames per connection; the server closes the socket after all but the last
+        self.script = [
+            [kline_frame(HISTORY - 1, False, close_price(HISTORY - 1) + 5.0),
+             kline_frame(HISTORY - 1, True),
+             kline_frame(HISTORY, False)],
+            # Binance may repeat the last closed candle after a reconnect
+            [kline_frame(HISTORY - 1, True),
+             kline_frame(HISTORY, True)],
+        ]
+    
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/klines', self.klines)
+        app.router.add_get('/stream', self.stream)
+        return app
+    
+    async def klines(self, request: web.Request) -> web.Response:
+        rows = [
+            [candle_open(i), str(close_price(i)), str(close_price(i)), str(close_price(i)), str(close_price(i)),
+             '1', candle_open(i + 1) - 1, '0', 1, '0', '0', '0']
+            for i in range(HISTORY)
+        ]
+        return web.json_response(rows[-int(request.query.get('limit', HISTORY)):])
+    
+    async def stream(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.streams.append(request.query['streams'])
+        frames = self.script[min(self.connections, len(self.script) - 1)]
+        last = self.connections >= len(self.script) - 1
+        self.connections += 1
+        
+        for frame in frames:
+            await ws.send_str(frame)
+        if last:
+            # Stay connected until the client goes away
+            async for _ in ws:
+                pass
+        else:
+            await ws.close()
+        return ws
+
+
+async def wait_for(condition, timeout: float = 10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def stop(task: asyncio.Task):
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def test_stream_klines_reconnects_and_delivers_closed_candles():
+    async def scenario():
+        fake = FakeBinance()
+        server = TestServer(fake.app())
+        await server.start_server()
+        client = BinanceClient(session_factory=HTTPSessionFactory())
+        client.WS_URL = str(server.make_url('/stream'))
+        
+        received = []
+        connects = []
+        
+        async def on_kline(symbol, interval, kline, is_closed):
+            received.append((symbol, interval, kline['timestamp'], kline['close'], is_closed))
+        
+        async def on_connect():
+            connects.append(len(received))
+        
+        task = asyncio.create_task(client.stream_klines([('BTCUSDT', '15m')], on_kline, on_connect=on_connect))
+        try:
+            await wait_for(lambda: len(received) == 5)
+        finally:
+            await stop(task)
+            await client.close()
+            await server.close()
+        
+        return fake, received, connects, client
+    
+    fake, received, connects, client = asyncio.run(scenario())
+    
+    assert fake.streams == ['btcusdt@kline_15m'] * 2
+    # on_connect runs after every (re)connection, before that connection's klines
+    assert connects == [0, 3]
+    assert [(timestamp, closed) for _, _, timestamp, _, closed in received] == [
+        (candle_open(HISTORY - 1), False), (candle_open(HISTORY - 1), True), (candle_open(HISTORY), False),
+        (candle_open(HISTORY - 1), True), (candle_open(HISTORY), True),
+    ]
+    assert all(symbol == 'BTCUSDT' and interval == '15m' for symbol, interval, *_ in received)
+    assert received[1][3] == close_price(HISTORY - 1)
+    # Stream updates land in the kline cache
+    assert client.kline_cache.last_closed_timestamp('BTCUSDT', '15m') is not None
+
+
+def test_bot_applies_streamed_closed_candles_once(monkeypatch):
+    monkeypatch.setattr(bot_module, 'BINANCE_INGESTION', 'websocket')
+    
+    async def scenario():
+        fake = FakeBinance()
+        server = TestServer(fake.app())
+        await server.start_server()
+        
+        bot = bot_module.TradingBot()
+        bot.binance_client.BASE_URL = str(server.make_url('')).rstrip('/')
+        bot.binance_client.WS_URL = str(server.make_url('/stream'))
+        
+        checked = []
+        
+        async def check_new_signals(symbol, timeframe, price, context, signals=None, timestamp=None):
+            checked.append((symbol, timeframe, timestamp, price))
+        
+        monkeypatch.setattr(bot, 'check_new_signals', check_new_signals)
+        indicator = bot.registry.indicator('BTCUSD', '15m')
+        
+        task = asyncio.create_task(bot.run_binance_stream(None))
+        try:
+            await wait_for(lambda: indicator.last_closed_timestamp == candle_open(HISTORY) and fake.connections == 2)
+            # Let any duplicate frame of the second connection be handled
+            await asyncio.sleep(0.1)
+        finally:
+            await stop(task)
+            bot.compute.shutdown()
+            await bot.http.close()
+            await server.close()
+        
+        return fake, indicator, checked
+    
+    fake, indicator, checked = asyncio.run(scenario())
+    
+    assert indicator.streaming
+    assert fake.connections == 2
+    # Each closed candle is applied once, the repeat after the reconnect is ignored
+    assert [(symbol, timeframe, timestamp) for symbol, timeframe, timestamp, _ in checked] == [
+        ('BTCUSD', '15m', candle_open(HISTORY - 1)), ('BTCUSD', '15m', candle_open(HISTORY)),
+    ]
+    assert checked[-1][3] == close_price(HISTORY)
+    assert indicator.last_closed_timestamp == candle_open(HISTORY)
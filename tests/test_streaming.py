@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming mode (IndicatorStream, RSIFollowTrend(streaming=True)) against
+the windowed full-history computation
+"""
+
+import numpy as np
+import pytest
+
+from rsi_indicator import (
+    IndicatorStream, RSIFollowTrend, RSI_MODE_WILDER, RSI_MODE_SMA, INDICATOR_STATE_FIELDS,
+    rsi_series, ema_series, wma_series
+)
+
+SIGNALS = ('buy_1', 'buy_2', 'sell_1', 'sell_2')
+
+
+def random_walk(n: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 1000.0 + np.cumsum(rng.normal(0, 5, n))
+
+
+def klines(closes: np.ndarray, start: int = 0) -> list:
+    return [{'timestamp': (start + i) * 60_000, 'close': close} for i, close in enumerate(closes.tolist())]
+
+
+@pytest.mark.parametrize('mode', [RSI_MODE_WILDER, RSI_MODE_SMA])
+def test_stream_values_match_full_history_series(mode):
+    closes = random_walk(500)
+    stream = IndicatorStream(14, 9, 45, mode)
+    
+    pushed = [stream.push(close) for close in closes.tolist()]
+    
+    # One value per close once `rsi_length` deltas are in
+    assert pushed[:14] == [None] * 14
+    rsi = rsi_series(closes, 14, mode)[14:]
+    values = np.array(pushed[14:])
+    np.testing.assert_allclose(values[:, 0], rsi, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(values[:, 1], ema_series(rsi, 9), rtol=0, atol=1e-9)
+    np.testing.assert_allclose(values[:, 2], wma_series(rsi, 45), rtol=0, atol=1e-9)
+
+
+def test_peek_does_not_commit():
+    closes = random_walk(100).tolist()
+    stream = IndicatorStream()
+    for close in closes[:-1]:
+        stream.push(close)
+    before = stream.get_state()
+    
+    peeked = stream.peek(closes[-1])
+    
+    assert stream.get_state() == before
+    assert peeked == stream.push(closes[-1])
+
+
+@pytest.mark.parametrize('mode', [RSI_MODE_WILDER, RSI_MODE_SMA])
+def test_streaming_signals_match_windowed_full_history(mode):
+    closes = random_walk(1200)
+    seed_bars = 60
+    streaming = RSIFollowTrend(rsi_mode=mode, streaming=True)
+    windowed = RSIFollowTrend(rsi_mode=mode)
+    
+    # Both start with the last seed candle as current and no setup progress
+    streaming.seed(klines(closes[:seed_bars]))
+    assert windowed.update(klines(closes[:seed_bars]))
+    
+    fired = {name: 0 for name in SIGNALS}
+    for i in range(seed_bars, len(closes)):
+        assert streaming.push_candle(float(closes[i]), i * 60_000)
+        assert windowed.update(klines(closes[:i + 1]))
+        
+        for name in ('current_rsi', 'current_ema9', 'current_wma45'):
+            assert getattr(streaming, name) == pytest.approx(getattr(windowed, name), abs=1e-9)
+        signals = streaming.get_signals()
+        assert signals == windowed.get_signals(), f"bar {i}"
+        for name in SIGNALS:
+            fired[name] += signals[name]
+    
+    steps = [name for name in INDICATOR_STATE_FIELDS
+             if not name.startswith(('prev_', 'current_')) and name != 'last_closed_timestamp']
+    assert {name: getattr(streaming, name) for name in steps} == {name: getattr(windowed, name) for name in steps}
+    if mode == RSI_MODE_WILDER:
+        # The data completes BUY and SELL setups (#2 entries reset the setup
+        # in the step logic, so they only show in the totals)
+        assert fired['buy_1'] and fired['sell_1'], fired
+        assert streaming.total_buy_2 and streaming.total_sell_2
+
+
+def test_update_pushes_only_new_closed_candles():
+    closes = random_walk(300)
+    by_update = RSIFollowTrend(streaming=True)
+    by_push = RSIFollowTrend(streaming=True)
+    
+    # Windows of 100 klines sliding by 1-3 candles; the last kline is still forming
+    by_update.update(klines(closes[:100]))
+    by_push.seed(klines(closes[:99]))
+    end = 100
+    while end + 3 <= len(closes):
+        end += 1 + end % 3
+        by_update.update(klines(closes[end - 100:end], start=end - 100))
+    for i in range(99, end - 1):
+        by_push.push_candle(float(closes[i]), i * 60_000)
+    
+    assert by_update.last_closed_timestamp == (end - 2) * 60_000
+    assert by_update.get_state() == by_push.get_state()
+    assert by_update.preview_values == by_push.preview(float(closes[end - 1]))
+
+
+def test_state_round_trip_continues_identically():
+    closes = random_walk(400)
+    original = RSIFollowTrend(streaming=True)
+    original.seed(klines(closes[:200]))
+    
+    restored = RSIFollowTrend(streaming=True)
+    assert restored.set_state(original.get_state())
+    for i in range(200, 400):
+        original.push_candle(float(closes[i]), i * 60_000)
+        restored.push_candle(float(closes[i]), i * 60_000)
+        assert restored.get_signals() == original.get_signals()
+    
+    assert restored.get_state() == original.get_state()
+    # State saved with other settings is refused
+    assert not RSIFollowTrend(rsi_length=21, streaming=True).set_state(original.get_state())
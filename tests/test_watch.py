@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+/watch symbol validation against the providers' symbol lookups, served by
+a local aiohttp server
+"""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import bot as bot_module
+
+BINANCE_SYMBOLS = {'BTCUSDT': 'TRADING', 'LUNAUSDT': 'BREAK'}
+TWELVE_DATA_SYMBOLS = ['XAU/USD', 'EUR/USD']
+
+
+async def exchange_info(request: web.Request) -> web.Response:
+    symbol = request.query['symbol']
+    if symbol not in BINANCE_SYMBOLS:
+        return web.json_response({'code': -1121, 'msg': 'Invalid symbol.'}, status=400)
+    return web.json_response({'symbols': [{'symbol': symbol, 'status': BINANCE_SYMBOLS[symbol]}]})
+
+
+async def symbol_search(request: web.Request) -> web.Response:
+    # Fuzzy matches, like the real endpoint
+    query = request.query['symbol'].upper().replace('/', '')
+    return web.json_response({'data': [
+        {'symbol': symbol} for symbol in TWELVE_DATA_SYMBOLS if symbol.replace('/', '').startswith(query[:3])
+    ], 'status': 'ok'})
+
+
+async def server_error(request: web.Request) -> web.Response:
+    return web.Response(status=503)
+
+
+def run_watch(*watches, fail: bool = False):
+    """Results of watch_symbol(..., verify=True) calls: the instrument or the ValueError message"""
+    async def scenario():
+        app = web.Application()
+        app.router.add_get('/exchangeInfo', server_error if fail else exchange_info)
+        app.router.add_get('/symbol_search', server_error if fail else symbol_search)
+        server = TestServer(app)
+        await server.start_server()
+        
+        bot = bot_module.TradingBot()
+        base = str(server.make_url('')).rstrip('/')
+        bot.binance_client.BASE_URL = bot.twelve_data_client.BASE_URL = base
+        bot.twelve_data_client.api_key = 'test'
+        
+        results = []
+        try:
+            for symbol, provider in watches:
+                try:
+                    results.append(await bot.watch_symbol(symbol, provider, None, None, verify=True))
+                except ValueError as e:
+                    results.append(str(e))
+        finally:
+            bot.compute.shutdown()
+            await bot.http.close()
+            await server.close()
+        return bot, results
+    
+    return asyncio.run(scenario())
+
+
+def test_watch_accepts_listed_symbols():
+    bot, results = run_watch(('BTCUSD', 'binance'), ('EURUSD', 'twelvedata'))
+    
+    assert [(i.symbol, i.provider, i.ticker) for i in results] == [
+        ('BTCUSD', 'binance', 'BTCUSDT'), ('EURUSD', 'twelvedata', 'EUR/USD'),
+    ]
+    assert 'EURUSD' in bot.registry
+
+
+@pytest.mark.parametrize('symbol, provider, message', [
+    ('FOO', 'twelvedata', 'Không tìm thấy FOO/ trên twelvedata'),
+    ('XAGUSD', 'twelvedata', 'Không tìm thấy XAG/USD trên twelvedata'),
+    ('FOOUSD', 'binance', 'Không tìm thấy FOOUSDT trên binance'),
+    # Listed but not trading
+    ('LUNAUSD', 'binance', 'Không tìm thấy LUNAUSDT trên binance'),
+])
+def test_watch_rejects_unknown_symbols(symbol, provider, message):
+    bot, results = run_watch((symbol, provider))
+    
+    assert results == [message]
+    assert symbol not in bot.registry
+
+
+def test_watch_rejects_when_provider_is_unreachable():
+    bot, results = run_watch(('SOLUSD', 'binance'), fail=True)
+    
+    assert results == ['Không kiểm tra được SOLUSDT trên binance, thử lại sau']
+    assert 'SOLUSD' not in bot.registry